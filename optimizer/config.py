@@ -10,9 +10,31 @@ water_height_in = 15                                # Water height in inches
 top_load = 40000                                    # Uniform load on top edges (lbf)
 
 cost_calc_path = 'cost_calculator.xlsx'   # Path to the Cost Calculator Excel file
+cost_backend = 'excel'                              # 'excel' (recalculate with xlwings) or 'native' (in-process NumPy engine, no Excel needed)
+cost_cache_dir = '.cost_cache'                      # Folder for the workbook parameter pack and other cost caches
+use_cost_cache = True                               # Reuse costed part/joint rows across designs and runs (native backend)
+cost_cache_max_entries = 100000                     # Least recently used rows are evicted beyond this size
+cost_shards = 1                                     # Parallel costing processes (each with its own workbook copy or engine), 1 disables sharding
+delta_costing = True                                # Write only the rows that changed since the previous batch and recalculate the affected designs
+use_results_store = True                            # Record costed designs and reuse the costs of designs costed in previous runs
+results_db_path = 'cost_results.sqlite'             # SQLite file of the results store
 store_path = 'plots'                                # Path to store generated plots
+frame_solver = 'auto'                               # 'banded' (RCM-reordered banded Cholesky, scales to long walls), 'dense' or 'auto' (banded above structural_frames.BANDED_MIN_NODES nodes), in the sweep and the final check
+frame_reanalysis = False                            # Solve diagonal plans B-D as low-rank updates of plan A when the added diagonals touch few free nodes (the generated plans B-D differ from A at full rank)
+frame_symmetry = True                               # Solve mirror-symmetric frames under symmetric loads as a half model
+frame_buckling = 'euler'                            # 'euler' (isolated members with EFFECTIVE_LENGTH_FACTOR, conservative) or 'global' (linear buckling eigenanalysis of the frame)
+frame_load_cases = ('hydrostatic', 'wind', 'combined')  # Load cases every wall frame is checked against besides the top load (structural_frames.LOAD_CASES)
+sweep_workers = 1                                   # Parallel processes for the wall frame sweep (node counts are spread over them), 1 runs it serially
+sweep_search = 'exhaustive'                         # 'exhaustive' (solve every combo), 'bisect' (solve only around the gauge x node count feasibility frontier) or 'bound' (solve in order of mass until the top designs are settled)
+verify_monotone = True                              # With 'bisect', solve a profile exhaustively when its solved combos contradict monotone adequacy
 N_top_final_designs = 15                            # Number of top designs to consider (max 100)
 n_configurations = 30                               # Number of design configurations used to generate the top designs (max 30)
+combination_costing = False                         # Rank floor x wall combinations analytically (sub-design costs + floor-wall joint delta, approximate)
+use_cost_surrogate = False                          # Re-order the lightest sound frames and floors by learned cost (trained on previous calculator runs), rank all of them once validated on a holdout (approximate)
+surrogate_min_samples = 20                          # Costed designs needed before the cost surrogate is used
+surrogate_holdout = 10                              # Random sound candidates per sub-design type costed each run to measure the cost surrogate error
+surrogate_max_error = 0.05                          # Holdout error (relative RMS) at which the cost surrogate ranks every candidate
+surrogate_shortlist = 3                             # Until then it only re-orders the n_top x surrogate_shortlist lightest candidates
 
 # OPTIONAL: Define APB - TL ratio
 use_ratio = True                                   # Require a ratio of panel bender to tube laser in generated designs
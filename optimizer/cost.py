@@ -1,17 +1,171 @@
-from openpyxl import load_workbook # type: ignore
-import xlwings as xw # type: ignore
+from cost_engine import PART_SHEET, JOINT_SHEET, SUMMARY_SHEET, PART_INPUT_COLUMNS, JOINT_INPUT_COLUMNS, SUMMARY_INPUT_COLUMNS, SUMMARY_OUTPUT_COLUMNS
+from cost_engine import joint_design_sets
+from cost_backends import make_backend, xw
+from cost_cache import RowCostCache
 import general_data as gd
+from concurrent.futures import ProcessPoolExecutor
 import config as cfg
+import tempfile
+import shutil
 import os
 
+_sessions = {}
+
+class CalculatorSession:
+    """
+    Long-lived cost calculator session: one workbook stays open in the backend across calls.
+
+    In delta mode only the input rows that differ from the previous batch (or from the rows the workbook
+    was saved with) are written, and only the design sets touched by those rows are recalculated. This
+    assumes the Summary row of a design set only depends on its own part and joint rows, with joints
+    attributed by the design set name that ends their part name (see cost_engine.joint_design_sets).
+
+    Args:
+        filepath: Path to the cost calculator workbook
+        backend: Backend name ('excel' or 'native'), defaults to cfg.cost_backend
+        delta: Write changed rows only (defaults to cfg.delta_costing)
+    """
+    def __init__(self, filepath, backend=None, part_start_row=4, joint_start_row=4, summary_row=2, delta=None):
+        self.filepath = filepath
+        self.part_start_row = part_start_row
+        self.joint_start_row = joint_start_row
+        self.summary_row = summary_row
+        self.backend_name = backend or cfg.cost_backend
+        self.delta = cfg.delta_costing if delta is None else delta
+        self.mtime = os.path.getmtime(filepath)
+        self.backend = make_backend(self.backend_name, part_start_row, joint_start_row, summary_row)
+        self.backend.open(filepath)
+        self.inputs = None  # Input rows currently in the workbook, per sheet
+
+    def evaluate(self, part_entries, joint_entries=None, submodule_type=gd.WATER_COLLECTION_WELDED):
+        """
+        Write a batch of part and joint entries, recalculate and read the Summary rows.
+
+        Returns:
+            List of Summary rows (columns 1-11), one per distinct part set
+        """
+        distinct_sets = list(dict.fromkeys(entry[0] for entry in part_entries))
+        summary_entries = [[design_set, submodule_type] for design_set in distinct_sets]
+        tables = [
+            (PART_SHEET, self.part_start_row, PART_INPUT_COLUMNS, part_entries),
+            (JOINT_SHEET, self.joint_start_row, JOINT_INPUT_COLUMNS, joint_entries or []),
+            (SUMMARY_SHEET, self.summary_row, SUMMARY_INPUT_COLUMNS, summary_entries),
+        ]
+
+        if self.delta:
+            if self.inputs is None:
+                self.inputs = {sheet: self.backend.read_inputs(sheet, start_row, n_cols) for sheet, start_row, n_cols, _ in tables}
+            affected = self._write_changes(tables)
+            self.backend.calculate(affected)
+        else:
+            for sheet, start_row, n_cols, _ in tables:
+                self.backend.clear(sheet, start_row, n_cols)
+            for sheet, start_row, _, rows in tables:
+                self.backend.write(sheet, start_row, rows)
+            self.backend.calculate()
+
+        self.inputs = {sheet: [list(row) for row in rows] for sheet, _, _, rows in tables}
+        return self.backend.read(SUMMARY_SHEET, self.summary_row, len(distinct_sets), SUMMARY_OUTPUT_COLUMNS)
+
+    def _write_changes(self, tables):
+        """
+        Write the rows that changed since the previous batch in contiguous runs and clear removed rows.
+
+        Returns:
+            Set of design sets whose rows changed, or None (recalculate everything) when a changed joint
+            cannot be attributed to a design set by its name
+        """
+        design_sets = set()
+        for sheet, _, _, rows in tables:
+            if sheet != JOINT_SHEET:
+                design_sets.update(row[0] for row in rows + self.inputs.get(sheet, []) if row)
+
+        affected = set()
+        attributed = True
+        for sheet, start_row, n_cols, rows in tables:
+            old = self.inputs.get(sheet, [])
+            changed = [i for i, row in enumerate(rows) if i >= len(old) or _padded(old[i], n_cols) != _padded(row, n_cols)]
+            if len(old) > len(rows):
+                self.backend.clear(sheet, start_row + len(rows), n_cols)
+
+            for first, last in _runs(changed):
+                self.backend.write(sheet, start_row + first, rows[first:last + 1])
+
+            stale = [old[i] for i in changed if i < len(old)] + old[len(rows):]
+            fresh = [rows[i] for i in changed]
+            if sheet == JOINT_SHEET:
+                for row in [row for row in stale if row] + fresh:
+                    joint_sets = joint_design_sets(row, design_sets)
+                    attributed = attributed and bool(joint_sets)
+                    affected.update(joint_sets)
+            else:
+                affected.update(row[0] for row in stale if row)
+                affected.update(row[0] for row in fresh)
+        affected.discard(None)
+        return affected if attributed else None
+
+    def close(self, save=True):
+        """
+        Save the workbook once and release the backend.
+        """
+        try:
+            if save:
+                self.backend.save()
+        finally:
+            self.backend.close()
+
+def _padded(row, n_cols):
+    row = list(row)[:n_cols]
+    return row + [None] * (n_cols - len(row))
+
+def _runs(indices):
+    """
+    Contiguous (first, last) runs of sorted row indices.
+    """
+    runs = []
+    for i in indices:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return runs
+
+def get_session(filepath, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Calculator session of a workbook, opened on first use and reused by later calls.
+    A session is reopened when the configured backend changes, or for the native backend when the
+    workbook file changes (the Excel backend saves the open workbook itself).
+    """
+    key = (os.path.abspath(filepath), part_start_row, joint_start_row, summary_row)
+    session = _sessions.get(key)
+    if session is not None and (session.backend_name != cfg.cost_backend or
+                                (session.backend_name == 'native' and session.mtime != os.path.getmtime(filepath))):
+        session.close()
+        session = None
+    if session is None:
+        session = CalculatorSession(filepath, cfg.cost_backend, part_start_row, joint_start_row, summary_row)
+        _sessions[key] = session
+    return session
+
+def close_sessions():
+    for session in _sessions.values():
+        try:
+            session.close()
+        except Exception as e:
+            print(f"Error closing cost calculator session: {e}")
+    _sessions.clear()
+
 def quit_excel():
+    close_sessions()
+    if xw is None:
+        return
     for app in xw.apps: app.quit()
 
 def check_cost_calc_path():
     if not os.path.exists(cfg.cost_calc_path):
         raise FileNotFoundError(f"Cost calculator file not found at {cfg.cost_calc_path}")
 
-def update_and_read_excel(filepath, part_entries, joint_entries=None, submodule_type=gd.WATER_COLLECTION_WELDED, part_start_row=4, joint_start_row=4, summary_row=2):
+def update_and_read_excel(filepath, part_entries, joint_entries=None, submodule_type=gd.WATER_COLLECTION_WELDED, part_start_row=4, joint_start_row=4, summary_row=2, n_shards=None):
     """
     Update specific cells in an existing Excel file and read calculated values.
     
@@ -22,101 +176,108 @@ def update_and_read_excel(filepath, part_entries, joint_entries=None, submodule_
         submodule_type: 'Water Collection Welded', 'Water Collection TriArmor', 'Water Collection Unwelded', or 'Water Distribution'
         part_start_row: Starting row for writing entries
         summary_row: Row for writing summary information
+        n_shards: Number of parallel costing shards (defaults to cfg.cost_shards)
 
     Returns:
         List of calculated values from the Excel file
     """
-    app = xw.App(visible=False)
-    app.quit()
-    
-    part_sheet_name = 'BAC Part List'
-    joint_sheet_name = 'Joints List'
-    summary_sheet_name = 'Summary'
+    n_shards = cfg.cost_shards if n_shards is None else n_shards
+    try:
+        if n_shards > 1:
+            return _sharded_costs(filepath, part_entries, joint_entries, submodule_type,
+                                  (part_start_row, joint_start_row, summary_row), n_shards)
+        session = get_session(filepath, part_start_row, joint_start_row, summary_row)
+        return session.evaluate(part_entries, joint_entries, submodule_type)
+    except Exception as e:
+        print(f"Error updating or reading Excel: {e}")
+        return None
 
-    def _clear_excel_contents():
-        """
-        Clear the contents of the specified sheets in the Excel file.
-        """
-        try:
-            part_sheet = workbook[part_sheet_name]
-            joint_sheet = workbook[joint_sheet_name]
-            summary_sheet = workbook[summary_sheet_name]
+def split_shards(part_entries, joint_entries, n_shards):
+    """
+    Split part and joint entries into shards of whole design sets, balanced by number of part rows.
+    Joints go to the shard of the design their first part belongs to (unmatched joints go to every shard).
+
+    Returns:
+        List of (part_entries, joint_entries) tuples
+    """
+    distinct_sets = list(dict.fromkeys(entry[0] for entry in part_entries))
+    n_shards = max(1, min(n_shards, len(distinct_sets)))
+    row_counts = {}
+    for entry in part_entries:
+        row_counts[entry[0]] = row_counts.get(entry[0], 0) + 1
 
-            for row in part_sheet.iter_rows(min_row=part_start_row, max_col=14, max_row=part_sheet.max_row):
-                for cell in row:
-                    cell.value = None
+    # Largest design sets first, each to the least loaded shard
+    shard_of = {}
+    loads = [0] * n_shards
+    for design_set in sorted(distinct_sets, key=lambda s: -row_counts[s]):
+        shard = loads.index(min(loads))
+        shard_of[design_set] = shard
+        loads[shard] += row_counts[design_set]
 
-            for row in joint_sheet.iter_rows(min_row=joint_start_row, max_col=3, max_row=joint_sheet.max_row):
-                for cell in row:
-                    cell.value = None
+    part_set = {entry[1]: entry[0] for entry in part_entries}
+    shards = [([], []) for _ in range(n_shards)]
+    for entry in part_entries:
+        shards[shard_of[entry[0]]][0].append(entry)
+    for joint in joint_entries or []:
+        design_set = part_set.get(str(joint[0]).split(':')[0])
+        if design_set is None:
+            for _, shard_joints in shards:
+                shard_joints.append(joint)
+        else:
+            shards[shard_of[design_set]][1].append(joint)
+    return shards
 
-            for row in summary_sheet.iter_rows(min_row=summary_row, max_col=2, max_row=summary_sheet.max_row):
-                for cell in row:
-                    cell.value = None
+def _cost_shard(filepath, backend, part_entries, joint_entries, submodule_type, start_rows):
+    """
+    Cost one shard in its own calculator session (a temporary copy of the workbook for Excel).
 
-            workbook.save(filepath)
-        except Exception as e:
-            print(f"Error clearing Excel contents: {e}")
+    Returns:
+        Summary rows, and (cache path, {key: values}) of the rows the shard added to the row cache (None
+        without a row cache). The shards do not save the cache themselves, the parent merges it once.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if backend == 'excel':
+            filepath = shutil.copy2(filepath, tmp_dir)
+        session = CalculatorSession(filepath, backend, *start_rows)
+        try:
+            rows = session.evaluate(part_entries, joint_entries, submodule_type)
+            cache = getattr(session.backend, 'cache', None)
+            return rows, (cache.path, cache.new_entries()) if cache is not None else None
+        finally:
+            session.close(save=False)  # Workbook copies are discarded, row costs are merged by the parent
 
-    try:
-        # Load the workbook and sheet
-        workbook = load_workbook(filepath)
-        _clear_excel_contents()
-
-        part_sheet = workbook[part_sheet_name]
-
-        # Write part entries to the Excel file
-        for i, entry in enumerate(part_entries):
-            for j, value in enumerate(entry):
-                part_sheet.cell(row=part_start_row + i, column=j + 1, value=value)
-
-        # Write joint entries to the Excel file
-        if joint_entries is not None:
-            joint_sheet = workbook[joint_sheet_name]
-            for i, joint in enumerate(joint_entries):
-                for j, value in enumerate(joint):
-                    joint_sheet.cell(row=joint_start_row + i, column=j + 1, value=value)
-
-        # Write submodule type to the summary sheet
-        summary_sheet = workbook[summary_sheet_name]
-
-        distinct_sets = list({entry[0] for entry in part_entries})
-        set_num = 0
-        for i in range(summary_row, len(distinct_sets) + summary_row):
-            summary_sheet.cell(row=i, column=1, value=distinct_sets[set_num])
-            summary_sheet.cell(row=i, column=2, value=submodule_type)
-            set_num += 1
-
-        # Force recalculation of formulas
-        workbook.save(filepath)
-        _force_recalculation(filepath)
-
-        # Reload the workbook to read calculated values
-        workbook = load_workbook(filepath, data_only=True)
-        summary_sheet = workbook[summary_sheet_name]
-        
-        # Read calculated values ()
-        calculated_values = []
-        for i in range(summary_row, len(distinct_sets) + summary_row):
-            row_values = [summary_sheet.cell(row=i, column=col).value for col in range(1, 12)]  # Adjust columns as needed
-            calculated_values.append(row_values)
-        
-        return calculated_values
-    
-    except Exception as e:
-        print(f"Error updating or reading Excel: {e}")
-        return None
+def _merge_row_costs(path, entries):
+    """
+    Add the row costs of the shards to the row cache at path: to the cache of an open session that uses it
+    (saved when the session closes, so it does not overwrite them), otherwise straight to the file.
+    """
+    caches = [getattr(session.backend, 'cache', None) for session in _sessions.values()]
+    cache = next((c for c in caches if c is not None and c.path == path), None)
+    save = cache is None
+    if save:
+        cache = RowCostCache(path, max_entries=cfg.cost_cache_max_entries)
+    for key, values in entries.items():
+        cache.put(key, values)
+    if save:
+        cache.save()
 
-def _force_recalculation(filepath):
+def _sharded_costs(filepath, part_entries, joint_entries, submodule_type, start_rows, n_shards):
     """
-    Open the Excel file with xlwings to force recalculation of formulas.
+    Cost the design sets in parallel shards and merge the Summary rows back in their original order.
     """
-    try:
-        app = xw.App(visible=False)
-        wb = app.books.open(filepath)
-        wb.app.calculate()  # Force recalculation
-        wb.save()
-        wb.close()
-        app.quit()
-    except Exception as e:
-        print(f"Error forcing recalculation: {e}")
\ No newline at end of file
+    shards = split_shards(part_entries, joint_entries, n_shards)
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [pool.submit(_cost_shard, os.path.abspath(filepath), cfg.cost_backend, shard_parts, shard_joints,
+                               submodule_type, start_rows) for shard_parts, shard_joints in shards]
+        rows = {}
+        new_row_costs = {}
+        for future in futures:
+            shard_rows, shard_cache = future.result()
+            for row in shard_rows:
+                rows[row[0]] = row
+            if shard_cache is not None:
+                cache_path, entries = shard_cache
+                new_row_costs.update(entries)
+    if new_row_costs:
+        _merge_row_costs(cache_path, new_row_costs)
+    return [rows[design_set] for design_set in dict.fromkeys(entry[0] for entry in part_entries)]
@@ -0,0 +1,208 @@
+"""
+Backends of the cost calculator session.
+
+A backend holds one open cost calculator workbook and exposes range I/O on its sheets plus a recalculation
+step. ExcelBackend drives the real workbook through xlwings; NativeBackend keeps the input rows in memory
+and evaluates them with the native cost engine, so the pipeline runs without Excel (e.g. on Linux).
+"""
+import os
+from cost_engine import PART_SHEET, JOINT_SHEET, SUMMARY_SHEET, joint_design_sets
+from cost_params import load_packed_engine
+from cost_cache import load_row_cache
+import config as cfg
+
+try:
+    import xlwings as xw # type: ignore
+except ImportError:  # xlwings needs a local Excel install, the native backend does not
+    xw = None
+
+
+class CostBackend:
+    """
+    Interface of a cost calculator backend. Rows and columns are 1-based like in the workbook.
+    """
+    def open(self, filepath):
+        raise NotImplementedError
+
+    def clear(self, sheet, start_row, n_cols):
+        """Clear columns 1..n_cols from start_row down."""
+        raise NotImplementedError
+
+    def write(self, sheet, start_row, rows):
+        """Write a list of rows starting at column 1 of start_row."""
+        raise NotImplementedError
+
+    def calculate(self, design_sets=None):
+        """Recalculate the workbook; design_sets optionally limits it to the design sets whose rows changed."""
+        raise NotImplementedError
+
+    def read(self, sheet, start_row, n_rows, n_cols):
+        """Read n_rows x n_cols values starting at column 1 of start_row."""
+        raise NotImplementedError
+
+    def read_inputs(self, sheet, start_row, n_cols):
+        """Input rows currently in a table, from start_row down to the first row with an empty first column."""
+        return []
+
+    def save(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ExcelBackend(CostBackend):
+    """
+    Cost calculator workbook kept open in a single hidden Excel instance.
+
+    Rows are written and read as contiguous 2D blocks (one COM call per block). The last row written to
+    each sheet is tracked so clearing only touches the extent used by the previous batch.
+    """
+    def __init__(self):
+        self.app = None
+        self.book = None
+        self.last_rows = {}
+
+    def open(self, filepath):
+        if xw is None:
+            raise ImportError("xlwings is required for cost_backend = 'excel'")
+        self.app = xw.App(visible=False, add_book=False)
+        self.app.display_alerts = False
+        self.app.screen_updating = False
+        self.book = self.app.books.open(os.path.abspath(filepath))
+        self.last_rows = {}
+
+    def clear(self, sheet, start_row, n_cols):
+        if sheet in self.last_rows:
+            last_row = self.last_rows[sheet]
+        else:  # Rows left over from before this session are unknown
+            last_row = self.book.sheets[sheet].used_range.last_cell.row
+        if last_row >= start_row:
+            self.book.sheets[sheet].range((start_row, 1), (last_row, n_cols)).clear_contents()
+        self.last_rows[sheet] = min(last_row, start_row - 1)
+
+    def write(self, sheet, start_row, rows):
+        if not rows:
+            return
+        n_cols = max(len(row) for row in rows)
+        block = [list(row) + [None] * (n_cols - len(row)) for row in rows]
+        self.book.sheets[sheet].range((start_row, 1)).value = block
+        last_row = start_row + len(rows) - 1
+        self.last_rows[sheet] = max(self.last_rows.get(sheet, last_row), last_row)
+
+    def calculate(self, design_sets=None):
+        self.app.calculate()  # Excel only recalculates the cells that depend on changed inputs
+
+    def read(self, sheet, start_row, n_rows, n_cols):
+        if n_rows <= 0:
+            return []
+        block = self.book.sheets[sheet].range((start_row, 1), (start_row + n_rows - 1, n_cols))
+        return block.options(ndim=2).value
+
+    def read_inputs(self, sheet, start_row, n_cols):
+        last_row = self.book.sheets[sheet].used_range.last_cell.row
+        rows = self.read(sheet, start_row, last_row - start_row + 1, n_cols)
+        for i, row in enumerate(rows):
+            if row[0] is None:
+                rows = rows[:i]
+                break
+        self.last_rows[sheet] = last_row
+        return rows
+
+    def save(self):
+        self.book.save()
+
+    def close(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.app is not None:
+            self.app.quit()
+            self.app = None
+
+
+class NativeBackend(CostBackend):
+    """
+    In-memory stand-in for the workbook, evaluated with the native cost engine.
+
+    The engine is built from the workbook parameter pack and part/joint rows that were costed before
+    (in this or a previous run) come from the persistent row cache when cfg.use_cost_cache is set.
+    Summary rows are kept per design set so a delta calculation only evaluates the changed design sets.
+    """
+    def __init__(self, part_start_row=4, joint_start_row=4, summary_row=2):
+        self.start_rows = (part_start_row, joint_start_row, summary_row)
+        self.engine = None
+        self.cache = None
+        self.sheets = {}
+        self.summary = {}
+
+    def open(self, filepath):
+        part_start_row, joint_start_row, summary_row = self.start_rows
+        self.engine = load_packed_engine(filepath, part_start_row=part_start_row,
+                                         joint_start_row=joint_start_row, summary_row=summary_row)
+        if cfg.use_cost_cache:
+            self.cache = load_row_cache(self.engine.workbook_hash, self.engine.column_layout())
+        self.sheets = {sheet: {} for sheet in (PART_SHEET, JOINT_SHEET, SUMMARY_SHEET)}
+        self.summary = {}
+
+    def clear(self, sheet, start_row, n_cols):
+        rows = self.sheets[sheet]
+        for row in [r for r in rows if r >= start_row]:
+            rows[row][:n_cols] = [None] * min(n_cols, len(rows[row]))
+            if all(value is None for value in rows[row]):
+                del rows[row]
+
+    def write(self, sheet, start_row, rows):
+        for i, row in enumerate(rows):
+            self.sheets[sheet][start_row + i] = list(row)
+
+    def read_inputs(self, sheet, start_row, n_cols):
+        rows = self.sheets.get(sheet, {})
+        inputs = []
+        row = start_row
+        while rows.get(row) and rows[row][0] is not None:
+            inputs.append(rows[row][:n_cols])
+            row += 1
+        return inputs
+
+    def calculate(self, design_sets=None):
+        entries = {sheet: self.read_inputs(sheet, table.start_row, table.n_inputs) for sheet, table in self.engine.tables.items()}
+        if design_sets is not None and self.summary:
+            entries = {
+                PART_SHEET: [entry for entry in entries[PART_SHEET] if entry[0] in design_sets],
+                JOINT_SHEET: [joint for joint in entries[JOINT_SHEET] if joint_design_sets(joint, design_sets)],
+                SUMMARY_SHEET: [entry for entry in entries[SUMMARY_SHEET] if entry[0] in design_sets],
+            }
+        else:
+            self.summary = {}
+        if not entries[SUMMARY_SHEET]:
+            return
+        columns = self.engine.evaluate_tables(entries, cache=self.cache)
+        for entry, row in zip(entries[SUMMARY_SHEET], self.engine.summary_rows(columns, len(entries[SUMMARY_SHEET]))):
+            self.summary[tuple(entry[:2])] = row
+
+    def read(self, sheet, start_row, n_rows, n_cols):
+        rows = self.sheets.get(sheet, {})
+        values = []
+        for row in range(start_row, start_row + n_rows):
+            entry = rows.get(row, [])
+            if sheet == SUMMARY_SHEET:
+                entry = self.summary.get(tuple(entry[:2]), entry)
+            values.append((list(entry) + [None] * n_cols)[:n_cols])
+        return values
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+            print(self.cache.report())
+
+
+def make_backend(name, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Create a cost calculator backend by name ('excel' or 'native').
+    """
+    if name == 'excel':
+        return ExcelBackend()
+    if name == 'native':
+        return NativeBackend(part_start_row, joint_start_row, summary_row)
+    raise ValueError(f"Unknown cost backend: {name}")
@@ -0,0 +1,100 @@
+"""
+Content-addressed cache of costed part and joint rows.
+
+Rows are keyed by a canonical hash of the inputs the cost formulas actually read (process, material,
+gauge, bends, length, width, class, ...), without the design name, so parts that were already costed
+in a previous sub-design, combination or run are never recalculated.
+"""
+import os
+import pickle
+from collections import OrderedDict
+import config as cfg
+from cost_params import PACK_VERSION
+
+
+class RowCostCache:
+    """
+    LRU cache of row-local formula results, persisted to disk between runs.
+
+    Args:
+        path: Pickle file for persistence (None keeps the cache in memory only)
+        max_entries: Least recently used rows are evicted beyond this size
+    """
+    def __init__(self, path=None, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.new_keys = set()  # Rows costed since the cache was loaded
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    entries = pickle.load(f)
+                if not isinstance(entries, OrderedDict):
+                    raise TypeError(f"expected an OrderedDict, got {type(entries).__name__}")
+                self.entries = entries
+            except Exception as e:  # A corrupt or foreign cache only costs a recalculation
+                print(f"Ignoring unreadable cost cache {path}, starting empty: {e}")
+
+    def get(self, key):
+        values = self.entries.get(key)
+        if values is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return values
+
+    def put(self, key, values):
+        self.entries[key] = values
+        self.new_keys.add(key)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def new_entries(self):
+        """
+        {key: values} of the rows costed since the cache was loaded (and not evicted since).
+        """
+        return {key: self.entries[key] for key in self.new_keys if key in self.entries}
+
+    def save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # Unique per process, shards save concurrently
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+        }
+
+    def report(self):
+        return (f"Row cost cache: {self.hits}/{self.hits + self.misses} hits ({100 * self.hit_rate:.1f}%), "
+                f"{len(self.entries)} entries, {self.evictions} evicted")
+
+
+def load_row_cache(workbook_hash, column_layout, cache_dir=None, max_entries=None):
+    """
+    Open the persistent row cache of a workbook version and engine column layout (see
+    CostEngine.column_layout). Cached results are only valid for that workbook, layout and PACK_VERSION.
+    """
+    cache_dir = cfg.cost_cache_dir if cache_dir is None else cache_dir
+    max_entries = cfg.cost_cache_max_entries if max_entries is None else max_entries
+    path = os.path.join(cache_dir, f"row_costs.{workbook_hash[:16]}.{column_layout}.v{PACK_VERSION}.pkl")
+    return RowCostCache(path, max_entries=max_entries)
@@ -0,0 +1,1441 @@
+"""
+Native evaluation of the cost calculator workbook.
+
+The formulas of the 'BAC Part List', 'Joints List' and 'Summary' sheets are read once with openpyxl,
+compiled into a dependency graph of column expressions and evaluated for whole batches of rows with NumPy.
+The engine returns the same Summary rows as update_and_read_excel without a running Excel instance.
+"""
+import re
+import fnmatch
+import hashlib
+import numpy as np # type: ignore
+from openpyxl import load_workbook # type: ignore
+from openpyxl.formula.tokenizer import Tokenizer, Token # type: ignore
+from openpyxl.utils import column_index_from_string # type: ignore
+import general_data as gd
+
+PART_SHEET = 'BAC Part List'
+JOINT_SHEET = 'Joints List'
+SUMMARY_SHEET = 'Summary'
+
+PART_INPUT_COLUMNS = 14
+JOINT_INPUT_COLUMNS = 3
+SUMMARY_INPUT_COLUMNS = 2
+SUMMARY_OUTPUT_COLUMNS = 11
+
+
+def joint_design_sets(joint, design_sets):
+    """
+    Design sets a Joints List row counts towards: those whose name ends the name of its first part, like the
+    Summary's "*_<design set>:*" criterion. Only the joint's own name is used, so the joints of a part row that
+    was removed or renamed still count towards their design set.
+    """
+    part = str(joint[0]).split(':')[0]
+    return {part[i + 1:] for i, char in enumerate(part) if char == '_' and part[i + 1:] in design_sets}
+
+
+class FormulaError(Exception):
+    """Raised when a workbook formula cannot be compiled by the native engine."""
+
+
+def read_workbook_cells(filepath):
+    """
+    Read every cell of the workbook (formulas as text) and its defined names.
+
+    Returns:
+        cells: {sheet_name: {(row, col): value}}
+        names: {NAME: reference text}
+    """
+    workbook = load_workbook(filepath)
+    cells = {}
+    for sheet in workbook.worksheets:
+        sheet_cells = {}
+        for row in sheet.iter_rows():
+            for cell in row:
+                value = cell.value
+                if value is None:
+                    continue
+                if hasattr(value, 'text'):  # Array formulas
+                    value = value.text
+                sheet_cells[(cell.row, cell.column)] = value
+        cells[sheet.title] = sheet_cells
+
+    names = {}
+    for name, defined in workbook.defined_names.items():
+        names[name.upper()] = defined.attr_text
+    return cells, names
+
+
+def load_cost_engine(filepath, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Compile the cost calculator workbook at filepath into a CostEngine.
+    """
+    cells, names = read_workbook_cells(filepath)
+    return CostEngine(cells, names, part_start_row=part_start_row, joint_start_row=joint_start_row, summary_row=summary_row)
+
+
+class _Table:
+    """Row-wise table of the workbook: input columns followed by a template row of formulas."""
+    def __init__(self, sheet, start_row, n_inputs):
+        self.sheet = sheet
+        self.start_row = start_row
+        self.n_inputs = n_inputs
+        self.formulas = {}
+
+    @property
+    def columns(self):
+        return set(range(1, self.n_inputs + 1)) | set(self.formulas)
+
+
+class _Area:
+    """Rectangular block of cells stored as a list of 1D column arrays."""
+    def __init__(self, columns):
+        self.columns = columns
+
+    def value(self):
+        flat = np.concatenate(self.columns) if self.columns else np.array([], dtype=object)
+        return flat[None, :]
+
+
+class CostEngine:
+    """
+    Compiled cost calculator workbook.
+
+    Args:
+        cells: {sheet_name: {(row, col): value}} with formulas as '=...' strings
+        names: {NAME: reference text} of the workbook defined names
+        part_start_row, joint_start_row, summary_row: First data row of each table (same as update_and_read_excel)
+    """
+    def __init__(self, cells, names=None, part_start_row=4, joint_start_row=4, summary_row=2):
+        self.names = {k.upper(): v for k, v in (names or {}).items()}
+        self.workbook_hash = None
+        self.tables = {
+            PART_SHEET: _Table(PART_SHEET, part_start_row, PART_INPUT_COLUMNS),
+            JOINT_SHEET: _Table(JOINT_SHEET, joint_start_row, JOINT_INPUT_COLUMNS),
+            SUMMARY_SHEET: _Table(SUMMARY_SHEET, summary_row, SUMMARY_INPUT_COLUMNS),
+        }
+        for sheet in self.tables:
+            if sheet not in cells:
+                raise FormulaError(f"Sheet '{sheet}' not found in the cost calculator")
+
+        self.cells = self._prune_table_rows(cells)
+        self._compiled_cells = {}
+        self._formula_index = {}
+        self._cell_deps = {}
+        self._constants = {}
+        self._columns = {}
+        self._rows = {}
+        self._compile()
+
+    def _prune_table_rows(self, cells):
+        """
+        Keep the template row of each table and drop the copied-down formulas and stale data below it.
+        """
+        pruned = {}
+        for sheet, sheet_cells in cells.items():
+            table = self.tables.get(sheet)
+            if table is None:
+                pruned[sheet] = dict(sheet_cells)
+                continue
+            for (row, col), value in sheet_cells.items():
+                if row == table.start_row and col > table.n_inputs and _is_formula(value):
+                    table.formulas[col] = value
+            data_columns = table.columns
+            pruned[sheet] = {
+                (row, col): value for (row, col), value in sheet_cells.items()
+                if row < table.start_row or col not in data_columns
+            }
+        return pruned
+
+    def template_cells(self):
+        """
+        Cells needed to rebuild the engine: constant regions plus the template row of each table.
+        """
+        cells = {sheet: dict(sheet_cells) for sheet, sheet_cells in self.cells.items()}
+        for sheet, table in self.tables.items():
+            for col, formula in table.formulas.items():
+                cells[sheet][(table.start_row, col)] = formula
+        return cells
+
+    # ------------------------------------------------------------------ #
+    # Compilation
+    # ------------------------------------------------------------------ #
+    def _compile(self):
+        self._nodes = {}
+        for sheet, table in self.tables.items():
+            for col, formula in table.formulas.items():
+                self._nodes[(sheet, col)] = self._compile_formula(formula, sheet)
+
+        # Dependency graph between formula columns (through constant cells and other rows of the table as well).
+        # A column that reads its own column in another row (e.g. a running total =O3+C4) is evaluated as a recurrence
+        self._dependencies = {key: self._column_dependencies(node) | self._row_shift_dependencies(node, key[0])
+                              for key, node in self._nodes.items()}
+        self.recurrent = {key for key, deps in self._dependencies.items() if key in deps}
+        for key in self.recurrent:
+            self._dependencies[key].discard(key)
+        self.order = _topological_order(self._dependencies)
+
+        # Row-local columns only read their own row and constants, so their values can be cached per row
+        self._locality = {}
+        self.row_local = {}
+        self.row_key_columns = {}
+        for sheet, table in self.tables.items():
+            local, content, presence = [], set(), set()
+            for col in sorted(table.formulas):
+                is_local, usage = self._column_locality(sheet, col)
+                if is_local:
+                    local.append(col)
+                    content |= {c for c, use in usage.items() if use == 'content'}
+                    presence |= {c for c, use in usage.items() if use == 'presence'}
+            self.row_local[sheet] = set(local)
+            self.row_key_columns[sheet] = (sorted(content), sorted(presence - content))
+
+    def _compile_formula(self, formula, sheet):
+        try:
+            node = _Parser(formula).parse()
+            return self._resolve(node, sheet)
+        except FormulaError as e:
+            raise FormulaError(f"{sheet}: {formula}: {e}") from None
+
+    def _resolve(self, node, sheet):
+        """
+        Fill in default sheet names, expand defined names and check that every function is supported.
+        """
+        kind = node[0]
+        if kind == 'ref':
+            return ('ref', node[1] or sheet) + node[2:]
+        if kind == 'range':
+            return ('range', node[1] or sheet) + node[2:]
+        if kind == 'name':
+            text = self.names.get(node[1].upper())
+            if text is None:
+                raise FormulaError(f"Unknown name '{node[1]}'")
+            return self._resolve(_parse_reference(text), sheet)
+        if kind == 'func':
+            if node[1] not in _FUNCTIONS:
+                raise FormulaError(f"Unsupported function {node[1]}")
+            return ('func', node[1], [self._resolve(arg, sheet) for arg in node[2]])
+        if kind in ('binop', 'cmp'):
+            return (kind, node[1], self._resolve(node[2], sheet), self._resolve(node[3], sheet))
+        if kind in ('neg', 'pct'):
+            return (kind, self._resolve(node[1], sheet))
+        return node
+
+    def _compiled_cell(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key not in self._compiled_cells:
+            value = self.cells.get(sheet, {}).get((row, col))
+            self._compiled_cells[key] = self._compile_formula(value, sheet) if _is_formula(value) else None
+        return self._compiled_cells[key]
+
+    def _column_dependencies(self, node, seen=None):
+        """
+        Formula columns of the tables that an expression depends on.
+        """
+        seen = set() if seen is None else seen
+        kind = node[0]
+        if kind == 'ref':
+            _, sheet, row, col, _ = node
+            return self._cell_dependencies(sheet, row, col, row, col, seen)
+        if kind == 'range':
+            _, sheet, r1, c1, r2, c2, _ = node
+            return self._cell_dependencies(sheet, r1, c1, r2, c2, seen)
+        deps = set()
+        if kind == 'func':
+            for arg in node[2]:
+                deps |= self._column_dependencies(arg, seen)
+        elif kind in ('binop', 'cmp'):
+            deps |= self._column_dependencies(node[2], seen) | self._column_dependencies(node[3], seen)
+        elif kind in ('neg', 'pct'):
+            deps |= self._column_dependencies(node[1], seen)
+        return deps
+
+    def _row_shift_dependencies(self, node, sheet):
+        """
+        Formula columns of a table that a template formula reads in another row through a relative reference,
+        including rows above the template row (which read the header cell for the first row).
+        """
+        kind = node[0]
+        table = self.tables[sheet]
+        if kind == 'ref':
+            _, ref_sheet, row, col, row_abs = node
+            if ref_sheet == sheet and not row_abs and row != table.start_row and col in table.formulas:
+                return {(sheet, col)}
+            return set()
+        deps = set()
+        if kind == 'func':
+            for arg in node[2]:
+                deps |= self._row_shift_dependencies(arg, sheet)
+        elif kind in ('binop', 'cmp'):
+            deps |= self._row_shift_dependencies(node[2], sheet) | self._row_shift_dependencies(node[3], sheet)
+        elif kind in ('neg', 'pct'):
+            deps |= self._row_shift_dependencies(node[1], sheet)
+        return deps
+
+    def _cell_dependencies(self, sheet, r1, c1, r2, c2, seen):
+        deps = set()
+        table = self.tables.get(sheet)
+        for col in range(c1, c2 + 1):
+            if table is not None and col in table.formulas and (r2 is None or r2 >= table.start_row):
+                deps.add((sheet, col))
+
+        # Formula cells of constant regions may themselves depend on table columns
+        for row, col in self._formula_cells(sheet):
+            if c1 <= col <= c2 and (r1 is None or row >= r1) and (r2 is None or row <= r2):
+                deps |= self._formula_cell_dependencies(sheet, row, col, seen)
+        return deps
+
+    def _formula_cells(self, sheet):
+        if sheet not in self._formula_index:
+            self._formula_index[sheet] = [key for key, value in self.cells.get(sheet, {}).items() if _is_formula(value)]
+        return self._formula_index[sheet]
+
+    def _formula_cell_dependencies(self, sheet, row, col, seen):
+        key = (sheet, row, col)
+        if key in self._cell_deps:
+            return self._cell_deps[key]
+        if key in seen:
+            raise FormulaError(f"Circular reference at {sheet}!R{row}C{col}")
+        seen.add(key)
+        deps = self._column_dependencies(self._compiled_cell(sheet, row, col), seen)
+        seen.discard(key)
+        self._cell_deps[key] = deps
+        return deps
+
+    def _column_locality(self, sheet, col):
+        """
+        Whether a formula column of a table only reads its own row and table-independent constants.
+
+        Returns:
+            (is_local, {input column: 'content' or 'presence'}) where 'presence' marks input columns that
+            are only tested for blanks (e.g. IF($A4="","",...)), so their values do not affect the result.
+        """
+        key = (sheet, col)
+        if key not in self._locality:
+            usage = {}
+            is_local = self._local_usage(self._nodes[key], sheet, usage)
+            self._locality[key] = (is_local, usage)
+        return self._locality[key]
+
+    def _same_row(self, node, sheet):
+        table = self.tables[sheet]
+        return node[0] == 'ref' and node[1] == sheet and node[2] == table.start_row and not node[4]
+
+    def _local_column(self, sheet, col, usage, use):
+        table = self.tables[sheet]
+        if col <= table.n_inputs:
+            if use == 'content' or col not in usage:
+                usage[col] = use
+            return True
+        if col in table.formulas:
+            is_local, inner = self._column_locality(sheet, col)
+            for c, u in inner.items():
+                self._local_column(sheet, c, usage, u)
+            return is_local
+        return True  # Blank column
+
+    def _is_constant(self, sheet, r1, c1, r2, c2):
+        table = self.tables.get(sheet)
+        if table is not None and (r2 is None or r2 >= table.start_row):
+            if any(c in table.columns for c in range(c1, c2 + 1)):
+                return False
+        return not self._cell_dependencies(sheet, r1, c1, r2, c2, set())
+
+    def _local_usage(self, node, sheet, usage):
+        kind = node[0]
+        if kind == 'cmp' and node[1] in ('=', '<>'):
+            for ref, other in ((node[2], node[3]), (node[3], node[2])):
+                if other == ('str', '') and self._same_row(ref, sheet):
+                    return self._local_column(sheet, ref[3], usage, 'presence')
+        if kind == 'func' and node[1] == 'ISBLANK' and len(node[2]) == 1 and self._same_row(node[2][0], sheet):
+            return self._local_column(sheet, node[2][0][3], usage, 'presence')
+
+        if kind == 'ref':
+            if self._same_row(node, sheet):
+                return self._local_column(sheet, node[3], usage, 'content')
+            if node[1] == sheet and not node[4] and node[3] in self.tables[sheet].columns:
+                return False  # Another row of the table (e.g. a running total), depends on the neighbouring rows
+            return self._is_constant(node[1], node[2], node[3], node[2], node[3])
+        if kind == 'range':
+            _, ref_sheet, r1, c1, r2, c2, row_abs = node
+            table = self.tables[sheet]
+            if ref_sheet == sheet and r1 == r2 == table.start_row and not row_abs:
+                return all([self._local_column(sheet, c, usage, 'content') for c in range(c1, c2 + 1)])
+            return self._is_constant(ref_sheet, r1, c1, r2, c2)
+        if kind == 'func':
+            return all([self._local_usage(arg, sheet, usage) for arg in node[2]])
+        if kind in ('binop', 'cmp'):
+            return all([self._local_usage(node[2], sheet, usage), self._local_usage(node[3], sheet, usage)])
+        if kind in ('neg', 'pct'):
+            return self._local_usage(node[1], sheet, usage)
+        return True
+
+    def column_layout(self):
+        """
+        Short hash of the row-local columns and row key columns of every table, i.e. of the layout of the
+        values a row cache entry holds.
+        """
+        layout = [(sheet, [col for s, col in self.order if s == sheet and col in self.row_local[sheet]], self.row_key_columns[sheet])
+                  for sheet in sorted(self.row_key_columns)]
+        return hashlib.blake2b(repr(layout).encode(), digest_size=8).hexdigest()
+
+    def row_key(self, sheet, row):
+        """
+        Content hash of an input row as seen by the row-local columns of a table.
+
+        Names (design set, part name) drop out of the key whenever the workbook only tests them for blanks,
+        so identical parts of different designs share one cache entry.
+        """
+        content, presence = self.row_key_columns[sheet]
+        values = tuple(_canonical(row[c - 1] if c - 1 < len(row) else None) for c in content)
+        present = tuple(c - 1 < len(row) and row[c - 1] not in (None, '') for c in presence)
+        text = repr((sheet, values, present))
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    # ------------------------------------------------------------------ #
+    # Evaluation
+    # ------------------------------------------------------------------ #
+    def evaluate(self, part_entries, joint_entries=None, submodule_type=gd.WATER_COLLECTION_WELDED, cache=None):
+        """
+        Cost a batch of part and joint entries.
+
+        Args:
+            cache: Optional RowCostCache; rows whose content was already costed are not recalculated
+
+        Returns:
+            List of Summary rows (columns 1-11), one per distinct part set, like update_and_read_excel
+        """
+        design_sets = list(dict.fromkeys(entry[0] for entry in part_entries))
+        summary_entries = [[design_set, submodule_type] for design_set in design_sets]
+        columns = self.evaluate_tables({
+            PART_SHEET: part_entries,
+            JOINT_SHEET: joint_entries or [],
+            SUMMARY_SHEET: summary_entries,
+        }, cache=cache)
+        return self.summary_rows(columns, len(design_sets))
+
+    def summary_rows(self, columns, n_rows):
+        """
+        Convert evaluated Summary columns to rows of Python values.
+        """
+        return self.table_rows(columns, SUMMARY_SHEET, n_rows, SUMMARY_OUTPUT_COLUMNS)
+
+    def table_rows(self, columns, sheet, n_rows, n_cols, first=0):
+        """
+        Convert evaluated columns of a table to rows of Python values.
+
+        Args:
+            columns: Result of evaluate_tables
+            first: Index of the first row to convert (0 is the table start row)
+        """
+        outputs = []
+        for col in range(1, n_cols + 1):
+            values = columns.get((sheet, col))
+            if values is None:
+                values = []
+            values = [_to_python(v) for v in values[first:first + n_rows]]
+            outputs.append(values + [None] * (n_rows - len(values)))
+        return [list(row) for row in zip(*outputs)]
+
+    def evaluate_tables(self, entries, cache=None):
+        """
+        Evaluate every formula column for the given table rows.
+
+        Args:
+            entries: {sheet_name: list of input rows} for each table sheet
+            cache: Optional RowCostCache for the row-local columns
+
+        Returns:
+            {(sheet_name, col): 1D array} with input and formula columns
+        """
+        self._columns = {}
+        self._rows = {}
+        self._constants = {k: v for k, v in self._constants.items() if v[1]}  # Keep table-independent constants
+        for sheet, table in self.tables.items():
+            rows = entries.get(sheet) or []
+            self._rows[sheet] = len(rows)
+            for col in range(1, table.n_inputs + 1):
+                self._columns[(sheet, col)] = _input_column(rows, col - 1)
+
+        with np.errstate(all='ignore'):
+            cached = {}
+            if cache is not None:
+                for sheet in self.tables:
+                    cached.update(self._cached_columns(sheet, entries.get(sheet) or [], cache))
+            for sheet, col in self.order:
+                if (sheet, col) in cached:
+                    self._columns[(sheet, col)] = cached[(sheet, col)]
+                    continue
+                if (sheet, col) in self.recurrent:
+                    self._columns[(sheet, col)] = self._eval_recurrence(sheet, col)
+                    continue
+                result = self._eval(self._nodes[(sheet, col)], sheet)
+                self._columns[(sheet, col)] = _as_column(result, self._rows[sheet])
+        return self._columns
+
+    def _eval_recurrence(self, sheet, col):
+        """
+        Column that reads itself in other rows, evaluated to its fixed point: every pass settles at least one
+        more row (starting from the row next to the header), so at most n_rows + 1 passes are needed.
+        """
+        n = self._rows[sheet]
+        values = np.full(n, None, dtype=object)
+        for _ in range(n + 1):
+            self._columns[(sheet, col)] = values
+            updated = _as_column(self._eval(self._nodes[(sheet, col)], sheet), n)
+            if _same_values(updated, values):
+                break
+            values = updated
+        return values
+
+    def _cached_columns(self, sheet, rows, cache):
+        """
+        Row-local columns of a table, evaluated only for rows missing from the cache.
+        """
+        columns = [col for s, col in self.order if s == sheet and col in self.row_local[sheet]]
+        if not columns or not rows:
+            return {}
+
+        keys = [self.row_key(sheet, row) for row in rows]
+        values = [cache.get(key) for key in keys]
+        missing = [i for i, v in enumerate(values) if v is None]
+        if missing:
+            # Row-local columns never look outside their row, so the missing rows can be evaluated on their own
+            full_columns, full_rows = self._columns, self._rows[sheet]
+            table = self.tables[sheet]
+            self._columns = {(sheet, col): _input_column([rows[i] for i in missing], col - 1) for col in range(1, table.n_inputs + 1)}
+            self._rows[sheet] = len(missing)
+            try:
+                for col in columns:
+                    self._columns[(sheet, col)] = _as_column(self._eval(self._nodes[(sheet, col)], sheet), len(missing))
+                computed = [self._columns[(sheet, col)] for col in columns]
+            finally:
+                self._columns, self._rows[sheet] = full_columns, full_rows
+            for j, i in enumerate(missing):
+                values[i] = tuple(_to_cached(column[j]) for column in computed)
+                cache.put(keys[i], values[i])
+
+        return {(sheet, col): _as_array([v[k] for v in values]) for k, col in enumerate(columns)}
+
+    def _eval(self, node, table):
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return node[1]
+        if kind == 'err':
+            return np.nan
+        if kind == 'missing':
+            return None
+        if kind == 'ref':
+            return self._eval_ref(node, table)
+        if kind == 'range':
+            return self._eval_range(node, table)
+        if kind == 'neg':
+            return -_num(self._eval(node[1], table))
+        if kind == 'pct':
+            return _num(self._eval(node[1], table)) / 100
+        if kind == 'binop':
+            return _binop(node[1], self._eval(node[2], table), self._eval(node[3], table))
+        if kind == 'cmp':
+            return _compare(node[1], self._eval(node[2], table), self._eval(node[3], table))
+        if kind == 'func':
+            args = [self._eval(arg, table) for arg in node[2]]
+            return _FUNCTIONS[node[1]](*args)
+        raise FormulaError(f"Unknown expression {kind}")
+
+    def _eval_ref(self, node, table):
+        _, sheet, row, col, row_abs = node
+        spec = self.tables.get(sheet)
+        if spec is not None and col in spec.columns and (row >= spec.start_row or (sheet == table and not row_abs)):
+            values = self._columns.get((sheet, col))
+            if values is None:
+                raise FormulaError(f"Circular reference to {sheet} column {col}")
+            if sheet == table and not row_abs:
+                return self._shifted_column(spec, col, row - spec.start_row)[:, None]
+            index = row - spec.start_row
+            return values[index] if index < len(values) else None
+        return self._constant(sheet, row, col)
+
+    def _shifted_column(self, spec, col, offset):
+        values = self._columns[(spec.sheet, col)]
+        if offset == 0:
+            return values
+        n = len(values)
+        shifted = np.empty(n, dtype=object)
+        for i in range(n):
+            index = i + offset
+            if 0 <= index < n:
+                shifted[i] = values[index]
+            elif index < 0:
+                shifted[i] = self._constant(spec.sheet, spec.start_row + index, col)
+            else:
+                shifted[i] = None
+        return shifted
+
+    def _eval_range(self, node, table):
+        _, sheet, r1, c1, r2, c2, row_abs = node
+        spec = self.tables.get(sheet)
+        if spec is not None and sheet == table and r1 == r2 == spec.start_row and not row_abs:
+            # Same-row block of the current table, e.g. SUM(F4:H4)
+            block = [self._shifted_column(spec, col, 0) if col in spec.columns else np.full(self._rows[sheet], None)
+                     for col in range(c1, c2 + 1)]
+            return np.stack(block, axis=1)
+        return _Area([self._range_column(sheet, col, r1, r2) for col in range(c1, c2 + 1)])
+
+    def _range_column(self, sheet, col, r1, r2):
+        r1 = 1 if r1 is None else r1
+        spec = self.tables.get(sheet)
+        if spec is not None and col in spec.columns:
+            header_end = spec.start_row - 1 if r2 is None else min(r2, spec.start_row - 1)
+            header = [self._constant(sheet, row, col) for row in range(r1, header_end + 1)]
+            data = self._columns[(sheet, col)]
+            start = max(r1 - spec.start_row, 0)
+            stop = len(data) if r2 is None else max(min(r2 - spec.start_row + 1, len(data)), start)
+            data = data[start:stop]
+            return np.concatenate([np.array(header, dtype=object), data.astype(object)]) if header else data
+
+        if r2 is None:
+            rows = [row for (row, c) in self.cells.get(sheet, {}) if c == col]
+            r2 = max(rows, default=r1 - 1)
+        values = [self._constant(sheet, row, col) for row in range(r1, r2 + 1)]
+        return _as_array(values)
+
+    def _constant(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key in self._constants:
+            return self._constants[key][0]
+        value = self.cells.get(sheet, {}).get((row, col))
+        independent = True
+        if _is_formula(value):
+            node = self._compiled_cell(sheet, row, col)
+            independent = not self._formula_cell_dependencies(sheet, row, col, set())
+            result = self._eval(node, sheet)
+            if isinstance(result, _Area):
+                result = result.value()
+            value = np.asarray(result, dtype=object).ravel()[0] if np.ndim(result) else result
+        self._constants[key] = (value, independent)
+        return value
+
+
+# ---------------------------------------------------------------------- #
+# Parsing
+# ---------------------------------------------------------------------- #
+_PRECEDENCE = {
+    '=': 1, '<>': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+    '&': 2, '+': 3, '-': 3, '*': 4, '/': 4, '^': 5,
+}
+_COMPARISONS = {'=', '<>', '<', '>', '<=', '>='}
+
+_SHEET_RE = re.compile(r"^(?:(?P<sheet>'(?:[^']|'')+'|[^!']+)!)?(?P<ref>[^!]+)$")
+_CELL_RE = re.compile(r"^(\$?)([A-Za-z]{1,3})(\$?)(\d+)$")
+_COLUMNS_RE = re.compile(r"^\$?([A-Za-z]{1,3}):\$?([A-Za-z]{1,3})$")
+
+
+def _parse_reference(text):
+    match = _SHEET_RE.match(text)
+    if match is None:
+        raise FormulaError(f"Unsupported reference '{text}'")
+    sheet = match.group('sheet')
+    if sheet is not None and sheet.startswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    ref = match.group('ref')
+
+    cell = _CELL_RE.match(ref)
+    if cell:
+        return ('ref', sheet, int(cell.group(4)), column_index_from_string(cell.group(2).upper()), bool(cell.group(3)))
+
+    columns = _COLUMNS_RE.match(ref)
+    if columns:
+        c1, c2 = (column_index_from_string(c.upper()) for c in columns.groups())
+        return ('range', sheet, None, min(c1, c2), None, max(c1, c2), True)
+
+    if ':' in ref:
+        first, last = ref.split(':', 1)
+        start, end = _CELL_RE.match(first), _CELL_RE.match(last)
+        if start and end:
+            r1, r2 = int(start.group(4)), int(end.group(4))
+            c1 = column_index_from_string(start.group(2).upper())
+            c2 = column_index_from_string(end.group(2).upper())
+            return ('range', sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2), bool(start.group(3)))
+        raise FormulaError(f"Unsupported range '{text}'")
+
+    if sheet is None and re.match(r'^[A-Za-z_\\][\w.]*$', ref):
+        return ('name', ref)
+    raise FormulaError(f"Unsupported reference '{text}'")
+
+
+class _Parser:
+    """Precedence-climbing parser over the openpyxl formula tokenizer."""
+    def __init__(self, formula):
+        try:
+            items = Tokenizer(formula).items
+        except Exception as e:
+            raise FormulaError(f"Cannot tokenize formula: {e}") from None
+        self.tokens = [t for t in items if t.type != Token.WSPACE]
+        self.pos = 0
+
+    def parse(self):
+        node = self._expression(0)
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"Unexpected token '{self.tokens[self.pos].value}'")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise FormulaError("Unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def _expression(self, min_precedence):
+        left = self._unary()
+        while True:
+            token = self._peek()
+            if token is None:
+                return left
+            if token.type == Token.OP_POST:
+                self.pos += 1
+                left = ('pct', left)
+                continue
+            if token.type != Token.OP_IN or token.value not in _PRECEDENCE:
+                return left
+            precedence = _PRECEDENCE[token.value]
+            if precedence < min_precedence:
+                return left
+            self.pos += 1
+            right = self._expression(precedence + 1)
+            kind = 'cmp' if token.value in _COMPARISONS else 'binop'
+            left = (kind, token.value, left, right)
+
+    def _unary(self):
+        token = self._peek()
+        if token is not None and token.type == Token.OP_PRE:
+            self.pos += 1
+            operand = self._unary()
+            return ('neg', operand) if token.value == '-' else operand
+        return self._operand()
+
+    def _operand(self):
+        token = self._next()
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ('num', float(token.value))
+            if token.subtype == Token.TEXT:
+                return ('str', token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ('bool', token.value.upper() == 'TRUE')
+            if token.subtype == Token.ERROR:
+                return ('err', token.value)
+            return _parse_reference(token.value)
+
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            name = token.value[:-1].upper()
+            for prefix in ('_XLFN.', '_XLWS.'):
+                if name.startswith(prefix):
+                    name = name[len(prefix):]
+            return ('func', name, self._arguments())
+
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self._expression(0)
+            closing = self._next()
+            if closing.type != Token.PAREN:
+                raise FormulaError("Unbalanced parentheses")
+            return node
+
+        raise FormulaError(f"Unsupported token '{token.value}'")
+
+    def _arguments(self):
+        args = []
+        while True:
+            token = self._peek()
+            if token is None:
+                raise FormulaError("Unterminated function call")
+            if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                self.pos += 1
+                if args:
+                    args.append(('missing',))
+                return args
+            if token.type == Token.SEP and token.subtype == Token.ARG:
+                self.pos += 1
+                args.append(('missing',))
+                continue
+            args.append(self._expression(0))
+            token = self._next()
+            if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                return args
+            if not (token.type == Token.SEP and token.subtype == Token.ARG):
+                raise FormulaError(f"Unexpected token '{token.value}' in arguments")
+
+
+def _same_values(a, b):
+    """Element-wise equality of two object columns, NaN (Excel errors) included."""
+    return len(a) == len(b) and all(x is y or x == y or (x != x and y != y) for x, y in zip(a, b))
+
+
+def _topological_order(dependencies):
+    order = []
+    state = {}
+
+    def visit(key, path):
+        if state.get(key) == 'done':
+            return
+        if state.get(key) == 'active':
+            raise FormulaError(f"Circular dependency between columns: {path + [key]}")
+        state[key] = 'active'
+        for dep in sorted(dependencies.get(key, ())):
+            if dep in dependencies:
+                visit(dep, path + [key])
+        state[key] = 'done'
+        order.append(key)
+
+    for key in sorted(dependencies):
+        visit(key, [])
+    return order
+
+
+# ---------------------------------------------------------------------- #
+# Value helpers
+#
+# Values are Python scalars, 2D arrays of shape (rows of the evaluated table, elements of a range) or _Area
+# blocks. Excel errors are represented as NaN and propagate through arithmetic.
+# ---------------------------------------------------------------------- #
+def _is_formula(value):
+    return isinstance(value, str) and value.startswith('=') and len(value) > 1
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _as_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    if all(_is_number(v) for v in values):
+        return array.astype(float)
+    return array
+
+
+def _input_column(rows, index):
+    return _as_array([row[index] if index < len(row) else None for row in rows])
+
+
+def _array(value):
+    """Array view of a value; text arrays are kept as objects so they never coerce numbers to text."""
+    array = value.value() if isinstance(value, _Area) else np.asarray(value)
+    if array.dtype.kind in 'USV':
+        array = array.astype(object)
+    return array
+
+
+def _map(function, array, dtype):
+    return np.asarray(np.frompyfunc(function, 1, 1)(array), dtype=dtype)
+
+
+def _as_column(result, n_rows):
+    array = _array(result)
+    if array.ndim == 2:
+        if array.shape[1] != 1:
+            raise FormulaError("Formula returned a range where a single value was expected")
+        array = array[:, 0]
+    if array.ndim == 0 or len(array) == 1:
+        array = np.broadcast_to(array.reshape(-1)[:1], (n_rows,))
+    if array.dtype.kind in 'fiu':
+        return array.astype(float)
+    if array.dtype.kind == 'b':
+        return array.copy()
+    return _as_array(list(array))
+
+
+def _to_float(value):
+    if value is None:
+        return 0.0
+    if isinstance(value, (bool, np.bool_, int, float, np.number)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _num(value):
+    """Coerce a value to a float array for arithmetic (text becomes an error)."""
+    array = _array(value)
+    if array.dtype.kind in 'fiub':
+        return array.astype(float)
+    return _map(_to_float, array, float)
+
+
+def _numeric_only(value):
+    """Numbers of a value, with text, blanks and booleans counted as 0 (SUM/SUMPRODUCT semantics)."""
+    array = _array(value)
+    if array.dtype.kind in 'fiu':
+        return array.astype(float)
+    if array.dtype.kind == 'b':
+        return np.zeros(array.shape)
+    return _map(lambda v: float(v) if _is_number(v) else 0.0, array, float)
+
+
+def _numbers_mask(value):
+    array = _array(value)
+    if array.dtype.kind in 'fiu':
+        return ~np.isnan(array.astype(float))
+    if array.dtype.kind == 'b':
+        return np.zeros(array.shape, dtype=bool)
+    return _map(lambda v: _is_number(v) and v == v, array, bool)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if _is_number(value):
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def _binop(op, a, b):
+    if op == '&':
+        return np.add(_map(_text, _array(a).astype(object), object), _map(_text, _array(b).astype(object), object))
+    x, y = _num(a), _num(b)
+    if op == '+':
+        return x + y
+    if op == '-':
+        return x - y
+    if op == '*':
+        return x * y
+    if op == '/':
+        return np.where(y == 0, np.nan, x / np.where(y == 0, 1.0, y))
+    if op == '^':
+        return np.power(x, y)
+    raise FormulaError(f"Unsupported operator {op}")
+
+
+def _rank(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def _compare_scalar(op, x, y):
+    if x is None:
+        x = '' if isinstance(y, str) else False if isinstance(y, (bool, np.bool_)) else 0.0
+    if y is None:
+        y = '' if isinstance(x, str) else False if isinstance(x, (bool, np.bool_)) else 0.0
+    if isinstance(x, float) and x != x or isinstance(y, float) and y != y:
+        return False
+    rx, ry = _rank(x), _rank(y)
+    if rx != ry:
+        x, y = rx, ry
+    elif rx == 1:
+        x, y = x.lower(), y.lower()
+    if op == '=':
+        return x == y
+    if op == '<>':
+        return x != y
+    if op == '<':
+        return x < y
+    if op == '>':
+        return x > y
+    if op == '<=':
+        return x <= y
+    return x >= y
+
+
+_NUMERIC_COMPARISONS = {
+    '=': np.equal, '<>': np.not_equal, '<': np.less, '>': np.greater, '<=': np.less_equal, '>=': np.greater_equal,
+}
+
+
+def _compare(op, a, b):
+    x, y = _array(a), _array(b)
+    if x.dtype.kind in 'fiu' and y.dtype.kind in 'fiu':
+        return _NUMERIC_COMPARISONS[op](x.astype(float), y.astype(float))
+    compare = np.frompyfunc(lambda u, v: _compare_scalar(op, u, v), 2, 1)
+    return np.asarray(compare(x.astype(object), y.astype(object)), dtype=bool)
+
+
+def _truth(value):
+    """Truth value and error mask of a condition."""
+    array = _array(value)
+    if array.dtype.kind == 'b':
+        return array, np.zeros(array.shape, dtype=bool)
+    numbers = _num(array)
+    return numbers != 0, np.isnan(numbers)
+
+
+def _where(condition, a, b):
+    truth, error = _truth(condition)
+    a, b = _array(a), _array(b)
+    if a.dtype != b.dtype and not (a.dtype.kind in 'fiu' and b.dtype.kind in 'fiu'):
+        a, b = a.astype(object), b.astype(object)
+    result = np.where(truth, a, b)
+    if error.any():
+        result = np.where(error, np.nan, result.astype(object) if result.dtype.kind not in 'fiu' else result)
+    return result
+
+
+def _row_vector(value):
+    """One entry per evaluated row (1D) of a criteria or lookup argument."""
+    array = _array(value)
+    if array.ndim == 2:
+        if array.shape[1] != 1:
+            raise FormulaError("Criteria and lookup values must be single cells")
+        array = array[:, 0]
+    return np.atleast_1d(array).astype(object)
+
+
+def _range_vector(value):
+    """Flatten a range argument to 1D."""
+    return _array(value).astype(object).ravel()
+
+
+def _key(value):
+    if value is None:
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return ('bool', bool(value))
+    if _is_number(value):
+        return float(value)
+    return str(value).lower()
+
+
+_CRITERIA_RE = re.compile(r'^(<=|>=|<>|<|>|=)(.*)$', re.S)
+
+
+def _criterion(value):
+    """Split a SUMIF-style criterion into an operator and an operand."""
+    op, operand = '=', value
+    if isinstance(value, str):
+        match = _CRITERIA_RE.match(value)
+        if match:
+            op, operand = match.groups()
+        try:
+            operand = float(operand)
+        except ValueError:
+            pass
+        if op in ('=', '<>') and isinstance(operand, str) and ('*' in operand or '?' in operand):
+            return ('like' if op == '=' else 'unlike'), re.compile(fnmatch.translate(operand.lower()), re.S)
+    return op, operand
+
+
+def _criterion_mask(values, criterion):
+    op, operand = criterion
+    if op in ('like', 'unlike'):
+        found = np.array([isinstance(v, str) and bool(operand.match(v.lower())) for v in values], dtype=bool)
+        return found if op == 'like' else ~found
+    if op in ('=', '<>'):
+        target = _key(operand)
+        found = np.array([_key(v) == target for v in values], dtype=bool)
+        return found if op == '=' else ~found
+    # Ordered criteria only match values of the same type (numbers with numbers, text with text)
+    return np.array([v is not None and _rank(v) == _rank(operand) and _compare_scalar(op, v, operand) for v in values], dtype=bool)
+
+
+class _Index:
+    """Positions of each distinct value of a range, for equality criteria and exact lookups."""
+    def __init__(self, values):
+        self.positions = {}
+        for i, v in enumerate(values):
+            self.positions.setdefault(_key(v), []).append(i)
+
+    def find(self, value):
+        return self.positions.get(_key(value), [])
+
+    def first(self, value):
+        found = self.find(value)
+        return found[0] if found else -1
+
+
+def _fit(values, n):
+    """Pad or truncate a range to n elements (sum ranges follow the size of the criteria range)."""
+    if len(values) >= n:
+        return values[:n]
+    return np.concatenate([values, np.full(n - len(values), None, dtype=object)])
+
+
+def _conditional(how, values, *pairs):
+    """
+    Vectorized SUMIFS/COUNTIFS/AVERAGEIFS/MAXIFS/MINIFS.
+
+    Every distinct combination of criteria scans the ranges once and equality criteria go through a
+    value index, so costing many designs against the same part list stays linear in the number of rows.
+    """
+    ranges = [_range_vector(pairs[i]) for i in range(0, len(pairs), 2)]
+    n_range = len(ranges[0])
+    ranges = [_fit(r, n_range) for r in ranges]
+    criteria = [_row_vector(pairs[i]) for i in range(1, len(pairs), 2)]
+    n = max(len(c) for c in criteria)
+    criteria = [np.broadcast_to(c, (n,)) for c in criteria]
+    if values is not None:
+        values = _fit(_range_vector(values), n_range)
+        numbers = _numeric_only(values)[_numbers_mask(values)]
+        selectable = np.flatnonzero(_numbers_mask(values))
+        lookup = np.full(n_range, -1)
+        lookup[selectable] = np.arange(len(selectable))
+
+    indexes = [None] * len(ranges)
+    results = {}
+    out = np.empty(n)
+    for row in range(n):
+        parsed = tuple(_criterion(c[row]) for c in criteria)
+        key = tuple((op, getattr(operand, 'pattern', None) or _key(operand)) for op, operand in parsed)
+        if key not in results:
+            mask = np.ones(n_range, dtype=bool)
+            for i, criterion in enumerate(parsed):
+                if criterion[0] == '=':
+                    if indexes[i] is None:
+                        indexes[i] = _Index(ranges[i])
+                    match = np.zeros(n_range, dtype=bool)
+                    match[indexes[i].find(criterion[1])] = True
+                    mask &= match
+                else:
+                    mask &= _criterion_mask(ranges[i], criterion)
+            if how == 'count':
+                results[key] = float(mask.sum())
+            else:
+                positions = lookup[mask]
+                selected = numbers[positions[positions >= 0]]
+                if how == 'sum':
+                    results[key] = float(selected.sum())
+                elif how == 'average':
+                    results[key] = float(selected.mean()) if len(selected) else np.nan
+                elif how == 'max':
+                    results[key] = float(selected.max()) if len(selected) else 0.0
+                else:
+                    results[key] = float(selected.min()) if len(selected) else 0.0
+        out[row] = results[key]
+    return out[:, None]
+
+
+def _area_block(area):
+    """(columns, rows) object array of an area argument."""
+    if isinstance(area, _Area):
+        block = np.empty((len(area.columns), len(area.columns[0]) if area.columns else 0), dtype=object)
+        for i, column in enumerate(area.columns):
+            block[i] = column
+        return block
+    array = _array(area).astype(object)
+    return array.reshape(1, -1) if array.ndim < 2 else array.T
+
+
+def _approximate_position(keys, lookups):
+    """Position of the largest key <= lookup in an ascending range (-1 when none)."""
+    numeric = np.flatnonzero(_numbers_mask(keys))
+    if len(numeric) == 0:
+        return np.full(len(lookups), -1)
+    found = np.searchsorted(_num(keys[numeric]), _num(lookups), side='right') - 1
+    return np.where(found >= 0, numeric[np.clip(found, 0, None)], -1)
+
+
+def _lookup_positions(keys, lookups, exact):
+    if exact:
+        index = _Index(keys)
+        return np.array([index.first(v) for v in lookups], dtype=int)
+    return _approximate_position(keys, lookups)
+
+
+def _gather(block, rows, cols):
+    rows, cols = np.broadcast_arrays(np.atleast_1d(np.asarray(rows, dtype=int)), np.atleast_1d(np.asarray(cols, dtype=int)))
+    valid = (rows >= 0) & (rows < block.shape[1]) & (cols >= 0) & (cols < block.shape[0])
+    result = np.full(rows.shape, np.nan, dtype=object)
+    result[valid] = block[cols[valid], rows[valid]]
+    return _as_array(list(result))[:, None]
+
+
+def _exact(flag):
+    """Exact match unless the range_lookup flag is TRUE/omitted."""
+    return flag is not None and not bool(np.all(_truth(flag)[0]))
+
+
+def _indices(value):
+    return _num(_row_vector(value)).astype(int) - 1
+
+
+def _vlookup(lookup, area, col_index, approximate=None):
+    block = _area_block(area)
+    positions = _lookup_positions(block[0], _row_vector(lookup), _exact(approximate))
+    return _gather(block, positions, _indices(col_index))
+
+
+def _hlookup(lookup, area, row_index, approximate=None):
+    block = _area_block(area).T
+    positions = _lookup_positions(block[0], _row_vector(lookup), _exact(approximate))
+    return _gather(block, positions, _indices(row_index))
+
+
+def _index(area, row, col=None):
+    block = _area_block(area)
+    if col is None:
+        if block.shape[1] == 1:  # Single row: the index selects a column
+            return _gather(block, 0, _indices(row))
+        return _gather(block, _indices(row), 0)
+    return _gather(block, _indices(row), _indices(col))
+
+
+def _match(lookup, area, match_type=None):
+    keys = _range_vector(area)
+    lookups = _row_vector(lookup)
+    match_type = 1 if match_type is None else int(np.ravel(_num(match_type))[0])
+    if match_type == 0:
+        positions = _lookup_positions(keys, lookups, True)
+    elif match_type == 1:
+        positions = _approximate_position(keys, lookups)
+    else:
+        # Descending range: smallest key >= lookup
+        numeric = np.flatnonzero(_numbers_mask(keys))
+        found = np.searchsorted(-_num(keys[numeric]), -_num(lookups), side='right') - 1
+        positions = np.where(found >= 0, numeric[np.clip(found, 0, None)], -1) if len(numeric) else np.full(len(lookups), -1)
+    return np.where(positions >= 0, positions + 1.0, np.nan)[:, None]
+
+
+def _xlookup(lookup, lookup_area, return_area, if_not_found=None, *_):
+    positions = _lookup_positions(_range_vector(lookup_area), _row_vector(lookup), True)
+    result = _gather(_range_vector(return_area).reshape(1, -1), positions, 0)
+    if if_not_found is not None:
+        result = _where((positions >= 0)[:, None], result, if_not_found)
+    return result
+
+
+def _reduce(values, how):
+    """SUM/COUNT/AVERAGE/MAX/MIN along the element axis (one result per evaluated row)."""
+    numbers, masks = [], []
+    for value in values:
+        if value is None:
+            continue
+        array = _array(value)
+        if array.ndim < 2:
+            array = array.reshape(1, -1)
+        numbers.append(_numeric_only(array))
+        masks.append(_numbers_mask(array))
+    if how == 'sum':
+        return sum(np.sum(n, axis=1, keepdims=True) for n in numbers)
+    count = sum(np.sum(m, axis=1, keepdims=True) for m in masks).astype(float)
+    if how == 'count':
+        return count
+    if how == 'average':
+        total = _reduce(values, 'sum')
+        return np.where(count == 0, np.nan, total / np.where(count == 0, 1.0, count))
+    pick, combine, fill = (np.max, np.maximum, -np.inf) if how == 'max' else (np.min, np.minimum, np.inf)
+    result = None
+    for n, m in zip(numbers, masks):
+        extreme = pick(np.where(m, n, fill), axis=1, keepdims=True, initial=fill)
+        result = extreme if result is None else combine(result, extreme)
+    return np.where(np.isinf(result), 0.0, result)
+
+
+def _counta(*values):
+    return sum(np.sum(np.atleast_2d(_map(lambda v: v is not None, _array(v), bool)), axis=1, keepdims=True) for v in values).astype(float)
+
+
+def _sumproduct(*arrays):
+    product = 1.0
+    for array in arrays:
+        product = product * _numeric_only(array)
+    return np.sum(np.atleast_2d(product), axis=1, keepdims=True)
+
+
+def _round(value, digits, mode):
+    x = _num(value)
+    scale = np.power(10.0, 0.0 if digits is None else _num(digits))
+    scaled = np.round(np.abs(x) * scale, 9)  # Guard against representation error (2.675 * 100 = 267.49999...)
+    if mode == 'up':
+        return np.sign(x) * np.ceil(scaled) / scale
+    if mode == 'down':
+        return np.sign(x) * np.floor(scaled) / scale
+    return np.sign(x) * np.floor(scaled + 0.5) / scale
+
+
+def _to_multiple(value, significance, rounding):
+    x = _num(value)
+    s = 1.0 if significance is None else _num(significance)
+    return np.where(s == 0, 0.0, rounding(np.round(x / np.where(s == 0, 1.0, s), 9)) * s)
+
+
+def _is_error(value):
+    array = _array(value)
+    if array.dtype.kind == 'f':
+        return np.isnan(array)
+    if array.dtype.kind in 'iub':
+        return np.zeros(array.shape, dtype=bool)
+    return _map(lambda v: isinstance(v, float) and v != v, array, bool)
+
+
+def _iferror(value, alternative):
+    return _where(_is_error(value), alternative, value)
+
+
+def _ifs(*args):
+    result = np.nan
+    for i in range(len(args) - 2, -1, -2):
+        result = _where(args[i], args[i + 1], result)
+    return result
+
+
+def _choose(index, *options):
+    positions = _num(index).astype(int) - 1
+    options = np.broadcast_arrays(*[_array(o).astype(object) for o in options])
+    return np.choose(np.clip(positions, 0, len(options) - 1), options)
+
+
+def _logical(how, *args):
+    result = None
+    for arg in args:
+        if arg is None:
+            continue
+        truth = np.atleast_2d(_truth(arg)[0])
+        truth = truth.all(axis=1, keepdims=True) if how == 'and' else truth.any(axis=1, keepdims=True)
+        result = truth if result is None else (result & truth if how == 'and' else result | truth)
+    return result
+
+
+def _concat(*args):
+    result = ''
+    for arg in args:
+        result = _binop('&', result, arg)
+    return result
+
+
+def _text_function(function):
+    return lambda value: _map(function, _array(value).astype(object), object)
+
+
+def _left(value, n=None):
+    count = np.broadcast_to(1 if n is None else _num(n).astype(int), np.shape(_array(value)))
+    return np.frompyfunc(lambda t, k: _text(t)[:k], 2, 1)(_array(value).astype(object), count)
+
+
+def _right(value, n=None):
+    count = np.broadcast_to(1 if n is None else _num(n).astype(int), np.shape(_array(value)))
+    return np.frompyfunc(lambda t, k: _text(t)[len(_text(t)) - k:] if k else '', 2, 1)(_array(value).astype(object), count)
+
+
+def _mid(value, start, length):
+    text = _array(value).astype(object)
+    start = np.broadcast_to(_num(start).astype(int) - 1, text.shape)
+    length = np.broadcast_to(_num(length).astype(int), text.shape)
+    return np.frompyfunc(lambda t, s, k: _text(t)[s:s + k], 3, 1)(text, start, length)
+
+
+def _find(needle, haystack, start=None, case_sensitive=True):
+    def find(n, h, s):
+        n, h = _text(n), _text(h)
+        if not case_sensitive:
+            n, h = n.lower(), h.lower()
+        position = h.find(n, int(s) - 1)
+        return float(position + 1) if position >= 0 else np.nan
+    start = 1.0 if start is None else _num(start)
+    return np.asarray(np.frompyfunc(find, 3, 1)(_array(needle).astype(object), _array(haystack).astype(object), start), dtype=float)
+
+
+def _substitute(text, old, new, *_):
+    replace = np.frompyfunc(lambda t, o, n: _text(t).replace(_text(o), _text(n)), 3, 1)
+    return replace(_array(text).astype(object), _array(old).astype(object), _array(new).astype(object))
+
+
+def _type_check(check):
+    return lambda value: _map(check, _array(value).astype(object), bool)
+
+
+def _safe(function, x, y=None):
+    """Apply a NumPy function with invalid inputs turned into errors."""
+    result = function(x) if y is None else function(x, y)
+    return np.where(np.isinf(result), np.nan, result)
+
+
+_FUNCTIONS = {
+    'IF': lambda c, a=True, b=False: _where(c, 0.0 if a is None else a, 0.0 if b is None else b),
+    'IFS': _ifs,
+    'IFERROR': _iferror,
+    'IFNA': _iferror,
+    'AND': lambda *a: _logical('and', *a),
+    'OR': lambda *a: _logical('or', *a),
+    'NOT': lambda a: ~_truth(a)[0],
+    'TRUE': lambda: True,
+    'FALSE': lambda: False,
+    'CHOOSE': _choose,
+    'SUM': lambda *a: _reduce(a, 'sum'),
+    'COUNT': lambda *a: _reduce(a, 'count'),
+    'COUNTA': _counta,
+    'AVERAGE': lambda *a: _reduce(a, 'average'),
+    'MAX': lambda *a: _reduce(a, 'max'),
+    'MIN': lambda *a: _reduce(a, 'min'),
+    'SUMPRODUCT': _sumproduct,
+    'SUMIF': lambda r, c, s=None: _conditional('sum', r if s is None else s, r, c),
+    'SUMIFS': lambda s, *p: _conditional('sum', s, *p),
+    'COUNTIF': lambda r, c: _conditional('count', None, r, c),
+    'COUNTIFS': lambda *p: _conditional('count', None, *p),
+    'AVERAGEIF': lambda r, c, s=None: _conditional('average', r if s is None else s, r, c),
+    'AVERAGEIFS': lambda s, *p: _conditional('average', s, *p),
+    'MAXIFS': lambda s, *p: _conditional('max', s, *p),
+    'MINIFS': lambda s, *p: _conditional('min', s, *p),
+    'VLOOKUP': _vlookup,
+    'HLOOKUP': _hlookup,
+    'INDEX': _index,
+    'MATCH': _match,
+    'XLOOKUP': _xlookup,
+    'ROUND': lambda x, d=None: _round(x, d, 'nearest'),
+    'ROUNDUP': lambda x, d=None: _round(x, d, 'up'),
+    'ROUNDDOWN': lambda x, d=None: _round(x, d, 'down'),
+    'TRUNC': lambda x, d=None: _round(x, d, 'down'),
+    'INT': lambda x: np.floor(_num(x)),
+    'CEILING': lambda x, s=None: _to_multiple(x, s, np.ceil),
+    'CEILING.MATH': lambda x, s=None, *_: _to_multiple(x, s, np.ceil),
+    'FLOOR': lambda x, s=None: _to_multiple(x, s, np.floor),
+    'FLOOR.MATH': lambda x, s=None, *_: _to_multiple(x, s, np.floor),
+    'ABS': lambda x: np.abs(_num(x)),
+    'SQRT': lambda x: _safe(np.sqrt, _num(x)),
+    'POWER': lambda x, y: _safe(np.power, _num(x), _num(y)),
+    'MOD': lambda x, y: np.where(_num(y) == 0, np.nan, np.mod(_num(x), np.where(_num(y) == 0, 1.0, _num(y)))),
+    'EXP': lambda x: _safe(np.exp, _num(x)),
+    'LN': lambda x: _safe(np.log, _num(x)),
+    'LOG10': lambda x: _safe(np.log10, _num(x)),
+    'PI': lambda: np.pi,
+    'ISNUMBER': _numbers_mask,
+    'ISTEXT': _type_check(lambda v: isinstance(v, str)),
+    'ISBLANK': _type_check(lambda v: v is None),
+    'ISERROR': _is_error,
+    'ISNA': _is_error,
+    'CONCATENATE': _concat,
+    'CONCAT': _concat,
+    'LEN': _text_function(lambda v: float(len(_text(v)))),
+    'UPPER': _text_function(lambda v: _text(v).upper()),
+    'LOWER': _text_function(lambda v: _text(v).lower()),
+    'TRIM': _text_function(lambda v: ' '.join(_text(v).split())),
+    'VALUE': _num,
+    'LEFT': _left,
+    'RIGHT': _right,
+    'MID': _mid,
+    'FIND': _find,
+    'SEARCH': lambda n, h, s=None: _find(n, h, s, case_sensitive=False),
+    'SUBSTITUTE': _substitute,
+}
+
+
+def _canonical(value):
+    """Hashable, representation-stable form of an input value."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if _is_number(value):
+        return float(f"{float(value):.12g}")
+    return value
+
+
+def _to_cached(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _to_python(value):
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if _is_number(value):
+        value = float(value)
+        return None if value != value else value
+    return value
@@ -0,0 +1,148 @@
+"""
+Versioned parameter pack of the cost calculator workbook.
+
+Material prices, labor rates, process lookup tables and the template formulas of the cost calculator are
+extracted once into a compact .npz snapshot keyed by the workbook file hash. Loading the snapshot takes
+milliseconds and it is rebuilt automatically whenever the workbook changes.
+"""
+import hashlib
+import os
+import numpy as np # type: ignore
+from cost_engine import CostEngine, read_workbook_cells
+import config as cfg
+
+PACK_VERSION = 1
+
+_NUMBER, _TEXT, _BOOL = 0, 1, 2
+
+
+def workbook_hash(filepath):
+    """
+    SHA-256 of the workbook file contents.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pack_path(filepath, file_hash, cache_dir=None):
+    cache_dir = cfg.cost_cache_dir if cache_dir is None else cache_dir
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(cache_dir, f"{name}.{file_hash[:16]}.v{PACK_VERSION}.npz")
+
+
+def build_parameter_pack(filepath, path, file_hash=None, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Extract the workbook parameters into an .npz snapshot at path.
+
+    Only the constant regions and the template row of each table are stored; the copied-down formulas
+    below the template rows are dropped. The workbook is compiled once to validate every formula.
+    """
+    cells, names = read_workbook_cells(filepath)
+    engine = CostEngine(cells, names, part_start_row=part_start_row, joint_start_row=joint_start_row, summary_row=summary_row)
+    cells = engine.template_cells()
+
+    sheets = list(cells)
+    sheet_ids, rows, cols, kinds, numbers, texts = [], [], [], [], [], []
+    for sheet_id, sheet in enumerate(sheets):
+        for (row, col), value in cells[sheet].items():
+            sheet_ids.append(sheet_id)
+            rows.append(row)
+            cols.append(col)
+            if isinstance(value, bool):
+                kinds.append(_BOOL)
+                numbers.append(float(value))
+                texts.append('')
+            elif isinstance(value, (int, float)):
+                kinds.append(_NUMBER)
+                numbers.append(float(value))
+                texts.append('')
+            else:
+                kinds.append(_TEXT)
+                numbers.append(0.0)
+                texts.append(str(value))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        version=np.array(PACK_VERSION),
+        workbook_hash=np.array(file_hash or workbook_hash(filepath)),
+        start_rows=np.array([part_start_row, joint_start_row, summary_row], dtype=np.int32),
+        sheets=np.array(sheets, dtype=str),
+        cell_sheet=np.array(sheet_ids, dtype=np.int16),
+        cell_row=np.array(rows, dtype=np.int32),
+        cell_col=np.array(cols, dtype=np.int32),
+        cell_kind=np.array(kinds, dtype=np.int8),
+        cell_number=np.array(numbers, dtype=np.float64),
+        cell_text=np.array(texts, dtype=str),
+        name_keys=np.array(list(names), dtype=str),
+        name_values=np.array(list(names.values()), dtype=str),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_parameter_pack(path):
+    """
+    Read a parameter pack.
+
+    Returns:
+        cells: {sheet_name: {(row, col): value}}
+        names: {NAME: reference text}
+        meta: {'version', 'workbook_hash', 'start_rows'}
+    """
+    with np.load(path, allow_pickle=False) as pack:
+        sheets = [str(s) for s in pack['sheets']]
+        cells = {sheet: {} for sheet in sheets}
+        kinds = pack['cell_kind']
+        numbers = pack['cell_number']
+        texts = pack['cell_text']
+        for i, (sheet_id, row, col) in enumerate(zip(pack['cell_sheet'].tolist(), pack['cell_row'].tolist(), pack['cell_col'].tolist())):
+            kind = kinds[i]
+            if kind == _NUMBER:
+                value = float(numbers[i])
+            elif kind == _BOOL:
+                value = bool(numbers[i])
+            else:
+                value = str(texts[i])
+            cells[sheets[sheet_id]][(row, col)] = value
+        names = dict(zip((str(k) for k in pack['name_keys']), (str(v) for v in pack['name_values'])))
+        meta = {
+            'version': int(pack['version']),
+            'workbook_hash': str(pack['workbook_hash']),
+            'start_rows': tuple(int(r) for r in pack['start_rows']),
+        }
+    return cells, names, meta
+
+
+def load_parameter_pack(filepath, cache_dir=None, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Load the parameter pack of a workbook, building it first if the workbook changed since the last build.
+    """
+    file_hash = workbook_hash(filepath)
+    path = pack_path(filepath, file_hash, cache_dir)
+    start_rows = (part_start_row, joint_start_row, summary_row)
+    if os.path.exists(path):
+        try:
+            cells, names, meta = read_parameter_pack(path)
+            if meta['version'] == PACK_VERSION and meta['workbook_hash'] == file_hash and meta['start_rows'] == start_rows:
+                return cells, names, meta
+        except Exception as e:  # Truncated or corrupt packs (BadZipFile, EOFError, ...) are rebuilt
+            print(f"Rebuilding unreadable parameter pack {path}: {e}")
+
+    print(f"Extracting cost calculator parameters to {path}...")
+    build_parameter_pack(filepath, path, file_hash, *start_rows)
+    return read_parameter_pack(path)
+
+
+def load_packed_engine(filepath, cache_dir=None, part_start_row=4, joint_start_row=4, summary_row=2):
+    """
+    Build a CostEngine from the workbook parameter pack (no workbook parsing when the pack is current).
+    """
+    cells, names, meta = load_parameter_pack(filepath, cache_dir, part_start_row, joint_start_row, summary_row)
+    engine = CostEngine(cells, names, part_start_row=part_start_row, joint_start_row=joint_start_row, summary_row=summary_row)
+    engine.workbook_hash = meta['workbook_hash']
+    return engine
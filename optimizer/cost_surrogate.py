@@ -0,0 +1,251 @@
+"""
+Learned cost surrogate for pre-screening candidate designs.
+
+A ridge regression on per-design part features (sheet mass and area per material, cut length per cutting
+process, bends per forming process, part counts per assembly class and joint length), fit on the Summary
+costs of every design the calculator has costed. Its error is measured on a random holdout of candidates
+outside the selection; until that error is small enough it only re-orders the lightest candidates, once
+validated it ranks every sound frame and floor. Candidates outside the trained feature range are not priced.
+"""
+import hashlib
+import os
+import numpy as np # type: ignore
+from capabilities import Capabilities
+from cost_params import workbook_hash
+import config as cfg
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if np.isfinite(value) else 0.0
+
+
+def design_features(part_entries, joint_entries=()):
+    """
+    Feature vector of one design from its part and joint entries.
+
+    Returns:
+        {feature_name: value}
+    """
+    features = {'bias': 1.0}
+
+    def add(name, value):
+        features[name] = features.get(name, 0.0) + value
+
+    for entry in part_entries:
+        qty = _number(entry[2])
+        area = qty * _number(entry[11]) * _number(entry[12])
+        try:
+            cap = Capabilities(material=entry[5], gauge=int(entry[6]))
+            density = cap.density[cap.gauge_material]
+        except (KeyError, TypeError, ValueError):
+            density = 0.0
+        add(f"mass|{entry[5]}", area * density)
+        add(f"area|{entry[5]}", area)
+        add(f"cut|{entry[3]}", qty * _number(entry[8]))
+        add(f"count|{entry[3]}", qty)
+        add(f"bends|{entry[4]}", qty * _number(entry[9]))
+        add(f"count|{entry[4]}", qty)
+        add(f"class|{entry[13]}", qty)
+
+    for joint in joint_entries:
+        add('joints', 1.0)
+        add('joint_length', _number(joint[2]))
+    return features
+
+
+def group_design_entries(part_entries, joint_entries=None):
+    """
+    Group part and joint entries by design set (entry[0]); joints follow the design of their first part.
+
+    Returns:
+        {design_set: (part_entries, joint_entries)}
+    """
+    designs = {}
+    part_set = {}
+    for entry in part_entries:
+        designs.setdefault(entry[0], ([], []))[0].append(entry)
+        part_set[entry[1]] = entry[0]
+    for joint in joint_entries or []:
+        design_set = part_set.get(str(joint[0]).split(':')[0])
+        if design_set is not None:
+            designs[design_set][1].append(joint)
+    return designs
+
+
+def fill_priced_slots(slots, priced, is_priced):
+    """
+    Final order of the candidates in slots (ranked by mass): the slots of the candidates the surrogate priced go to
+    the priced candidates in order of predicted cost, the others keep their place.
+
+    Args:
+        slots: Candidates ranked by mass
+        priced: Priced candidates sorted by predicted cost, at least as many as the priced slots
+        is_priced: Whether a candidate was priced by the surrogate
+    """
+    cheapest = iter(priced)
+    return [next(cheapest) if is_priced(slot) else slot for slot in slots]
+
+
+class CostSurrogate:
+    """
+    Ridge regression of design cost on design_features, with its training set persisted between runs.
+
+    Args:
+        path: .npz file for the training set (None keeps it in memory only)
+        alpha: Ridge penalty on the scaled features
+        min_samples: Number of costed designs needed before the surrogate re-orders candidates
+        max_error: Largest holdout error at which the surrogate ranks every candidate
+        min_holdout: Number of holdout designs needed to measure the holdout error
+    """
+    def __init__(self, path=None, alpha=1e-3, min_samples=20, max_error=0.05, min_holdout=10):
+        self.path = path
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_error = max_error
+        self.min_holdout = min_holdout
+        self.samples = {}
+        self.feature_names = []
+        self.weights = None
+        self.ranges = None
+        self.error = None
+        if path is not None and os.path.exists(path):
+            try:
+                self._load(path)
+            except Exception as e:  # Truncated or corrupt files (BadZipFile, EOFError, ...) start untrained
+                print(f"Ignoring unreadable cost surrogate {path}, starting untrained: {e}")
+                self.samples, self.feature_names, self.weights, self.ranges, self.error = {}, [], None, None, None
+
+    @property
+    def trained(self):
+        return self.weights is not None and len(self.samples) >= self.min_samples
+
+    @property
+    def ready(self):
+        """
+        Trained and validated: its error on the holdout designs is at most max_error.
+        """
+        return self.trained and self.error is not None and self.error <= self.max_error
+
+    @property
+    def n_holdout(self):
+        return sum(holdout for _, _, holdout in self.samples.values())
+
+    def add(self, features, cost, holdout=False):
+        cost = _number(cost)
+        if cost <= 0:
+            return
+        key = hashlib.blake2b(repr(sorted((k, round(v, 6)) for k, v in features.items())).encode(), digest_size=16).hexdigest()
+        self.samples[key] = (features, cost, bool(holdout))
+
+    def add_designs(self, values, part_entries, joint_entries=None, holdout=False):
+        """
+        Add the Summary rows returned by the calculator (name in the first column, cost in the last).
+        holdout marks designs drawn at random from the candidates, not selected by a ranking.
+        """
+        designs = group_design_entries(part_entries, joint_entries)
+        for row in values or []:
+            if row and row[0] in designs:
+                self.add(design_features(*designs[row[0]]), row[-1], holdout)
+
+    def _matrix(self, features_list, names=None):
+        names = self.feature_names if names is None else names
+        index = {name: i for i, name in enumerate(names)}
+        X = np.zeros((len(features_list), len(names)))
+        for i, features in enumerate(features_list):
+            for name, value in features.items():
+                j = index.get(name)
+                if j is not None:  # Features never seen in training carry no weight
+                    X[i, j] = value
+        return X
+
+    def _solve(self, X, y):
+        scale = np.sqrt((X ** 2).mean(axis=0))
+        scale[scale == 0] = 1.0
+        Xs = X / scale
+        A = Xs.T @ Xs + self.alpha * len(y) * np.eye(X.shape[1])
+        return np.linalg.solve(A, Xs.T @ y) / scale
+
+    def fit(self):
+        """
+        Fit the weights on all samples and measure the prediction error on the holdout designs, predicted by
+        weights fit on the other designs only. Selected designs are not used to measure the error: they were
+        ranked best by an earlier fit and would understate it.
+
+        Returns:
+            Relative RMS prediction error on the holdout (None with fewer than min_holdout holdout designs)
+        """
+        if not self.samples:
+            return None
+        features_list, costs, holdout = zip(*self.samples.values())
+        self.feature_names = sorted({name for features in features_list for name in features})
+        X = self._matrix(features_list)
+        y = np.array(costs)
+        holdout = np.array(holdout, dtype=bool)
+        self.weights = self._solve(X, y)
+        self.ranges = (X.min(axis=0), X.max(axis=0))
+
+        self.error = None
+        if holdout.sum() >= self.min_holdout and (~holdout).any():
+            predicted = X[holdout] @ self._solve(X[~holdout], y[~holdout])
+            self.error = float(np.sqrt(np.mean(((predicted - y[holdout]) / y[holdout]) ** 2)))
+        return self.error
+
+    def predict(self, features_list):
+        return self._matrix(features_list) @ self.weights
+
+    def in_range(self, features_list):
+        """
+        Mask of the candidates whose features all lie within the range of the training samples.
+        """
+        known = set(self.feature_names)
+        X = self._matrix(features_list)
+        low, high = self.ranges
+        inside = ((X >= low) & (X <= high)).all(axis=1)
+        seen = [all(name in known for name, value in features.items() if value) for features in features_list]
+        return inside & np.array(seen, dtype=bool)
+
+    def price(self, features_list):
+        """
+        Predicted costs of the candidates, nan for the ones outside the trained feature range.
+        """
+        return np.where(self.in_range(features_list), self.predict(features_list), np.nan)
+
+    def report(self):
+        error = "n/a" if self.error is None else f"{100 * self.error:.1f}%"
+        status = "ranks all candidates" if self.ready else "re-orders the lightest candidates only"
+        return (f"Cost surrogate: {len(self.samples)} costed designs ({self.n_holdout} holdout), {len(self.feature_names)} features, "
+                f"holdout error {error} (max {100 * self.max_error:.1f}%), {status}")
+
+    def save(self):
+        if self.path is None or not self.samples:
+            return
+        features_list, costs, holdout = zip(*self.samples.values())
+        names = sorted({name for features in features_list for name in features})
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, feature_names=np.array(names, dtype=str),
+                            X=self._matrix(features_list, names), y=np.array(costs), holdout=np.array(holdout, dtype=bool))
+        os.replace(tmp_path, self.path)
+
+    def _load(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data['feature_names']]
+            # Files saved before the holdout was kept only hold selected designs
+            holdout = data['holdout'] if 'holdout' in data.files else np.zeros(len(data['y']), dtype=bool)
+            for row, cost, held_out in zip(data['X'], data['y'], holdout):
+                self.add({name: float(v) for name, v in zip(names, row) if v != 0}, cost, held_out)
+        self.fit()
+
+
+def load_cost_surrogate(filepath, cache_dir=None):
+    """
+    Open the cost surrogate trained on a workbook version (costs change with the workbook).
+    """
+    cache_dir = cfg.cost_cache_dir if cache_dir is None else cache_dir
+    path = os.path.join(cache_dir, f"cost_surrogate.{workbook_hash(filepath)[:16]}.npz")
+    return CostSurrogate(path, min_samples=cfg.surrogate_min_samples, max_error=cfg.surrogate_max_error,
+                         min_holdout=cfg.surrogate_holdout)
@@ -0,0 +1,132 @@
+"""
+Array-native representation of a wall frame.
+
+A FrameModel keeps the node coordinates as a float (n_nodes, 2) array indexed by node id and the members as an
+int32 (n_members, 2) array, with member lengths, angles and the support mask (bottom edge nodes) precomputed.
+It still unpacks and indexes like the legacy [nodes_dict, member_list, details_dict] frame, so code that has not
+moved to the arrays keeps working, and it pickles as a few small arrays for worker processes.
+"""
+import numpy as np # type: ignore
+
+
+class FrameModel:
+    """
+    Wall frame as arrays.
+
+    Args:
+        xy: (n_nodes, 2) node coordinates, row i is node i
+        members: (n_members, 2) node ids of each member (members referencing missing nodes are dropped)
+        details: Dictionary of panel and mass details (see generate_frame)
+    """
+    __slots__ = ('xy', 'members', 'details', 'lengths', 'angles', 'supports', '_nodes')
+
+    def __init__(self, xy, members, details=None):
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.members = valid_members(members, len(self.xy))
+        self.details = {} if details is None else details
+        d = self.xy[self.members[:, 1]] - self.xy[self.members[:, 0]]
+        self.lengths = np.hypot(d[:, 0], d[:, 1])
+        self.angles = np.arctan2(d[:, 1], d[:, 0])
+        self.supports = self.xy[:, 1] == 0  # Bottom edge nodes are fixed
+        self._nodes = None
+
+    @classmethod
+    def from_nodes(cls, nodes, members, details=None):
+        """
+        Build a FrameModel from a {idx: [x, y]} nodes dictionary and a member list (members referencing
+        missing nodes are dropped). Node ids that are not 0..n-1 are renumbered in sorted order.
+        """
+        return cls(node_array(nodes), member_rows(nodes, members), details)
+
+    @property
+    def nodes(self):
+        """Legacy {idx: [x, y]} nodes dictionary, built on first use."""
+        if self._nodes is None:
+            self._nodes = {i: [float(x), float(y)] for i, (x, y) in enumerate(self.xy)}
+        return self._nodes
+
+    @property
+    def member_list(self):
+        return self.members.tolist()
+
+    @property
+    def vertical(self):
+        return self.xy[self.members[:, 0], 0] == self.xy[self.members[:, 1], 0]
+
+    @property
+    def horizontal(self):
+        return self.xy[self.members[:, 0], 1] == self.xy[self.members[:, 1], 1]
+
+    @property
+    def diagonal(self):
+        return ~self.vertical & ~self.horizontal
+
+    @property
+    def top_edge_nodes(self):
+        """Ids of the top edge nodes, sorted by x."""
+        top = np.flatnonzero(self.xy[:, 1] == self.xy[:, 1].max())
+        return top[np.argsort(self.xy[top, 0], kind='stable')]
+
+    def __iter__(self):
+        return iter((self.nodes, self.member_list, self.details))
+
+    def __getitem__(self, i):
+        return (self.nodes, self.member_list, self.details)[i]
+
+    def __len__(self):
+        return 3
+
+    def __getstate__(self):
+        return self.xy, self.members, self.details
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+def node_array(nodes):
+    """
+    (n_nodes, 2) coordinate array of a nodes dictionary, one row per node in sorted id order, so row i is
+    node i when the ids are 0..n-1.
+    """
+    return np.array([nodes[node] for node in sorted(nodes)], dtype=float).reshape(-1, 2)
+
+
+def member_rows(nodes, members):
+    """
+    (n_members, 2) node_array rows of the members of a nodes dictionary, dropping members that reference
+    missing nodes.
+    """
+    rows = {node: row for row, node in enumerate(sorted(nodes))}
+    members = [(rows[i], rows[j]) for i, j in members if i in rows and j in rows]
+    return np.array(members, dtype=np.int32).reshape(-1, 2)
+
+
+def valid_members(members, n_nodes):
+    """
+    (n_members, 2) int32 member array without the members that reference rows outside 0..n_nodes-1.
+    """
+    members = np.asarray(members, dtype=np.int64).reshape(-1, 2)
+    return members[((members >= 0) & (members < n_nodes)).all(axis=1)].astype(np.int32)
+
+
+def frame_arrays(nodes, members=None):
+    """
+    (xy, member_ids) of a frame given as a FrameModel, a coordinate array, or a nodes dictionary, and a member
+    list. Members default to the FrameModel's own; members referencing missing nodes are dropped for every
+    input, and dictionary node ids are mapped to rows (see node_array).
+    """
+    if isinstance(nodes, FrameModel):
+        return nodes.xy, nodes.members if members is None else valid_members(members, len(nodes.xy))
+    if isinstance(nodes, np.ndarray):
+        return nodes, valid_members(members, len(nodes))
+    return node_array(nodes), member_rows(nodes, members)
+
+
+def as_frame_model(frame):
+    """
+    FrameModel of a frame given as a FrameModel or as a legacy [nodes, members, details] list.
+    """
+    if isinstance(frame, FrameModel):
+        return frame
+    nodes, members, details = frame
+    return FrameModel.from_nodes(nodes, members, details)
@@ -7,6 +7,9 @@ import matplotlib.pyplot as plt # type: ignore
 import matplotlib.patches as patches # type: ignore
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox  # type: ignore
 from structural_panels import calculate_floor_gauge, calculate_wall_gauge
+from part_extraction import get_floor_parts
+from joint_detection import extract_floor_joints
+from cost_surrogate import design_features, fill_priced_slots
 import numpy as np # type: ignore
 import math
 import os
@@ -417,7 +420,7 @@ def visualize_filled_floor(floor, design_name="Floor", floor_width=cfg.x_in, flo
         fig.savefig(f"{path}/{title}.png", bbox_inches='tight', dpi=300)
         plt.close(fig)
 
-def generate_top_n_floors(n_top, plot=False):
+def generate_top_n_floors(n_top, plot=False, surrogate=None, holdout=None):
     top_floors = []
     print(f"\nGenerating structurally sound floor configurations...")
     for gauge in [10, 12, 14, 16, 18]:
@@ -427,7 +430,30 @@ def generate_top_n_floors(n_top, plot=False):
         top_floors.extend(floors)
 
     top_floors = sorted(top_floors, 
-                        key=lambda x: sum(panel[2] for panel in x['panels']) + sum(channel[2] for channel in x['channels']))[:n_top] 
+                        key=lambda x: sum(panel[2] for panel in x['panels']) + sum(channel[2] for channel in x['channels']))
+
+    candidates = top_floors
+
+    # Re-order the lightest floors by predicted cost once the cost surrogate is trained, rank them all once it is
+    # validated on a holdout. Floors outside its trained feature range are not priced and keep their place.
+    if surrogate is not None and surrogate.trained and len(top_floors) > n_top:
+        pool = top_floors if surrogate.ready else top_floors[:n_top * cfg.surrogate_shortlist]
+        features = []
+        for floor in pool:
+            parts = get_floor_parts(floor, 'F0')
+            features.append(design_features(parts, extract_floor_joints(floor, parts)))
+        predicted = surrogate.price(features)
+        priced = [i for i in np.argsort(predicted, kind='stable') if np.isfinite(predicted[i])]
+        order = fill_priced_slots(range(n_top), priced, lambda i: np.isfinite(predicted[i]))
+        top_floors = [pool[i] for i in order]
+        print(f"{'Ranked' if surrogate.ready else f'Lightest {len(pool)} re-ordered'} by predicted cost ({surrogate.report()}).")
+    top_floors = top_floors[:n_top]
+
+    if holdout is not None:
+        selected = {id(floor) for floor in top_floors}
+        rest = [floor for floor in candidates if id(floor) not in selected]
+        picks = np.random.default_rng().choice(len(rest), min(cfg.surrogate_holdout, len(rest)), replace=False)
+        holdout.extend(rest[i] for i in sorted(picks))
 
     n_top = len(top_floors) if n_top > len(top_floors) else n_top
     for i, floor in enumerate(top_floors, start=1):
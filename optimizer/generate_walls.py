@@ -3,19 +3,49 @@ Code to generate structural frames based on given dimensions and constraints.
 Generates structurally-feasible configurations of nodes and members within specified limits.
 """
 import numpy as np # type: ignore
-from structural_frames import calculate_wall_frame_structural, distribute_load
+from structural_frames import calculate_wall_frame_structural, evaluate_frames, distribute_load
 from capabilities import Capabilities
 from profiles import Profile
 import config as cfg
 import general_data as gd
 from structural_panels import calculate_wall_gauge
+from part_extraction import get_wall_parts
+from joint_detection import extract_wall_joints
+from cost_surrogate import design_features, fill_priced_slots
+from frame_model import FrameModel
 import itertools
-import pandas as pd # type: ignore
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+SWEEP_STAGES = ("panel", "ratio", "structural", "error", "bound")  # Rejection stages of the frame sweep, cheapest first ("bound": never solved, too heavy for the top designs)
 
 
 def generate_frame(x, z, channel_type, panel_material, num_nodes=12, display=False, diagonal_plan="A"):
     """
     Generate a configuration of nodes and members.
+
+    Returns:
+        FrameModel of the frame, which also unpacks as [nodes, members, details].
+    """
+    layout = frame_layout(x, z, panel_material, num_nodes=num_nodes, diagonal_plan=diagonal_plan)
+    frame = frame_from_layout(layout, channel_type, panel_material)
+
+    if display:
+        print(f"Generated frame with {len(frame.xy)} nodes and {len(frame.members)} members.")
+        print(f"  Nodes: {frame.nodes}")
+        print(f"  Members: {frame.member_list}")
+        print(f"  Panels: {frame.details}")
+        print(f"  Total mass: {frame.details['total_mass']:.2f}")
+
+    return frame
+
+def frame_layout(x, z, panel_material, num_nodes=12, diagonal_plan="A"):
+    """
+    Nodes, members and wall panels of a frame; everything that does not depend on the channel.
+    Raises ValueError when the wall gauge is too thick or the panels are outside of the APB limits.
+
+    Returns:
+        FrameModel with the panel details (n_panels, panel_height, panel_width, wall_gauge, wall_type)
     """
     if x == cfg.x_in: wall_type = 'X'
     else: wall_type = 'Y'
@@ -90,6 +120,20 @@ def generate_frame(x, z, channel_type, panel_material, num_nodes=12, display=Fal
        panel_height < min_height or panel_height > max_height):
         raise ValueError("Panel dimensions outside of APB limits")
 
+    return FrameModel.from_nodes(nodes, member_pairs, {
+        "n_panels": n_panels,
+        "panel_height": panel_height,
+        "panel_width": panel_width,
+        "wall_gauge": wall_gauge,
+        "wall_type": wall_type,
+    })
+
+def frame_from_layout(layout, channel_type, panel_material):
+    """
+    Frame of a layout (see frame_layout) built with a channel, with its member and panel masses.
+    """
+    n_panels, panel_height, panel_width, wall_gauge = (layout.details[key] for key in ("n_panels", "panel_height", "panel_width", "wall_gauge"))
+
     # Material usage
     material = channel_type.material
     member_gauge = channel_type.gauge
@@ -97,12 +141,7 @@ def generate_frame(x, z, channel_type, panel_material, num_nodes=12, display=Fal
     member_width = channel_type.width
     member_density = cap.density[cap.gauge_material]
 
-    total_member_mass = 0.0
-    for pair in member_pairs:
-        n1, n2 = nodes[pair[0]], nodes[pair[1]]
-        length = np.linalg.norm(np.array(n1) - np.array(n2))
-        mass = length * member_width * member_density
-        total_member_mass += mass
+    total_member_mass = float(np.sum(layout.lengths * member_width * member_density))
 
     total_panel_area = n_panels * panel_width * panel_height
     cap = Capabilities(material, wall_gauge)
@@ -113,33 +152,20 @@ def generate_frame(x, z, channel_type, panel_material, num_nodes=12, display=Fal
     weight = 5
     weighted_total_mass = weight * total_member_mass + total_panel_mass
 
-    frame = [
-        nodes.copy(),
-        member_pairs.copy(),
-        {
-            "n_panels": n_panels,
-            "panel_height": panel_height,
-            "panel_width": panel_width,
-            "wall_gauge": wall_gauge,
-            "total_member_mass": total_member_mass,
-            "total_panel_mass": total_panel_mass,
-            "total_mass": total_mass,
-            "weighted_total_mass": weighted_total_mass,
-            "panel_material": panel_material,
-            "channel_data": channel_type,
-            "wall_type": wall_type,
-            "cap": cap
-        }
-    ]
-
-    if display:
-        print(f"Generated frame with {len(nodes)} nodes and {len(member_pairs)} members.")
-        print(f"  Nodes: {frame[0]}")
-        print(f"  Members: {frame[1]}")
-        print(f"  Panels: {frame[2]}")
-        print(f"  Total mass: {frame[2]['total_mass']:.2f}")
-
-    return frame
+    return FrameModel(layout.xy, layout.members, {
+        "n_panels": n_panels,
+        "panel_height": panel_height,
+        "panel_width": panel_width,
+        "wall_gauge": wall_gauge,
+        "total_member_mass": total_member_mass,
+        "total_panel_mass": total_panel_mass,
+        "total_mass": total_mass,
+        "weighted_total_mass": weighted_total_mass,
+        "panel_material": panel_material,
+        "channel_data": channel_type,
+        "wall_type": layout.details["wall_type"],
+        "cap": cap
+    })
 
 def _add_diagonals(nodes, bottom_ids, top_ids, existing_members, plan="A"):
     diagonals = []
@@ -219,119 +245,591 @@ def _add_diagonals(nodes, bottom_ids, top_ids, existing_members, plan="A"):
         raise ValueError(f"Unknown diagonal plan '{plan}'")
 
 
-def generate_top_n_frames(n_top, xwall=True, plot=False):
+def frame_loads(xwall=True):
     """
-    Generate a set of structural frames based on various configurations.
-    This function iterates through different combinations of channel materials,
-    panel materials, node counts, gauge options, profile types, and diagonal plans.
-    It returns a list of structurally sound designs.
+    Loads every wall frame is checked against: the top load and cfg.frame_load_cases, as keyword arguments
+    of evaluate_frames and calculate_wall_frame_structural.
     """
-    channel_materials = [gd.GLV]
-    panel_materials = [cfg.material]
-    node_options = [4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30]
-    gauge_options = [8, 10, 12, 14, 16, 18]
-    profile_options = ['C', 'Rectangular', 'Hat', 'Double C', 'I']
-    diagonal_plans = ['A', 'B', 'C', 'D']
+    return {
+        "q": distribute_load(cfg.x_in, cfg.y_in, cfg.top_load),
+        "load_cases": list(cfg.frame_load_cases),
+        "span": cfg.y_in if xwall else cfg.x_in,  # The perpendicular walls bear on this wall's end posts
+        "water_height_in": cfg.water_height_in,
+    }
+
+def _ratio_within_bounds(combo_id, metrics, log):
+    """
+    Check the APB ratio of a frame against cfg.APB_ratio +/- cfg.ratio_variance (always True when cfg.use_ratio is off).
+    """
+    if not cfg.use_ratio:
+        return True
+    TL_mass, APB_mass = metrics["total_member_mass"], metrics["total_panel_mass"]
+    APB_ratio = APB_mass / (TL_mass + APB_mass)
+    if APB_ratio < cfg.APB_ratio - cfg.ratio_variance or APB_ratio > cfg.APB_ratio + cfg.ratio_variance:
+        log(f"  ❌ [{combo_id}] APB ratio {APB_ratio:.2f} out of bounds ({cfg.APB_ratio - cfg.ratio_variance:.2f}, {cfg.APB_ratio + cfg.ratio_variance:.2f})")
+        return False
+    log(f"  ✅ [{combo_id}] APB ratio {APB_ratio:.2f} within bounds")
+    return True
+
+def _result_row(combo_id, ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan, frame, channel_type, max_utilization):
+    metrics = frame.details
+    return {
+        "Combo": combo_id,
+        "Channel Material": ch_mat,
+        "Panel Material": pnl_mat,
+        "Nodes": n_nodes,
+        "Gauge": gauge,
+        "Profile": profile_type,
+        "Diagonal Plan": diag_plan,
+        "Total Mass": metrics["total_mass"],
+        "Total Member Mass": metrics["total_member_mass"],
+        "Total Panel Mass": metrics["total_panel_mass"],
+        "Wall Gauge": metrics["wall_gauge"],
+        "Max Utilization": max_utilization,
+        "Frame Data": frame,
+        "Channel Type": channel_type
+    }
+
+def _sweep_node_count(ch_mat, pnl_mat, n_nodes, plans, dim, loads, total_combos):
+    """
+    Generate and check the frames of one node count, for every diagonal plan and gauge x profile variant.
 
-    results = []
+    The checks run cheapest first and each stage only sees the survivors of the previous one:
+    the panel layout (wall gauge and APB limits, shared by all variants of a plan), the APB ratio
+    (from the masses) and finally the structural solve.
 
-    total_combos = len(channel_materials) * len(panel_materials) * len(node_options) * len(gauge_options) * len(profile_options) * len(diagonal_plans)
+    Args:
+        plans: {diagonal_plan: [(combo_id, gauge, profile_type), ...]}, plan A first
+        loads: Loads the frames are checked against, keyword arguments of evaluate_frames (see frame_loads)
+
+    Returns:
+        List of result rows of the sound frames, the progress messages and the rejections per stage
+    """
+    results = []
+    messages = []
+    log = messages.append
+    rejected = dict.fromkeys(SWEEP_STAGES, 0)
 
-    combo_id = 0
+    # Plan A members, the base the other diagonal plans are reanalyzed from
+    base_members = None
 
-    for ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan in itertools.product(channel_materials, panel_materials, node_options, gauge_options, profile_options, diagonal_plans):
-        combo_id += 1
+    for diag_plan, variants in plans.items():
+        # Set cfg material for panel first
+        cfg.material = pnl_mat
         try:
-            print(f"[{combo_id}/{total_combos}] Channel={ch_mat}, Panel={pnl_mat}, Nodes={n_nodes}, Gauge={gauge}, Profile={profile_type}, Plan={diag_plan}")
+            layout = frame_layout(dim, cfg.z_in, pnl_mat, num_nodes=n_nodes, diagonal_plan=diag_plan)
+        except Exception as e:
+            log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} ({len(variants)} combos) due to error: {e}")
+            rejected["panel"] += len(variants)
+            continue
+        if diag_plan == "A":
+            base_members = layout.members
+
+        batch = []
+        for combo_id, gauge, profile_type in variants:
+            try:
+                log(f"[{combo_id}/{total_combos}] Channel={ch_mat}, Panel={pnl_mat}, Nodes={n_nodes}, Gauge={gauge}, Profile={profile_type}, Plan={diag_plan}")
+
+                # Define channel separately
+                channel_type = Profile(ch_mat, gauge, profile_type)
+                frame = frame_from_layout(layout, channel_type, pnl_mat)
+
+            except Exception as e:
+                log(f"  ⚠️ Skipped due to error: {e}")
+                rejected["error"] += 1
+                continue
 
-            # Set cfg material for panel first
-            cfg.material = pnl_mat
-            
-            # Define channel separately
-            channel_type = Profile(ch_mat, gauge, profile_type)
-
-            dim = cfg.x_in if xwall else cfg.y_in
-
-            frame = generate_frame(
-                dim,
-                cfg.z_in,
-                channel_type=channel_type,
-                panel_material=pnl_mat,
-                num_nodes=n_nodes,
-                display=False,
-                diagonal_plan=diag_plan
-            )
+            if not _ratio_within_bounds(combo_id, frame.details, log):
+                rejected["ratio"] += 1
+                continue
 
-            nodes, members = frame[0], frame[1]
-            q = distribute_load(cfg.x_in, cfg.y_in, cfg.top_load)
+            batch.append((combo_id, gauge, profile_type, channel_type, frame))
 
-            is_structural = calculate_wall_frame_structural(
-                nodes,
-                members,
-                channel_type,
-                q=q,
-                display=False,
-                plot=False
-            )
+        if not batch:
+            continue
+        base = base_members if cfg.frame_reanalysis and diag_plan != "A" else None
+        try:
+            passed, utilization = evaluate_frames([(frame, None, channel_type) for *_, channel_type, frame in batch], **loads, base_members=base)
+        except Exception as e:
+            log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} due to error: {e}")
+            rejected["error"] += len(batch)
+            continue
 
+        for (combo_id, gauge, profile_type, channel_type, frame), is_structural, member_utilization in zip(batch, passed, utilization):
             if not is_structural:
-                print("  ❌ Frame failed structural check.")
+                log(f"  ❌ [{combo_id}] Frame failed structural check.")
+                rejected["structural"] += 1
                 continue
 
-            metrics = frame[2]
-            if cfg.use_ratio:
-                TL_mass, APB_mass = metrics["total_member_mass"], metrics["total_panel_mass"]
-                APB_ratio = APB_mass / (TL_mass + APB_mass)
-                if APB_ratio < cfg.APB_ratio - cfg.ratio_variance or APB_ratio > cfg.APB_ratio + cfg.ratio_variance:
-                    print(f"  ❌ APB ratio {APB_ratio:.2f} out of bounds ({cfg.APB_ratio - cfg.ratio_variance:.2f}, {cfg.APB_ratio + cfg.ratio_variance:.2f})")
-                    continue
-                print(f"  ✅ APB ratio {APB_ratio:.2f} within bounds")
-
-            results.append({
-                "Channel Material": ch_mat,
-                "Panel Material": pnl_mat,
-                "Nodes": n_nodes,
-                "Gauge": gauge,
-                "Profile": profile_type,
-                "Diagonal Plan": diag_plan,
-                "Total Mass": metrics["total_mass"],
-                "Total Member Mass": metrics["total_member_mass"],
-                "Total Panel Mass": metrics["total_panel_mass"],
-                "Wall Gauge": metrics["wall_gauge"],
-                "Frame Data": frame,
-                "Channel Type": channel_type
-            })
+            results.append(_result_row(combo_id, ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan,
+                                       frame, channel_type, member_utilization.max()))
+    return results, messages, rejected
 
+def _monotone_violations(solved):
+    """
+    Pairs of solved cells that contradict monotone adequacy: a cell that passes while a cell with at least
+    as many nodes and at least as thick a gauge fails.
+
+    Args:
+        solved: {(node_index, gauge): passed}, node indices ascending in node count
+    """
+    passing = [cell for cell, passed in solved.items() if passed]
+    failing = [cell for cell, passed in solved.items() if not passed]
+    return [(p, f) for p in passing for f in failing if f[0] >= p[0] and f[1] <= p[1]]
+
+def _search_plan(ch_mat, pnl_mat, diag_plan, cells, dim, loads, total_combos):
+    """
+    Find the structural feasibility frontier of one diagonal plan by bisection instead of solving every combo.
+
+    Structural adequacy is taken as monotone: a thicker gauge (lower gauge number) or more nodes (shorter spans)
+    does not turn a sound frame unsound. Per profile and node count the combos that pass the panel and APB ratio
+    stages are bisected for the thinnest sound gauge, starting from the frontier of the previous (smaller) node
+    count, and the combos on both sides of the frontier are solved. The other combos are sound or unsound by
+    monotonicity. With cfg.verify_monotone the solved combos of each profile are checked against each other and
+    a profile that contradicts monotonicity is solved exhaustively.
+    The profiles of a node count share the topology and are solved as one batch per bisection step.
+
+    Args:
+        cells: {n_nodes: [(combo_id, gauge, profile_type), ...]}, node counts ascending
+        loads: Loads the frames are checked against, keyword arguments of evaluate_frames (see frame_loads)
+
+    Returns:
+        List of result rows of the sound frames, the progress messages and the rejections per stage
+    """
+    results = []
+    messages = []
+    log = messages.append
+    rejected = dict.fromkeys(SWEEP_STAGES, 0)
+
+    # Per node count: its base members for reanalysis and each profile's candidates (past the cheap stages), thickest first
+    grid = []
+    for n_nodes, variants in cells.items():
+        cfg.material = pnl_mat
+        try:
+            layout = frame_layout(dim, cfg.z_in, pnl_mat, num_nodes=n_nodes, diagonal_plan=diag_plan)
         except Exception as e:
-            print(f"  ⚠️ Skipped due to error: {e}")
+            log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} ({len(variants)} combos) due to error: {e}")
+            rejected["panel"] += len(variants)
+            continue
+        base = None
+        if cfg.frame_reanalysis and diag_plan != "A":
+            try:
+                base = frame_layout(dim, cfg.z_in, pnl_mat, num_nodes=n_nodes, diagonal_plan="A").members
+            except Exception:
+                pass  # Plan A has no layout at this node count, solve from scratch
+
+        candidates = {}
+        for combo_id, gauge, profile_type in variants:
+            try:
+                log(f"[{combo_id}/{total_combos}] Channel={ch_mat}, Panel={pnl_mat}, Nodes={n_nodes}, Gauge={gauge}, Profile={profile_type}, Plan={diag_plan}")
+                channel_type = Profile(ch_mat, gauge, profile_type)
+                frame = frame_from_layout(layout, channel_type, pnl_mat)
+            except Exception as e:
+                log(f"  ⚠️ Skipped due to error: {e}")
+                rejected["error"] += 1
+                continue
+            if not _ratio_within_bounds(combo_id, frame.details, log):
+                rejected["ratio"] += 1
+                continue
+            candidates.setdefault(profile_type, []).append((combo_id, gauge, channel_type, frame))
+        for profile_candidates in candidates.values():
+            profile_candidates.sort(key=lambda candidate: candidate[1])
+        grid.append((n_nodes, base, candidates))
+
+    solved = {}  # (node_index, profile_type, candidate_index) -> max utilization, inf if unsound or not solvable
+
+    def solve(batch):
+        # Solve a batch of candidates of one node count; a failed solve counts as unsound
+        batch = [cell for cell in batch if cell not in solved]
+        if not batch:
+            return
+        k = batch[0][0]
+        n_nodes, base, candidates = grid[k]
+        frames = [candidates[profile_type][i] for _, profile_type, i in batch]
+        try:
+            passed, utilization = evaluate_frames([(frame, None, channel_type) for _, _, channel_type, frame in frames], **loads, base_members=base)
+        except Exception as e:
+            log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} due to error: {e}")
+            passed, utilization = [False] * len(batch), [None] * len(batch)
+        for cell, is_structural, member_utilization in zip(batch, passed, utilization):
+            solved[cell] = member_utilization.max() if is_structural else np.inf
+
+    def sound(cell):
+        return solved[cell] <= 1
+
+    sound_gauge = {}  # profile_type -> thinnest gauge known to be sound at the previous node count
+    frontier = {}     # (node_index, profile_type) -> number of sound candidates, thickest first
+    for k, (n_nodes, base, candidates) in enumerate(grid):
+        # Bisection bounds per profile: candidates below lo are sound, candidates from hi on are unsound.
+        # More nodes do not make a sound gauge unsound, so the previous node count's frontier is a lower bound.
+        bounds = {}
+        for profile_type, profile_candidates in candidates.items():
+            lo = sum(gauge <= sound_gauge.get(profile_type, 0) for _, gauge, _, _ in profile_candidates)
+            bounds[profile_type] = [lo, len(profile_candidates)]
+        while any(lo < hi for lo, hi in bounds.values()):
+            probes = {profile_type: (lo + hi) // 2 for profile_type, (lo, hi) in bounds.items() if lo < hi}
+            solve([(k, profile_type, i) for profile_type, i in probes.items()])
+            for profile_type, i in probes.items():
+                if sound((k, profile_type, i)):
+                    bounds[profile_type][0] = i + 1
+                else:
+                    bounds[profile_type][1] = i
+        # Solve the candidates on both sides of the frontier
+        solve([(k, profile_type, i) for profile_type, (lo, _) in bounds.items()
+               for i in (lo - 1, lo) if 0 <= i < len(candidates[profile_type])])
+        for profile_type, (lo, _) in bounds.items():
+            frontier[k, profile_type] = lo
+            if lo:
+                sound_gauge[profile_type] = max(sound_gauge.get(profile_type, 0), candidates[profile_type][lo - 1][1])
+
+    if cfg.verify_monotone:
+        for profile_type in dict.fromkeys(profile_type for _, profile_type, _ in solved):
+            profile_solved = {(k, grid[k][2][p][i][1]): sound((k, p, i)) for (k, p, i) in solved if p == profile_type}
+            if _monotone_violations(profile_solved):
+                log(f"  ⚠️ Profile={profile_type}, Plan={diag_plan} is not monotone in gauge and node count, solving it exhaustively")
+                for k, (_, _, candidates) in enumerate(grid):
+                    solve([(k, profile_type, i) for i in range(len(candidates.get(profile_type, [])))])
+
+    for k, (n_nodes, base, candidates) in enumerate(grid):
+        for profile_type, profile_candidates in candidates.items():
+            for i, (combo_id, gauge, channel_type, frame) in enumerate(profile_candidates):
+                cell = (k, profile_type, i)
+                if cell in solved:
+                    is_structural, max_utilization = sound(cell), solved[cell]
+                else:
+                    is_structural, max_utilization = i < frontier[k, profile_type], np.nan
+                if not is_structural:
+                    log(f"  ❌ [{combo_id}] Frame failed structural check.")
+                    rejected["structural"] += 1
+                    continue
+                results.append(_result_row(combo_id, ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan,
+                                           frame, channel_type, max_utilization))
+    n_candidates = sum(len(profile_candidates) for _, _, candidates in grid for profile_candidates in candidates.values())
+    log(f"  Plan={diag_plan}: {len(solved)} of {n_candidates} candidate combos solved")
+    return results, messages, rejected
+
+def _bound_search(tasks, n_top):
+    """
+    Branch and bound over the sweep tasks for the n_top lightest sound frames.
+
+    The panel and APB ratio stages run for every combo and give each survivor its exact total mass (the
+    masses are analytic, no FEA). The survivors are then solved in order of mass, in batches per topology,
+    and the search stops once the n_top-th lightest sound frame is lighter than every combo left, so the
+    result is the same top n_top as the exhaustive sweep with far fewer structural solves.
+
+    Yields:
+        Result rows of the sound frames, the progress messages and the rejections per stage, per batch
+    """
+    if n_top <= 0:
+        return
+    messages = []
+    log = messages.append
+    rejected = dict.fromkeys(SWEEP_STAGES, 0)
+
+    # Only the rank key and the variant of a candidate are kept, its frame is rebuilt from the layout when solved
+    candidates = []
+    topologies = {}  # (ch_mat, pnl_mat, n_nodes, diag_plan) -> layout, loads and base members of the topology
+    for ch_mat, pnl_mat, n_nodes, plans, dim, loads, total_combos in tasks:
+        base_members = None
+        for diag_plan, variants in plans.items():
+            cfg.material = pnl_mat
+            try:
+                layout = frame_layout(dim, cfg.z_in, pnl_mat, num_nodes=n_nodes, diagonal_plan=diag_plan)
+            except Exception as e:
+                log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} ({len(variants)} combos) due to error: {e}")
+                rejected["panel"] += len(variants)
+                continue
+            if diag_plan == "A":
+                base_members = layout.members
+            topology = (ch_mat, pnl_mat, n_nodes, diag_plan)
+            topologies[topology] = (layout, loads, base_members if cfg.frame_reanalysis and diag_plan != "A" else None)
+
+            for combo_id, gauge, profile_type in variants:
+                try:
+                    log(f"[{combo_id}/{total_combos}] Channel={ch_mat}, Panel={pnl_mat}, Nodes={n_nodes}, Gauge={gauge}, Profile={profile_type}, Plan={diag_plan}")
+                    channel_type = Profile(ch_mat, gauge, profile_type)
+                    frame = frame_from_layout(layout, channel_type, pnl_mat)
+                except Exception as e:
+                    log(f"  ⚠️ Skipped due to error: {e}")
+                    rejected["error"] += 1
+                    continue
+                if not _ratio_within_bounds(combo_id, frame.details, log):
+                    rejected["ratio"] += 1
+                    continue
+                candidates.append(((frame.details["total_mass"], combo_id), topology, gauge, profile_type))
+    yield [], messages, rejected
+
+    candidates.sort(key=lambda candidate: candidate[0])
+    best = []  # Rank keys of the lightest sound frames found so far, at most n_top
+    i = 0
+    while i < len(candidates) and (len(best) < n_top or best[-1] > candidates[i][0]):
+        results = []
+        messages = []
+        log = messages.append
+        rejected = dict.fromkeys(SWEEP_STAGES, 0)
+
+        # Solve the next lightest combos, as many as sound frames are still missing, one batch per topology
+        wave = candidates[i:i + max(n_top - len(best), 1)]
+        i += len(wave)
+        groups = {}
+        for candidate in wave:
+            groups.setdefault(candidate[1], []).append(candidate)
+        for (ch_mat, pnl_mat, n_nodes, diag_plan), batch in groups.items():
+            layout, loads, base = topologies[ch_mat, pnl_mat, n_nodes, diag_plan]
+            cfg.material = pnl_mat
+            try:
+                channels = [Profile(ch_mat, gauge, profile_type) for _, _, gauge, profile_type in batch]
+                frames = [frame_from_layout(layout, channel_type, pnl_mat) for channel_type in channels]
+                passed, utilization = evaluate_frames([(frame, None, channel_type) for frame, channel_type in zip(frames, channels)], **loads, base_members=base)
+            except Exception as e:
+                log(f"  ⚠️ Skipped Nodes={n_nodes}, Plan={diag_plan} due to error: {e}")
+                rejected["error"] += len(batch)
+                continue
+            for (key, _, gauge, profile_type), channel_type, frame, is_structural, member_utilization in zip(batch, channels, frames, passed, utilization):
+                if not is_structural:
+                    log(f"  ❌ [{key[1]}] Frame failed structural check.")
+                    rejected["structural"] += 1
+                    continue
+                best.append(key)
+                results.append(_result_row(key[1], ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan,
+                                           frame, channel_type, member_utilization.max()))
+        best = sorted(best)[:n_top]
+        yield results, messages, rejected
+
+    rejected = dict.fromkeys(SWEEP_STAGES, 0)
+    rejected["bound"] = len(candidates) - i
+    yield [], [], rejected
+
+def _sweep_worker(settings, sweep, task):
+    """
+    Run one sweep task in a worker process with the parent's config settings.
+    """
+    for name, value in settings.items():
+        setattr(cfg, name, value)
+    return sweep(*task)
+
+def _run_sweeps(tasks, workers, sweep=_sweep_node_count):
+    """
+    Run the sweep tasks serially or over a process pool, yielding their results in task order.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield sweep(*task)
+        return
+
+    # Workers may start from a fresh import of config (spawn), so they get the current settings
+    settings = {name: value for name, value in vars(cfg).items()
+                if not name.startswith('_') and isinstance(value, (bool, int, float, str))}
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = [pool.submit(_sweep_worker, settings, sweep, task) for task in tasks]
+        for future in futures:
+            yield future.result()
+
+def _mass_key(result):
+    """
+    Ranking key of a sound frame by total mass, then combination number (so ties keep the sweep order).
+    """
+    return (result["Total Mass"], result["Combo"])
 
-        # Sort and display top designs
-    df_results = pd.DataFrame(results)
-    df_sorted = df_results.sort_values(by="Total Mass").reset_index(drop=True)
+def _cost_key(result):
+    """
+    Ranking key of a frame priced by the cost surrogate.
+    """
+    return (result["Predicted Cost"],) + _mass_key(result)
 
-    print(f"{len(df_sorted)} structurally sound designs found out of {total_combos} combinations.")
+def _surrogate_ranking(surrogate, n_top):
+    """
+    How the cost surrogate ranks the sweep: the number of lightest frames it chooses from and whether it ranks
+    every frame it prices. Until it is validated on a holdout it only re-orders the n_top x cfg.surrogate_shortlist lightest.
+    """
+    if surrogate is None or not surrogate.trained:
+        return n_top, False
+    if surrogate.ready:
+        return n_top, True
+    return n_top * cfg.surrogate_shortlist, False
+
+def _push(heap, key, result, size):
+    """
+    Push a result onto a bounded max-heap of the best size by key; True when it entered the heap.
+    """
+    key = tuple(-value for value in key)
+    if len(heap) < size:
+        heapq.heappush(heap, (key, result))
+    elif key > heap[0][0]:
+        heapq.heapreplace(heap, (key, result))
+    else:
+        return False
+    return True
+
+def iter_top_n_frames(n_top, xwall=True, surrogate=None, workers=None, search=None, sample=None, sample_size=0):
+    """
+    Sweep the wall frame design space and yield each structurally sound design that enters the current
+    best n_top, as soon as it is found.
+
+    Only the current best are kept (bounded heaps), so memory does not grow with the design space.
+    A yielded design may later be pushed out by a better one; every design of the final top n_top is
+    yielded at some point (see _best for the final order). Designs are ranked by total mass, with a trained
+    cost surrogate re-ordering the lightest by predicted cost, or ranking every design it prices once it is
+    validated (see _surrogate_ranking). Designs outside its trained feature range are not priced.
+    With a sample list, it receives a uniform random sample of sample_size sound designs.
+
+    The sweep runs per node count; with workers > 1 (defaults to cfg.sweep_workers) the node counts
+    are spread over a process pool and the results come back in the same order as a serial run.
+    With search='bisect' (defaults to cfg.sweep_search) only the combos around the structural feasibility
+    frontier of each diagonal plan are solved (see _search_plan), and the plans are spread over the pool.
+    With search='bound' the combos are solved in order of mass until the top n_top are settled (see _bound_search);
+    it runs serially and only applies to the mass ranking.
+    """
+    if n_top <= 0:
+        return
+    channel_materials = [gd.GLV]
+    panel_materials = [cfg.material]
+    node_options = [4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30]
+    gauge_options = [8, 10, 12, 14, 16, 18]
+    profile_options = ['C', 'Rectangular', 'Hat', 'Double C', 'I']
+    diagonal_plans = ['A', 'B', 'C', 'D']
 
-    n = n_top
-    top_n = df_sorted.head(n)
+    combos = list(itertools.product(channel_materials, panel_materials, node_options, gauge_options, profile_options, diagonal_plans))
+    total_combos = len(combos)
+    dim = cfg.x_in if xwall else cfg.y_in
+    loads = frame_loads(xwall)
+    n_pool, ranked_by_cost = _surrogate_ranking(surrogate, n_top)
+    priced_by_cost = surrogate is not None and surrogate.trained
+
+    # The gauge x profile variants of a node count and diagonal plan share one topology and are solved as a batch,
+    # the diagonal plans of a node count share its nodes and are swept together
+    sweeps = {}
+    for combo_id, (ch_mat, pnl_mat, n_nodes, gauge, profile_type, diag_plan) in enumerate(combos, start=1):
+        sweeps.setdefault((ch_mat, pnl_mat, n_nodes), {}).setdefault(diag_plan, []).append((combo_id, gauge, profile_type))
+    tasks = [(ch_mat, pnl_mat, n_nodes, plans, dim, loads, total_combos) for (ch_mat, pnl_mat, n_nodes), plans in sweeps.items()]
+    sweep = _sweep_node_count
+    search = cfg.sweep_search if search is None else search
+    if search == 'bisect':
+        # The frontier search walks the node counts of a diagonal plan in order, so the plans are the tasks
+        plan_cells = {}
+        for (ch_mat, pnl_mat, n_nodes), plans in sweeps.items():
+            for diag_plan, variants in plans.items():
+                plan_cells.setdefault((ch_mat, pnl_mat, diag_plan), {})[n_nodes] = variants
+        tasks = [(ch_mat, pnl_mat, diag_plan, cells, dim, loads, total_combos) for (ch_mat, pnl_mat, diag_plan), cells in plan_cells.items()]
+        sweep = _search_plan
+    workers = cfg.sweep_workers if workers is None else workers
+    sweeps = _run_sweeps(tasks, workers, sweep)
+    if search == 'bound':
+        if ranked_by_cost:
+            print("Mass bounds do not apply to the predicted cost ranking, solving every combo.")
+        else:
+            sweeps = _bound_search(tasks, n_pool)
+
+    rejected = dict.fromkeys(SWEEP_STAGES, 0)
+    n_sound = 0
+    top = []  # Max-heap of the current n_pool lightest by negated mass key
+    cheapest = []  # Max-heap of the current n_top cheapest priced designs when ranked by cost
+    rng = np.random.default_rng()
+    for sweep_results, messages, sweep_rejected in sweeps:
+        for message in messages:
+            print(message)
+        for stage, count in sweep_rejected.items():
+            rejected[stage] += count
+
+        if priced_by_cost and sweep_results:
+            features = []
+            for result in sweep_results:
+                parts = get_wall_parts(result["Frame Data"], 'XW0' if xwall else 'YW0')
+                features.append(design_features(parts, extract_wall_joints(result["Frame Data"], parts)))
+            for result, cost in zip(sweep_results, surrogate.price(features)):
+                if np.isfinite(cost):
+                    result["Predicted Cost"] = float(cost)
+
+        for result in sweep_results:
+            n_sound += 1
+            if sample is not None:  # Reservoir sampling
+                if len(sample) < sample_size:
+                    sample.append(result)
+                else:
+                    i = rng.integers(n_sound)
+                    if i < sample_size:
+                        sample[i] = result
+            entered = _push(top, _mass_key(result), result, n_pool)
+            if ranked_by_cost and "Predicted Cost" in result:
+                entered = _push(cheapest, _cost_key(result), result, n_top) or entered
+            if entered:
+                yield result
+
+    print(f"Rejected combinations: {rejected['panel']} panel layout (wall gauge / APB limits), {rejected['ratio']} APB ratio, "
+          f"{rejected['structural']} structural check, {rejected['error']} errors, {rejected['bound']} not solved (mass bound)")
+    print(f"{n_sound} structurally sound designs found out of {total_combos} combinations.")
+    if priced_by_cost:
+        print(f"{'Ranked' if ranked_by_cost else f'Lightest {n_pool} re-ordered'} by predicted cost ({surrogate.report()}).")
+
+def _best(results, n_top, n_pool=None, ranked_by_cost=False):
+    """
+    Best n_top of a stream of result rows (see iter_top_n_frames), in rank order: the n_top lightest, where
+    the priced ones give their places to the cheapest priced designs among the n_pool lightest (defaults to
+    n_top), or among all designs when ranked_by_cost.
+    """
+    n_pool = n_top if n_pool is None else n_pool
+    top = []
+    cheapest = []
+    for result in results:
+        top.append(result)
+        if "Predicted Cost" in result:
+            cheapest.append(result)
+        # Designs pushed out of the best are never yielded again
+        if len(top) > 2 * n_pool:
+            top = sorted(top, key=_mass_key)[:n_pool]
+        if len(cheapest) > 2 * n_top:
+            cheapest = sorted(cheapest, key=_cost_key)[:n_top]
+    top = sorted(top, key=_mass_key)[:n_pool]
+    if not ranked_by_cost:
+        cheapest = [result for result in top if "Predicted Cost" in result]
+    return fill_priced_slots(top[:n_top], sorted(cheapest, key=_cost_key), lambda result: "Predicted Cost" in result)
+
+def generate_top_n_frames(n_top, xwall=True, plot=False, surrogate=None, workers=None, holdout=None):
+    """
+    Generate a set of structural frames based on various configurations.
+    This function iterates through different combinations of channel materials,
+    panel materials, node counts, gauge options, profile types, and diagonal plans.
+    It returns a list of the n_top structurally sound designs, ranked by total mass and
+    re-ordered by a trained cost surrogate (see iter_top_n_frames).
+    A holdout list receives up to cfg.surrogate_holdout random sound designs outside the top n_top.
+    """
+    ranking = _surrogate_ranking(surrogate, n_top)
+    sample = [] if holdout is not None else None
+    sample_size = cfg.surrogate_holdout + n_top  # At most n_top of the sample are selected
+    top_n = _best(iter_top_n_frames(n_top, xwall=xwall, surrogate=surrogate, workers=workers,
+                                    sample=sample, sample_size=sample_size), n_top, *ranking)
+
+    if cfg.sweep_search == 'bisect' and cfg.verify_monotone:
+        # Solve the top designs whose adequacy was inferred from the frontier, a failure means it was not monotone
+        loads = frame_loads(xwall)
+        for row in top_n:
+            if np.isnan(row["Max Utilization"]) and not evaluate_frames([(row["Frame Data"], None, row["Channel Type"])], **loads)[0][0]:
+                print("  ⚠️ An inferred top design failed its structural check, repeating the sweep exhaustively")
+                top_n = _best(iter_top_n_frames(n_top, xwall=xwall, surrogate=surrogate, workers=workers, search='exhaustive'),
+                              n_top, *ranking)
+                break
+
+    if holdout is not None:
+        selected = {row["Combo"] for row in top_n}
+        holdout.extend([row["Frame Data"] for row in sample if row["Combo"] not in selected][:cfg.surrogate_holdout])
 
     top_frames = []
 
     wall_type = 'XW' if xwall else 'YW'
 
-    for i, row in top_n.iterrows():
+    for i, row in enumerate(top_n):
         frame_data = row['Frame Data']
         top_frames.append(frame_data)
         channel_type = row['Channel Type']
-        nodes, members = frame_data[0], frame_data[1]
-        metrics = frame_data[2]
-        q = distribute_load(cfg.x_in, cfg.y_in, cfg.top_load)
+        metrics = frame_data.details
+        loads = frame_loads(xwall)
 
         try:
             calculate_wall_frame_structural(
-                nodes,
-                members,
+                frame_data,
+                None,
                 channel_type,
-                q=q,
+                **loads,
                 display=False,
                 plot=plot,
                 title=f"{wall_type}{i+1}",
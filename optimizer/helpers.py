@@ -1,6 +1,8 @@
 from joint_detection import extract_floor_wall_joints, extract_wall_joints, extract_floor_joints
 from part_extraction import get_floor_parts, get_wall_parts
+import numpy as np # type: ignore
 import pandas as pd # type: ignore
+import itertools
 import re
 from collections import defaultdict
 
@@ -14,24 +16,24 @@ def entries_to_list(entries):
             entry_list.append(entry)
     return entry_list
 
-def get_part_and_joint_entries(designs, design_name='XW'):
+def get_part_and_joint_entries(designs, design_name='XW', start=1):
     """
-    Convert part and joint entries to a list of lists.
+    Convert part and joint entries to a list of lists. Designs are numbered from start.
     """
     part_entries = {}
     joint_entries = {}
 
     wall = design_name in ['XW', 'YW']
-    for i, design in enumerate(designs):
+    for i, design in enumerate(designs, start=start):
         if wall:
-            design_parts = get_wall_parts(design, f'{design_name}{i+1}')
+            design_parts = get_wall_parts(design, f'{design_name}{i}')
             design_joints = extract_wall_joints(design, design_parts)
         else:
-            design_parts = get_floor_parts(design, f'{design_name}{i+1}')
+            design_parts = get_floor_parts(design, f'{design_name}{i}')
             design_joints = extract_floor_joints(design, design_parts)
 
-        part_entries[f'{design_name}{i+1}'] = design_parts
-        joint_entries[f'{design_name}{i+1}'] = design_joints
+        part_entries[f'{design_name}{i}'] = design_parts
+        joint_entries[f'{design_name}{i}'] = design_joints
 
     return part_entries, joint_entries
 
@@ -149,4 +151,85 @@ def get_top_part_and_joint_entries(top_designs, part_entries, joint_entries):
     for part_set, entries in part_set_groups.items():
         process_part_set(entries)
 
-    return updated_part_entries, updated_joint_entries
\ No newline at end of file
+    return updated_part_entries, updated_joint_entries
+
+def _panel_signature(entries):
+    """
+    Material and gauge of the panel of a sub-design (first part entry), which is what the
+    floor-wall joints of a combination depend on.
+    """
+    panel = entries[0]
+    return (panel[5], panel[6])
+
+def _split_designs(part_entries):
+    """
+    Group sub-design names by type.
+    """
+    floors = [name for name in part_entries if re.fullmatch(r'F\d+', name)]
+    xwalls = [name for name in part_entries if re.fullmatch(r'XW\d+', name)]
+    ywalls = [name for name in part_entries if re.fullmatch(r'YW\d+', name)]
+    return floors, xwalls, ywalls
+
+def get_calibration_designs(part_entries):
+    """
+    Pick one floor x x-wall x y-wall combination per distinct set of panel signatures.
+    Costing these gives the floor-wall joint delta of every combination (see get_combination_costs).
+    """
+    floors, xwalls, ywalls = _split_designs(part_entries)
+    representatives = []
+    for names in (floors, xwalls, ywalls):
+        by_signature = {}
+        for name in names:
+            by_signature.setdefault(_panel_signature(part_entries[name]), name)
+        representatives.append(list(by_signature.values()))
+
+    return {f"{f}_{x}_{y}": None for f, x, y in itertools.product(*representatives)}
+
+def get_combination_costs(values, part_entries, n=15):
+    """
+    Rank all floor x x-wall x y-wall combinations without costing them in the workbook.
+
+    The cost of F#_XW#_YW# is the sum of its sub-designs plus the floor-wall joint delta, measured once per
+    signature combination from the calibration designs (see get_calibration_designs), costed in a separate
+    pass from the sub-designs.
+
+    Assumes that the non-additive part of a combination's cost depends only on the (material, gauge) panel
+    signatures of its floor and walls (see _panel_signature). Any other dependence, e.g. on the panel
+    dimensions or frame layout, makes the ranking an estimate, so the top designs must be re-costed exactly.
+
+    Returns:
+        Dictionary of the top n combination names and their estimated costs, sorted by cost
+    """
+    costs = {value[0]: value[-1] for value in values if value[-1] is not None}
+    floors, xwalls, ywalls = _split_designs(part_entries)
+    floors, xwalls, ywalls = ([d for d in names if d in costs] for names in (floors, xwalls, ywalls))
+    if not floors or not xwalls or not ywalls:
+        return {}
+
+    signatures = {}
+    def signature_ids(names):
+        return np.array([signatures.setdefault(_panel_signature(part_entries[d]), len(signatures)) for d in names])
+    f_sig, x_sig, y_sig = signature_ids(floors), signature_ids(xwalls), signature_ids(ywalls)
+
+    # Floor-wall joint delta per signature combination
+    delta = np.zeros((len(signatures),) * 3)
+    for name, cost in costs.items():
+        parts = name.split('_')
+        if len(parts) != 3 or not all(p in part_entries and p in costs for p in parts):  # Sub-designs without a cost are left out
+            continue
+        f, x, y = parts
+        ids = [signatures.get(_panel_signature(part_entries[p])) for p in parts]
+        if None not in ids:
+            delta[tuple(ids)] = cost - costs[f] - costs[x] - costs[y]
+
+    f_cost = np.array([costs[d] for d in floors])
+    x_cost = np.array([costs[d] for d in xwalls])
+    y_cost = np.array([costs[d] for d in ywalls])
+    total = (f_cost[:, None, None] + x_cost[None, :, None] + y_cost[None, None, :]
+             + delta[f_sig[:, None, None], x_sig[None, :, None], y_sig[None, None, :]])
+
+    order = np.argsort(total, axis=None, kind='stable')[:n]
+    top_designs = {}
+    for i, j, k in zip(*np.unravel_index(order, total.shape)):
+        top_designs[f"{floors[i]}_{xwalls[j]}_{ywalls[k]}"] = float(total[i, j, k])
+    return top_designs
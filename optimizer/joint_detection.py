@@ -1,10 +1,12 @@
 
 import general_data as gd
 import config as cfg
+from frame_model import as_frame_model
 
 def extract_wall_joints(frame, part_entries):
 
-    nodes, members, details = frame
+    frame = as_frame_model(frame)
+    details = frame.details
     joint_entries = []
     panel_name = part_entries[0][1]
     v_channel_name = part_entries[1][1]
@@ -36,43 +38,37 @@ def extract_wall_joints(frame, part_entries):
 
 
     # Channel-to-Channel and Panel-to-Channel Joints
-    member_dictionary = {v_channel_name: [], d_channel_name: [] if d_channel_name else None}
-    for member in members:
-        x1, y1 = nodes[member[0]]
-        x2, y2 = nodes[member[1]]
-        if x1 == x2:
-            member_dictionary[v_channel_name].append(member)
-        elif y1 != y2 and x1 != x2 and d_channel_name is not None:
-            member_dictionary[d_channel_name].append(member)
+    n_vertical = int(frame.vertical.sum())
+    n_diagonal = int(frame.diagonal.sum()) if d_channel_name is not None else 0
 
     special_case = details['channel_data'].profile_type == 'I' and gd.I_IS_DOUBLE_C
 
-    for i, member in enumerate(member_dictionary[v_channel_name]):
+    for i in range(n_vertical):
         joint_entries.append([f"{v_channel_name}:{i + 1}", f"{h_channel_name}:{1}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
         joint_entries.append([f"{v_channel_name}:{i + 1}", f"{h_channel_name}:{2}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
         joint_entries.append([f"{v_channel_name}:{i + 1}", f"{panel_name}:{1}", v_channel_length])
 
-        joint_entries.append([f"{v_channel_name}:{i + len(member_dictionary[v_channel_name]) + 1}", f"{h_channel_name}:{3}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
-        joint_entries.append([f"{v_channel_name}:{i + len(member_dictionary[v_channel_name]) + 1}", f"{h_channel_name}:{4}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
-        joint_entries.append([f"{v_channel_name}:{i + len(member_dictionary[v_channel_name]) + 1}", f"{panel_name}:{1}", v_channel_length])
+        joint_entries.append([f"{v_channel_name}:{i + n_vertical + 1}", f"{h_channel_name}:{3}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
+        joint_entries.append([f"{v_channel_name}:{i + n_vertical + 1}", f"{h_channel_name}:{4}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
+        joint_entries.append([f"{v_channel_name}:{i + n_vertical + 1}", f"{panel_name}:{1}", v_channel_length])
 
         if special_case:
             joint_entries.append([f"{v_channel_name}:{i + 1}", f"{v_channel_name}:{i + 2}", v_channel_length])
-            joint_entries.append([f"{v_channel_name}:{i + len(member_dictionary[v_channel_name]) + 1}", f"{v_channel_name}:{i + len(member_dictionary[v_channel_name]) + 2}", v_channel_length])
+            joint_entries.append([f"{v_channel_name}:{i + n_vertical + 1}", f"{v_channel_name}:{i + n_vertical + 2}", v_channel_length])
 
     if d_channel_name is not None:        
-        for i, member in enumerate(member_dictionary[d_channel_name]):
+        for i in range(n_diagonal):
             joint_entries.append([f"{d_channel_name}:{i + 1}", f"{h_channel_name}:{1}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
             joint_entries.append([f"{d_channel_name}:{i + 1}", f"{h_channel_name}:{2}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
             joint_entries.append([f"{d_channel_name}:{i + 1}", f"{panel_name}:{1}", d_channel_length])
 
-            joint_entries.append([f"{d_channel_name}:{i + len(member_dictionary[d_channel_name]) + 1}", f"{h_channel_name}:{3}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
-            joint_entries.append([f"{d_channel_name}:{i + len(member_dictionary[d_channel_name]) + 1}", f"{h_channel_name}:{4}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
-            joint_entries.append([f"{d_channel_name}:{i + len(member_dictionary[d_channel_name]) + 1}", f"{panel_name}:{1}", d_channel_length])
+            joint_entries.append([f"{d_channel_name}:{i + n_diagonal + 1}", f"{h_channel_name}:{3}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
+            joint_entries.append([f"{d_channel_name}:{i + n_diagonal + 1}", f"{h_channel_name}:{4}", max(details['channel_data'].profile['h'], details['channel_data'].profile['b'])])
+            joint_entries.append([f"{d_channel_name}:{i + n_diagonal + 1}", f"{panel_name}:{1}", d_channel_length])
 
             if special_case:
                 joint_entries.append([f"{d_channel_name}:{i + 1}", f"{d_channel_name}:{i + 2}", d_channel_length])
-                joint_entries.append([f"{d_channel_name}:{i + len(member_dictionary[d_channel_name]) + 1}", f"{d_channel_name}:{i + len(member_dictionary[d_channel_name]) + 2}", d_channel_length])
+                joint_entries.append([f"{d_channel_name}:{i + n_diagonal + 1}", f"{d_channel_name}:{i + n_diagonal + 2}", d_channel_length])
 
     for i in range(n_panels*2):
         joint_entries.append([f"{h_channel_name}:{1}", f"{panel_name}:{i + 1}", panel_length])
@@ -80,7 +76,7 @@ def extract_wall_joints(frame, part_entries):
 
     if special_case:
         for i in range(4):
-            joint_entries.append([f"{h_channel_name}:{i + 1}", f"{h_channel_name}:{i + 2}", nodes[max(nodes, key=lambda x: nodes[x][0])][0]])
+            joint_entries.append([f"{h_channel_name}:{i + 1}", f"{h_channel_name}:{i + 2}", float(frame.xy[:, 0].max())])
     return joint_entries
 
 def extract_floor_joints(floor, part_entries):
@@ -2,38 +2,102 @@ from generate_walls import generate_top_n_frames
 from generate_floors import generate_top_n_floors
 from cost import update_and_read_excel, quit_excel, check_cost_calc_path
 from helpers import entries_to_list, get_part_and_joint_entries, get_design_summary_df, get_top_n_designs, get_top_part_and_joint_entries
+from helpers import get_calibration_designs, get_combination_costs
+from cost_surrogate import load_cost_surrogate
+from results_store import open_results_store
 import config as cfg
 
-quit_excel()
-check_cost_calc_path()
+def cost_designs(part_entries, joint_entries, store=None):
+    """
+    Cost designs in the calculator, reusing the stored costs of designs costed in previous runs.
+    """
+    design_names = list(dict.fromkeys(entry[0] for entry in part_entries))
+    known = {}
+    if store is not None:
+        known, part_entries, joint_entries = store.warm_start(part_entries, joint_entries, cfg.submodule_type)
+        if known:
+            print(f"Reusing {len(known)} stored design costs.")
+    values = []
+    if part_entries:
+        values = update_and_read_excel(cfg.cost_calc_path, part_entries, joint_entries, submodule_type=cfg.submodule_type) or []
+        if store is not None:
+            store.record(values, part_entries, joint_entries)
+    costs = {**known, **{value[0]: value for value in values}}
+    return [costs[name] for name in design_names if name in costs]
 
-N_top = cfg.N_top_final_designs
-n_configs = cfg.n_configurations
-xframes = generate_top_n_frames(n_configs, xwall=True)
-yframes = generate_top_n_frames(n_configs, xwall=False)
-floors = generate_top_n_floors(n_configs)
 
-xwall_part_entries, xwall_joint_entries = get_part_and_joint_entries(xframes, design_name='XW')
-ywall_part_entries, ywall_joint_entries = get_part_and_joint_entries(yframes, design_name='YW')
-floor_part_entries, floor_joint_entries = get_part_and_joint_entries(floors, design_name='F')
+def main():
+    quit_excel()
+    check_cost_calc_path()
 
-final_part_entries = {**xwall_part_entries, **ywall_part_entries, **floor_part_entries}
-final_joint_entries = {**xwall_joint_entries, **ywall_joint_entries, **floor_joint_entries}
+    if cfg.use_cost_surrogate:
+        print("Approximate mode: frames and floors are ranked by a learned cost surrogate (cfg.use_cost_surrogate).")
+    if cfg.combination_costing:
+        print("Approximate mode: combinations are ranked by estimated costs before the exact re-costing (cfg.combination_costing).")
 
-final_part_entry_list = entries_to_list(final_part_entries)
-final_joint_entry_list = entries_to_list(final_joint_entries)
+    N_top = cfg.N_top_final_designs
+    n_configs = cfg.n_configurations
+    surrogate = load_cost_surrogate(cfg.cost_calc_path) if cfg.use_cost_surrogate else None
+    store = open_results_store() if cfg.use_results_store else None
+    holdout = {'XW': [], 'YW': [], 'F': []} if surrogate is not None else {}
+    xframes = generate_top_n_frames(n_configs, xwall=True, surrogate=surrogate, holdout=holdout.get('XW'))
+    yframes = generate_top_n_frames(n_configs, xwall=False, surrogate=surrogate, holdout=holdout.get('YW'))
+    floors = generate_top_n_floors(n_configs, surrogate=surrogate, holdout=holdout.get('F'))
 
-print(f"Writing {len(final_part_entry_list)} part entries and {len(final_joint_entry_list)} joint entries to Excel (this may take a while)...")
-values = update_and_read_excel(cfg.cost_calc_path, final_part_entry_list, final_joint_entry_list, submodule_type=cfg.submodule_type)
-for i, value in enumerate(values):
-    print(f"Sub-design {i+1}: {value[0]}, Cost: ${value[-1]}")
+    xwall_part_entries, xwall_joint_entries = get_part_and_joint_entries(xframes, design_name='XW')
+    ywall_part_entries, ywall_joint_entries = get_part_and_joint_entries(yframes, design_name='YW')
+    floor_part_entries, floor_joint_entries = get_part_and_joint_entries(floors, design_name='F')
 
-design_summary_df = get_design_summary_df(values)
-top_n_designs = get_top_n_designs(design_summary_df, n=N_top)
-top_part_entries, top_joint_entries = get_top_part_and_joint_entries(top_n_designs, final_part_entries, final_joint_entries)
+    final_part_entries = {**xwall_part_entries, **ywall_part_entries, **floor_part_entries}
+    final_joint_entries = {**xwall_joint_entries, **ywall_joint_entries, **floor_joint_entries}
 
-print(f"\nFinal {N_top} designs. Writing {len(top_part_entries)} part entries and {len(top_joint_entries)} joint entries to Excel (this may take another while)...")
-final_values = update_and_read_excel(cfg.cost_calc_path, top_part_entries, top_joint_entries, submodule_type=cfg.submodule_type)
-final_values = sorted(final_values, key=lambda x: x[-1])  # Sort by cost
-for i, value in enumerate(final_values):
-    print(f"Design {i+1}: {value[0]}, Cost: ${value[-1]}")
\ No newline at end of file
+    final_part_entry_list = entries_to_list(final_part_entries)
+    final_joint_entry_list = entries_to_list(final_joint_entries)
+
+    print(f"Writing {len(final_part_entry_list)} part entries and {len(final_joint_entry_list)} joint entries to Excel (this may take a while)...")
+    values = cost_designs(final_part_entry_list, final_joint_entry_list, store)
+    for i, value in enumerate(values):
+        print(f"Sub-design {i+1}: {value[0]}, Cost: ${value[-1]}")
+
+    if surrogate is not None:
+        # Learn from every costed sub-design for the ranking of the next runs, and measure its error on a random
+        # holdout of the sound candidates that were not selected (numbered after the selected ones)
+        surrogate.add_designs(values, final_part_entry_list, final_joint_entry_list)
+        holdout_part_entries, holdout_joint_entries = {}, {}
+        for design_name, designs in holdout.items():
+            parts, joints = get_part_and_joint_entries(designs, design_name=design_name, start=n_configs + 1)
+            holdout_part_entries.update(parts)
+            holdout_joint_entries.update(joints)
+        holdout_part_entry_list = entries_to_list(holdout_part_entries)
+        holdout_joint_entry_list = entries_to_list(holdout_joint_entries)
+        print(f"\nCosting {len(holdout_part_entries)} random holdout designs to validate the cost surrogate...")
+        holdout_values = cost_designs(holdout_part_entry_list, holdout_joint_entry_list, store)
+        surrogate.add_designs(holdout_values, holdout_part_entry_list, holdout_joint_entry_list, holdout=True)
+        surrogate.fit()
+        surrogate.save()
+        print(surrogate.report())
+
+    if cfg.combination_costing:
+        # Cost one combination per panel signature in a separate pass to measure the floor-wall joint deltas
+        calibration_designs = get_calibration_designs(final_part_entries)
+        calibration_parts, calibration_joints = get_top_part_and_joint_entries(calibration_designs, final_part_entries, final_joint_entries)
+        print(f"\nCosting {len(calibration_designs)} calibration designs for the floor-wall joint deltas...")
+        calibration_values = cost_designs(calibration_parts, calibration_joints, store)
+        top_n_designs = get_combination_costs(values + calibration_values, final_part_entries, n=N_top)
+    else:
+        design_summary_df = get_design_summary_df(values)
+        top_n_designs = get_top_n_designs(design_summary_df, n=N_top)
+
+    # The final designs are always re-costed exactly, the combination ranking above is an estimate
+    top_part_entries, top_joint_entries = get_top_part_and_joint_entries(top_n_designs, final_part_entries, final_joint_entries)
+    print(f"\nFinal {N_top} designs. Writing {len(top_part_entries)} part entries and {len(top_joint_entries)} joint entries to Excel (this may take another while)...")
+    final_values = cost_designs(top_part_entries, top_joint_entries, store)
+    quit_excel()  # Close the calculator session
+    if store is not None:
+        store.close()
+    final_values = sorted(final_values, key=lambda x: x[-1])  # Sort by cost
+    for i, value in enumerate(final_values):
+        print(f"Design {i+1}: {value[0]}, Cost: ${value[-1]}")
+
+if __name__ == '__main__':  # Guard for the worker processes of sharded costing
+    main()
@@ -1,6 +1,7 @@
 import general_data as gd
 import config as cfg
 from capabilities import Capabilities
+from frame_model import as_frame_model
 
 def _get_assy_category(cap, gauge, material, length, width):
     weight = cap.density[f'{gauge}_{material[:3]}'] * length * width
@@ -18,12 +19,13 @@ def get_wall_parts(frame, design_name):
     Extract wall parts from the frames.
 
     Args:
-        frame: A tuple containing nodes, members, and details of the wall frame.
+        frame: FrameModel (or a tuple containing nodes, members, and details) of the wall frame.
         design_name: XW#_YW#_F#
     """
     part_entries = []
 
-    nodes, members, details = frame
+    frame = as_frame_model(frame)
+    details = frame.details
 
     wall_type = details['wall_type']
     n_panels = details['n_panels']
@@ -50,11 +52,11 @@ def get_wall_parts(frame, design_name):
     channel_bends = channel_data.unique_bends
     channel_cap = Capabilities(material=channel_material, gauge=channel_gauge)
 
-    h_channel_length = _get_horizontal_channel_length(nodes)
+    h_channel_length = _get_horizontal_channel_length(frame.xy)
     n_horizontal_channels = 2 if not special_case else 4
-    v_channel_length = _get_vertical_channel_length(nodes)
-    n_vertical_channels = len(nodes) if special_case else len(nodes) // 2
-    d_channel_length, n_diagonal_channels = _get_diagonal_channel_length(nodes, members)
+    v_channel_length = _get_vertical_channel_length(frame.xy)
+    n_vertical_channels = len(frame.xy) if special_case else len(frame.xy) // 2
+    d_channel_length, n_diagonal_channels = _get_diagonal_channel_length(frame)
     n_diagonal_channels = n_diagonal_channels * 2 if special_case else n_diagonal_channels
     v_channel_class = _get_assy_category(channel_cap, channel_gauge, channel_material, v_channel_length, channel_width)
     h_channel_class = _get_assy_category(channel_cap, channel_gauge, channel_material, h_channel_length, channel_width)
@@ -81,45 +83,33 @@ def get_wall_parts(frame, design_name):
 
     return part_entries
 
-def _get_horizontal_channel_length(nodes):
+def _get_horizontal_channel_length(xy):
     """
     Extract horizontal channels from the panels.
     """
-    x_min = nodes[0][0]
-    x_max = nodes[1][0]
-    return x_max - x_min
+    x_min = xy[0][0]
+    x_max = xy[1][0]
+    return float(x_max - x_min)
 
-def _get_vertical_channel_length(nodes):
+def _get_vertical_channel_length(xy):
     """
     Extract vertical channels from the panels.
     """
-    y_min = nodes[0][1]
-    y_max = nodes[2][1]
-    return y_max - y_min
+    y_min = xy[0][1]
+    y_max = xy[2][1]
+    return float(y_max - y_min)
 
-def _get_diagonal_channel_length(nodes, members):
+def _get_diagonal_channel_length(frame):
     """
-    Extract diagonal channels from the panels.
+    Extract diagonal channels from the panels (both x and y differ between the member ends).
+
+    Returns:
+        Length of the diagonal channels (all diagonals of a frame have the same length) and their count.
     """
-    n_diagonal_channels = 0
-
-    # Create a set of member pairs for quick lookup
-    # member_set = set(tuple(sorted(member)) for member in members)
-
-    # Loop through all members to find diagonal connections
-    for member in members:
-        idx1, idx2 = member
-        x1, y1 = nodes[idx1]
-        x2, y2 = nodes[idx2]
-
-        # Check if the current member is diagonal
-        if abs(x1 - x2) > 0 and abs(y1 - y2) > 0:  # Both x and y must differ for a diagonal
-            d_channel_length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5  # Calculate diagonal length
-            n_diagonal_channels += 1
-    try:
-        return d_channel_length, n_diagonal_channels
-    except Exception as e:
+    d_lengths = frame.lengths[frame.diagonal]
+    if not len(d_lengths):
         return 0, 0
+    return float(d_lengths[-1]), len(d_lengths)
     
 def _get_entry(design_name, part_name, width, length, qty, cut_method, form_method, material, gauge, bends, class_type):
     cut_distance = 2 * (width + length)
@@ -0,0 +1,194 @@
+"""
+Persistent store of cost calculator results.
+
+Every costed design is recorded in a local SQLite database together with the scenario it was generated for
+(dimensions, water height, top load, material, submodule type) and every Summary cost column. Designs are
+identified by a content hash of their part and joint entries, so later runs can reuse the costs of designs
+that were already costed with the same workbook version, and reports are answered by indexed queries.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from cost_engine import SUMMARY_OUTPUT_COLUMNS
+from cost_params import workbook_hash
+from cost_surrogate import group_design_entries
+import config as cfg
+
+SUMMARY_COLUMNS = [f"summary_{col}" for col in range(3, SUMMARY_OUTPUT_COLUMNS + 1)]
+SCENARIO_COLUMNS = ['material', 'submodule_type', 'x_in', 'y_in', 'z_in', 'water_height_in', 'top_load']
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS costs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    workbook_hash TEXT NOT NULL,
+    design_key TEXT NOT NULL,
+    design_name TEXT NOT NULL,
+    design_type TEXT NOT NULL,
+    material TEXT, submodule_type TEXT,
+    x_in REAL, y_in REAL, z_in REAL, water_height_in REAL, top_load REAL,
+    {', '.join(f'{col} REAL' for col in SUMMARY_COLUMNS)},
+    total_cost REAL,
+    UNIQUE (workbook_hash, design_key, {', '.join(SCENARIO_COLUMNS)})
+);
+CREATE INDEX IF NOT EXISTS costs_by_scenario ON costs (design_type, material, x_in, y_in, z_in, total_cost);
+CREATE INDEX IF NOT EXISTS costs_by_design ON costs (design_key, workbook_hash, submodule_type);
+"""
+
+
+def design_type(design_name):
+    """
+    'XW', 'YW' or 'F' for sub-designs, 'combo' for floor x wall combinations.
+    """
+    if '_' in design_name:
+        return 'combo'
+    match = re.match(r'(XW|YW|F)\d+$', design_name)
+    return match.group(1) if match else 'other'
+
+
+def design_key(design_name, part_entries, joint_entries=()):
+    """
+    Content hash of a design's part and joint entries, independent of the design name.
+    """
+    def strip(value):
+        return value.replace(design_name, '#') if isinstance(value, str) else value
+
+    rows = [tuple(strip(v) for v in entry[1:]) for entry in part_entries]
+    rows += [tuple(strip(v) for v in joint) for joint in joint_entries]
+    return hashlib.blake2b(repr(rows).encode(), digest_size=16).hexdigest()
+
+
+def current_scenario():
+    return {
+        'material': cfg.material,
+        'submodule_type': cfg.submodule_type,
+        'x_in': cfg.x_in,
+        'y_in': cfg.y_in,
+        'z_in': cfg.z_in,
+        'water_height_in': cfg.water_height_in,
+        'top_load': cfg.top_load,
+    }
+
+
+def _upgrade_summary_columns(connection):
+    """
+    Copy a store created with NUMERIC summary columns into REAL ones. NUMERIC affinity stored integral floats
+    as integers, REAL converts them back (text cells are kept as text by either affinity).
+    """
+    types = {row['name']: row['type'] for row in connection.execute("PRAGMA table_info(costs)")}
+    if not any(types.get(col) == 'NUMERIC' for col in SUMMARY_COLUMNS):
+        return
+    with connection:
+        connection.execute("DROP INDEX IF EXISTS costs_by_scenario")
+        connection.execute("DROP INDEX IF EXISTS costs_by_design")
+        connection.execute("ALTER TABLE costs RENAME TO costs_numeric")
+        connection.executescript(_SCHEMA)
+        connection.execute("INSERT INTO costs SELECT * FROM costs_numeric")
+        connection.execute("DROP TABLE costs_numeric")
+
+
+class ResultsStore:
+    """
+    SQLite store of costed designs.
+
+    Args:
+        path: Database file (created on first use)
+        workbook_hash: Hash of the cost calculator workbook the costs belong to
+    """
+    def __init__(self, path, workbook_hash):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.workbook_hash = workbook_hash
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        _upgrade_summary_columns(self.connection)
+        self.connection.executescript(_SCHEMA)
+
+    def record(self, values, part_entries, joint_entries=None, scenario=None):
+        """
+        Store the Summary rows returned by the calculator for the given entries.
+        """
+        scenario = current_scenario() if scenario is None else scenario
+        designs = group_design_entries(part_entries, joint_entries)
+        columns = ['created', 'workbook_hash', 'design_key', 'design_name', 'design_type'] + SCENARIO_COLUMNS + SUMMARY_COLUMNS + ['total_cost']
+        rows = []
+        now = time.time()
+        for value in values or []:
+            name = value[0]
+            if name not in designs:
+                continue
+            summary = list(value[2:SUMMARY_OUTPUT_COLUMNS])
+            summary += [None] * (len(SUMMARY_COLUMNS) - len(summary))
+            rows.append([now, self.workbook_hash, design_key(name, *designs[name]), name, design_type(name)]
+                        + [scenario[col] for col in SCENARIO_COLUMNS] + summary + [value[-1]])
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO costs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+        return len(rows)
+
+    def warm_start(self, part_entries, joint_entries=None, submodule_type=None):
+        """
+        Split a costing batch into designs already costed with this workbook and the ones left to cost.
+
+        Returns:
+            known: {design_name: Summary row} reused from the store (renamed to the current design)
+            part_entries, joint_entries: Entries of the designs that still need costing
+        """
+        submodule_type = cfg.submodule_type if submodule_type is None else submodule_type
+        designs = group_design_entries(part_entries, joint_entries)
+        known = {}
+        for name, (parts, joints) in designs.items():
+            row = self.connection.execute(
+                "SELECT * FROM costs WHERE design_key = ? AND workbook_hash = ? AND submodule_type = ? "
+                "ORDER BY created DESC LIMIT 1",
+                (design_key(name, parts, joints), self.workbook_hash, submodule_type)).fetchone()
+            if row is not None:
+                known[name] = [name, submodule_type] + [row[col] for col in SUMMARY_COLUMNS]
+        known_parts = {entry[1] for entry in part_entries if entry[0] in known}
+        part_entries = [entry for entry in part_entries if entry[0] not in known]
+        joint_entries = [joint for joint in joint_entries or [] if str(joint[0]).split(':')[0] not in known_parts]
+        return known, part_entries, joint_entries
+
+    def cheapest(self, design_type=None, n=1, any_workbook=False, **scenario):
+        """
+        Cheapest stored designs, e.g. cheapest('XW', x_in=310, z_in=27, material=gd.SST).
+
+        Args:
+            design_type: 'XW', 'YW', 'F' or 'combo' (None for any)
+            n: Number of designs to return
+            any_workbook: Include costs from other workbook versions
+            scenario: Filters on the scenario columns
+
+        Returns:
+            List of dicts with the stored columns, sorted by total cost
+        """
+        conditions, parameters = [], []
+        if design_type is not None:
+            conditions.append("design_type = ?")
+            parameters.append(design_type)
+        if not any_workbook:
+            conditions.append("workbook_hash = ?")
+            parameters.append(self.workbook_hash)
+        for col, value in scenario.items():
+            if col not in SCENARIO_COLUMNS:
+                raise ValueError(f"Unknown scenario column: {col}")
+            conditions.append(f"{col} = ?")
+            parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.connection.execute(
+            f"SELECT * FROM costs {where} ORDER BY total_cost LIMIT ?", parameters + [n]).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+def open_results_store(filepath=None, path=None):
+    """
+    Open the results store for the costs of a cost calculator workbook.
+    """
+    filepath = cfg.cost_calc_path if filepath is None else filepath
+    path = cfg.results_db_path if path is None else path
+    return ResultsStore(path, workbook_hash(filepath))
@@ -1,170 +1,154 @@
 import numpy as np # type: ignore
 import pandas as pd # type: ignore
-from scipy.linalg import solve # type: ignore
+from scipy.linalg import solve, cho_factor, cho_solve, cholesky_banded, cho_solve_banded, LinAlgError # type: ignore
+from scipy.sparse import coo_matrix # type: ignore
+from scipy.sparse.linalg import eigsh, splu, LinearOperator, ArpackNoConvergence # type: ignore
+from scipy.sparse.csgraph import reverse_cuthill_mckee # type: ignore
 import matplotlib.pyplot as plt # type: ignore
 import matplotlib.patches as patches # type: ignore
 from matplotlib.lines import Line2D # type: ignore
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox  # type: ignore
 import general_data as gd
 import config as cfg
+from frame_model import frame_arrays
 import os
 
-def calculate_wall_frame_structural(nodes, members, channel, q, display=False, plot=False, title=None, metrics=None, store_plot=False):
+BANDED_MIN_NODES = 100  # Below this the dense LAPACK solve is faster than the sparse banded path
+BASIS_CACHE_SIZE = 256  # Frame topologies whose stiffness bases are kept
+FACTOR_CACHE_SIZE = 64  # Base frame x section batches whose Cholesky factors are kept for reanalysis
+REANALYSIS_MAX_RANK = 0.5  # Largest share of free nodes touched by added members for which a low-rank update beats a new solve
+
+GAMMA_WATER = 0.03603  # lbf/in³ (P = rho * g * h -> gamma = rho * g; rho = 62.4 lb/ft³, g = 32.2 ft/s²)
+
+# Load cases: factors of the top edge load, hydrostatic and wind components
+LOAD_CASES = {
+    "top": (gd.LOAD_FACTOR, 0.0, 0.0),
+    "hydrostatic": (0.0, gd.LOAD_FACTOR, 0.0),
+    "wind": (0.0, 0.0, 1.0),
+    "combined": (gd.LOAD_FACTOR, gd.LOAD_FACTOR, 1.0),
+}
+
+_basis_cache = {}
+_factor_cache = {}
+
+def calculate_wall_frame_structural(nodes, members, channel, q, display=False, plot=False, title=None, metrics=None, store_plot=False,
+                                    load_cases=None, span=None, water_height_in=None, return_utilization=False):
     """
     Calculate the structural properties of a wall based on its nodes and members.
     
     Parameters:
-        nodes: Dictionary of node coordinates in the format {idx1: [x1, y1], idx2: [x2, y2], ...}.
-        members: List of member definitions in the format [[node1_idx, node2_idx], [node2_idx, node3_idx], ...].
+        nodes: Dictionary of node coordinates in the format {idx1: [x1, y1], idx2: [x2, y2], ...}, or a FrameModel.
+        members: List of member definitions in the format [[node1_idx, node2_idx], [node2_idx, node3_idx], ...]
+            (None to use the FrameModel's members).
         channel: Profile object representing the channel section.
         panel_material: Material of the wall panel.
         q: Uniform distributed load applied to the frame (lbf/in).
+        load_cases: Names of LOAD_CASES to check in addition to the top load. K_ff is factorized once
+            and every case is a back-substitution.
+        span: Width of the perpendicular walls bearing on this frame's end posts (in): cfg.y_in for an X wall
+            frame, cfg.x_in for a Y wall frame. Required for the hydrostatic, wind and combined load cases.
+        water_height_in: Water height for the hydrostatic load (in), defaults to cfg.water_height_in.
+        return_utilization: Also return the maximum utilization ratio (> 1 fails), to rank frames by margin.
+
+    Returns:
+        True if the frame is structurally sound. With return_utilization and/or load_cases, a tuple
+        (sound, max_utilization, {case: (n_members,) utilization}) of the requested values.
     """
 
     E = gd.MATERIALS[channel.material]["youngs_mod"]       # Young's modulus (psi)
-    Fy = gd.MATERIALS[channel.material]["yield_strength"]  # Yield strength (psi)
     A = channel.A  # Cross-sectional area (in²)
     I = channel.I  # Area moment of inertia (in^4)
-    c = channel.c  # Distance from neutral axis to extreme fiber (in)
 
-    K = gd.EFFECTIVE_LENGTH_FACTOR                  # Effective length factor (pinned-pinned)
     load_factor = gd.LOAD_FACTOR                    # Load factor (LRFD)
     max_deflection_ratio = gd.DEFLECTION_LIMIT      # Deflection limit
 
-    # Resistance factors for buckling, axial, shear, and bending
-    buckling_resistance_factor = gd.RESISTANCE_FACTORS[channel.material]["buckling"]
-    axial_resistance_factor = gd.RESISTANCE_FACTORS[channel.material]["axial"]
-    shear_resistance_factor = gd.RESISTANCE_FACTORS[channel.material]["shear"]
-    bending_resistance_factor = gd.RESISTANCE_FACTORS[channel.material]["bending"]
-
     # Filter out invalid members (non-existent in nodes dictionary)
-    members = [m for m in members if m[0] in nodes and m[1] in nodes]
-    top_edge_pairs = _get_top_edge_pairs(nodes)
+    xy, member_ids = frame_arrays(nodes, members)
+    members = member_ids.tolist()
 
-    node_ids = list(nodes.keys())
     dof_per_node = 3
-    total_dof = len(nodes) * dof_per_node
-
-    K_global = np.zeros((total_dof, total_dof))
-    F_global = np.zeros(total_dof)
-
-    for (i, j) in members:
-        xi, yi = nodes[i]
-        xj, yj = nodes[j]
-        k_elem, _ = _frame_stiffness(xi, yi, xj, yj, E, A, I)
-        dof_map = [3*i, 3*i+1, 3*i+2, 3*j, 3*j+1, 3*j+2]
-        for m in range(6):
-            for n in range(6):
-                K_global[dof_map[m], dof_map[n]] += k_elem[m, n]
-
-    node_force = dict.fromkeys(nodes.keys(), 0.0)
-    for i, j in top_edge_pairs:
-        xi, _ = nodes[i]
-        xj, _ = nodes[j]
-        L = abs(xj - xi)
-        load = load_factor * q * L
-        node_force[i] += load / 2
-        node_force[j] += load / 2
-    for node_id, force in node_force.items():
-        F_global[3*node_id + 1] -= force
-
-    fixed_dofs = [3*node_id + dof for node_id, (_, y) in nodes.items() if y == 0 for dof in range(3)]
-    free_dofs = [i for i in range(total_dof) if i not in fixed_dofs]
-    K_ff = K_global[np.ix_(free_dofs, free_dofs)]
-    F_f = F_global[free_dofs]
-    u_f = solve(K_ff, F_f)
-    u_global = np.zeros(total_dof)
-    u_global[free_dofs] = u_f
-
-    internal_results = []
-    failed_members = set()
-
-    for i, j in members:
-        xi, yi = nodes[i]
-        xj, yj = nodes[j]
-        k_elem, L = _frame_stiffness(xi, yi, xj, yj, E, A, I)
-        dof_map = [3*i, 3*i+1, 3*i+2, 3*j, 3*j+1, 3*j+2]
-        u_elem = u_global[dof_map]
-        f_local = k_elem @ u_elem
-        axial = f_local[3]
-        shear = f_local[4]
-        moment = f_local[5]
-
-        axial_stress = axial / A
-        shear_stress = shear / A
-        bending_stress = moment * c / I
-
-        buckling_load = (np.pi**2 * E * I) / (K * L)**2
-        buckling_fail = axial < 0 and abs(axial) > buckling_resistance_factor * buckling_load
-        axial_fail = abs(axial_stress) > axial_resistance_factor * Fy
-        shear_fail = abs(shear_stress) > shear_resistance_factor * 0.6 * Fy
-        bending_fail = abs(bending_stress) > bending_resistance_factor * Fy
-
-        failed = axial_fail or shear_fail or bending_fail or buckling_fail
-        if failed:
-            failed_members.add((i, j))
-
-        internal_results.append({
-            "Member": f"{i}-{j}",
-            "Length (in)": L,
-            "Axial Force (lbf)": axial,
-            "Shear Force (lbf)": shear,
-            "Bending Moment (lbf-in)": moment,
-            "Axial Stress (psi)": axial_stress,
-            "Shear Stress (psi)": shear_stress,
-            "Bending Stress (psi)": bending_stress,
-            "Fails?": failed
-        })
-
-    max_y = max(n[1] for n in nodes.values())
-    for i, j in members:
-        xi, yi = nodes[i]
-        xj, yj = nodes[j]
-        if yi == yj == max_y:
-            L = abs(xj - xi)
-            M = q * L**2 / 8
-            distributed_bending_stress = M * c / I
-            if abs(distributed_bending_stress) > bending_resistance_factor * Fy:
-                failed_members.add((i, j))
-                if display:
-                    print(f"Top edge member {i}-{j} fails due to distributed load bending moment.")
-
-    deflection_limit_ratio = max_deflection_ratio
-    node_deflections = {}
-    deflected_members = []
-
-    for i, j in members:
-        xi, yi = nodes[i]
-        xj, yj = nodes[j]
-        L = np.sqrt((xj - xi)**2 + (yj - yi)**2)
-        limit = deflection_limit_ratio * L
-        u_i, v_i = u_global[3*i], u_global[3*i+1]
-        u_j, v_j = u_global[3*j], u_global[3*j+1]
-        mag_i = np.sqrt(u_i**2 + v_i**2)
-        mag_j = np.sqrt(u_j**2 + v_j**2)
-        rel_disp = np.sqrt((u_j - u_i)**2 + (v_j - v_i)**2)
-        max_deflection = max(mag_i, mag_j, rel_disp)
-
-        node_deflections[i] = mag_i
-        node_deflections[j] = mag_j
-
-        if mag_i > limit or mag_j > limit or rel_disp > limit:
-            deflected_members.append((i, j))
-
+    total_dof = len(xy) * dof_per_node
+
+    basis = frame_basis(xy, member_ids)
+    dof_maps, lengths = basis["dof_maps"], basis["lengths"]
+    k_elems = E*A * basis["k_axial"] + E*I * basis["k_bending"]
+
+    # The top load case comes first, it is the one reported and plotted below
+    cases, factors, F_cases = _case_loads(xy, q, load_cases, span, water_height_in)
+
+    free_dofs = basis["free_dofs"]
+    solver = cfg.frame_solver
+    if solver == 'auto':
+        solver = 'banded' if len(xy) > BANDED_MIN_NODES else 'dense'
+    if solver == 'banded':
+        K_global = _assemble_sparse(k_elems, dof_maps, total_dof)
+        K_ff = K_global[free_dofs][:, free_dofs]
+        u_f = _solve_banded(K_ff, F_cases[:, free_dofs].T)
+    else:
+        F_f = F_cases[:, free_dofs].T
+        symmetry = _half_model(basis, F_f)
+        if symmetry is not None:  # Half model with symmetry conditions at the centerline
+            K_ff = E*A * symmetry["K_axial"] + E*I * symmetry["K_bending"]
+            F_f = _to_half(symmetry, F_f)
+        else:
+            K_ff = E*A * basis["K_axial_ff"] + E*I * basis["K_bending_ff"]
+        try:
+            u_f = cho_solve(cho_factor(K_ff), F_f)
+        except LinAlgError:  # Not positive definite (e.g. a mechanism), leave it to the general solver
+            u_f = solve(K_ff, F_f)
+        if symmetry is not None:
+            u_f = symmetry["coef"][:, None] * u_f[symmetry["half"]]
+    u_cases = np.zeros((len(cases), total_dof))
+    u_cases[:, free_dofs] = u_f.T
+
+    # Member checks of every load case at once, as utilization ratios (> 1 fails)
+    u_elems = u_cases[:, dof_maps]
+    f_elems = np.einsum('mij,cmj->cmi', k_elems, u_elems)
+    q_cases = np.where(factors[:, 0] > 0, q, 0.0)[:, None]  # Top edge bending only where the top load acts
+    section = {k: v[0] for k, v in _section_arrays([channel]).items()}
+    checks = _member_utilization(f_elems, u_elems, lengths, basis["top_members"], q_cases, section)
+    if cfg.frame_buckling == 'global':
+        axial = _axial_forces(basis, u_elems, E*A)
+        if solver == 'banded':
+            free = np.flatnonzero(free_dofs)
+            load_factors = np.array([
+                _buckling_load_factor_sparse(K_ff, _assemble_sparse(N[:, None, None] * basis["k_geometric"], dof_maps, total_dof)[free][:, free])
+                for N in axial])
+        else:
+            K_ff = E*A * basis["K_axial_ff"] + E*I * basis["K_bending_ff"]
+            load_factors = buckling_load_factors(K_ff, _geometric_stiffness(basis, axial))
+        checks["buckling"] = _frame_buckling_utilization(axial, load_factors[:, None], section["phi_buckling"])
         if display:
-            print(f"Member {i}-{j}: Max deflection = {max_deflection:.4f} in, Limit = {limit:.4f} in")
-
-            if deflected_members:
-                print(f"\nMembers exceeding L/{int(1/deflection_limit_ratio)}:")
-                for i, j in deflected_members:
-                    print(f"Member {i}-{j}")
-            else:
-                print("\nAll deflections within limits.")
+            for case, load_factor in zip(cases, load_factors):
+                print(f"Load case {case}: critical buckling load factor = {load_factor:.3f}")
+    utilization = np.max(np.stack(list(checks.values())), axis=0)
+
+    member_pairs = [tuple(m) for m in members]
+    strength = np.max(np.stack([v[0] for k, v in checks.items() if k != "deflection"]), axis=0)
+    failed_members = {m for m, ratio in zip(member_pairs, strength) if ratio > 1}
+    deflected_members = [m for m, ratio in zip(member_pairs, checks["deflection"][0]) if ratio > 1]
+
+    if display:
+        for (i, j), ratio in zip(member_pairs, checks["top_edge_bending"][0]):
+            if ratio > 1:
+                print(f"Top edge member {i}-{j} fails due to distributed load bending moment.")
+
+        u_i, v_i, u_j, v_j = (u_elems[0, :, k] for k in (0, 1, 3, 4))
+        max_deflection = np.maximum.reduce([np.hypot(u_i, v_i), np.hypot(u_j, v_j), np.hypot(u_j - u_i, v_j - v_i)])
+        for (i, j), deflection, L in zip(member_pairs, max_deflection, lengths):
+            print(f"Member {i}-{j}: Max deflection = {deflection:.4f} in, Limit = {max_deflection_ratio * L:.4f} in")
+
+        if deflected_members:
+            print(f"\nMembers exceeding L/{int(1/max_deflection_ratio)}:")
+            for i, j in deflected_members:
+                print(f"Member {i}-{j}")
+        else:
+            print("\nAll deflections within limits.")
 
-            df_results = pd.DataFrame(internal_results)
-            print(df_results.round(3))
+        print(member_results_table(member_pairs, lengths, f_elems[0], section, strength > 1).round(3))
 
     if store_plot or plot:
+        nodes = {i: [x, y] for i, (x, y) in enumerate(xy.tolist())}
         fig, ax = plt.subplots(figsize=(10, 6))
 
         # Plot members
@@ -285,61 +269,643 @@ def calculate_wall_frame_structural(nodes, members, channel, q, display=False, p
             plt.close(fig)
 
     # Return structural soundness
-    return len(failed_members) == 0 and len(deflected_members) == 0
+    sound = len(failed_members) == 0 and len(deflected_members) == 0
+    extras = []
+    if return_utilization:
+        extras.append(float(utilization.max()) if utilization.size else 0.0)
+    if load_cases is not None:
+        if display:
+            for case, case_utilization in zip(cases, utilization):
+                print(f"Load case {case}: max utilization = {case_utilization.max():.3f}")
+        sound = sound and not (utilization > 1).any()
+        extras.append(dict(zip(cases, utilization)))
+    return (sound, *extras) if extras else sound
 
 
-def _get_top_edge_pairs(nodes):
-    # Step 1: Find max y
-    max_y = max(y for _, y in nodes.values())
-    
-    # Step 2: Get top-edge node IDs
-    top_edge_nodes = [node_id for node_id, (x, y) in nodes.items() if y == max_y]
-    
-    # Step 3: Sort by x-coordinate
-    top_edge_nodes.sort(key=lambda i: nodes[i][0])
-    
-    # Step 4: Pair consecutive nodes
-    top_edge_pairs = [(top_edge_nodes[i], top_edge_nodes[i+1]) for i in range(len(top_edge_nodes) - 1)]
-
-    return top_edge_pairs
-
-def _frame_stiffness(x1, y1, x2, y2, E, A, I):
-    L = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-    c = (x2 - x1) / L
-    s = (y2 - y1) / L
-
-    k_local = np.array([
-        [ A*E/L,       0,          0,      -A*E/L,       0,          0],
-        [ 0,      12*E*I/L**3,  6*E*I/L**2,  0, -12*E*I/L**3,  6*E*I/L**2],
-        [ 0,      6*E*I/L**2,   4*E*I/L,    0, -6*E*I/L**2,   2*E*I/L],
-        [-A*E/L,      0,          0,       A*E/L,       0,          0],
-        [ 0,     -12*E*I/L**3, -6*E*I/L**2,  0,  12*E*I/L**3, -6*E*I/L**2],
-        [ 0,      6*E*I/L**2,   2*E*I/L,    0, -6*E*I/L**2,   4*E*I/L]
-    ])
-
-    T = np.array([
-        [ c,  s, 0,  0, 0, 0],
-        [-s,  c, 0,  0, 0, 0],
-        [ 0,  0, 1,  0, 0, 0],
-        [ 0,  0, 0,  c, s, 0],
-        [ 0,  0, 0, -s, c, 0],
-        [ 0,  0, 0,  0, 0, 1]
-    ])
-
-    return T.T @ k_local @ T, L
+def member_results_table(members, lengths, f_elems, section, failed):
+    """
+    Internal forces and stresses of each member as a DataFrame, only built on request (display).
+
+    Parameters:
+        members: List of (i, j) node pairs.
+        lengths: (n_members,) member lengths.
+        f_elems: (n_members, 6) member end forces.
+        section: Dictionary of _section_arrays values of the channel.
+        failed: (n_members,) bool array of members failing a strength check.
+    """
+    A, I, c = section["A"], section["I"], section["c"]
+    axial, shear, moment = f_elems[:, 3], f_elems[:, 4], f_elems[:, 5]
+    return pd.DataFrame({
+        "Member": [f"{i}-{j}" for i, j in members],
+        "Length (in)": lengths,
+        "Axial Force (lbf)": axial,
+        "Shear Force (lbf)": shear,
+        "Bending Moment (lbf-in)": moment,
+        "Axial Stress (psi)": axial / A,
+        "Shear Stress (psi)": shear / A,
+        "Bending Stress (psi)": moment * c / I,
+        "Fails?": failed,
+    })
+
+def evaluate_frames(batch, q, base_members=None, load_cases=None, span=None, water_height_in=None):
+    """
+    Evaluate a batch of frames that share the same nodes and members, e.g. the gauge x profile
+    variants of one node count and diagonal plan, with a single stacked (batched LAPACK) solve.
+    The stiffness of each variant is a scaling of the topology's EA and EI basis matrices, and
+    mirror-symmetric frames are solved as a half model. With the banded cfg.frame_solver (or 'auto' on
+    frames of more than BANDED_MIN_NODES nodes) the frames are solved one by one with the sparse banded solver.
+
+    Parameters:
+        batch: List of (nodes, members, channel) tuples; nodes and members must be the same for all
+            (nodes may be a FrameModel, see calculate_wall_frame_structural).
+        q: Uniform distributed load applied to the frame (lbf/in).
+        base_members: Members of a sub-frame on the same nodes (e.g. diagonal plan A). When the members
+            added to it only touch a few free dofs, the batch is solved as a low-rank (Woodbury) update
+            of the sub-frame's cached Cholesky factors instead of a new factorization.
+        load_cases, span, water_height_in: Load cases checked in addition to the top load, see
+            calculate_wall_frame_structural. Every case is one more right-hand side of the same solve.
+
+    Returns:
+        passed: (n_frames,) bool array, the verdict of calculate_wall_frame_structural for each frame.
+        utilization: (n_frames, n_members) array of the governing check ratio of each member over all
+            load cases (> 1 fails).
+    """
+    nodes, members, _ = batch[0]
+    xy, member_ids = frame_arrays(nodes, members)
+    basis = frame_basis(xy, member_ids)
+    sections = _section_arrays([channel for _, _, channel in batch])
+    EA = (sections["E"] * sections["A"])[:, None, None]
+    EI = (sections["E"] * sections["I"])[:, None, None]
+
+    free_dofs = basis["free_dofs"]
+    cases, factors, F_cases = _case_loads(xy, q, load_cases, span, water_height_in)
+    F_f = F_cases[:, free_dofs].T
+    solver = cfg.frame_solver
+    if solver == 'auto':
+        solver = 'banded' if len(xy) > BANDED_MIN_NODES else 'dense'
+    u_f, symmetry = None, None
+    if solver == 'banded':  # One sparse banded solve per frame, the stacked dense solve grows cubically
+        K_sparse = _sparse_free_stiffness(basis)
+        u_f = _solve_frames_banded(K_sparse, EA, EI, F_f)
+    elif base_members is not None:
+        u_f = _reanalysis_solve(nodes, member_ids, base_members, EA, EI, F_f)
+    if u_f is None:
+        symmetry = _half_model(basis, F_f)
+    if symmetry is not None:
+        K_half = EA * symmetry["K_axial"] + EI * symmetry["K_bending"]
+        F_half = _to_half(symmetry, F_f)
+        u_half = _solve_frames(K_half, np.broadcast_to(F_half, (len(batch),) + F_half.shape))
+        u_f = symmetry["coef"][:, None] * u_half[:, symmetry["half"]]
+    elif u_f is None:
+        K_ff = EA * basis["K_axial_ff"] + EI * basis["K_bending_ff"]
+        u_f = _solve_frames(K_ff, np.broadcast_to(F_f, (len(batch),) + F_f.shape))
+    u_global = np.zeros((len(batch), len(cases), len(free_dofs)))
+    u_global[:, :, free_dofs] = np.swapaxes(u_f, 1, 2)
+
+    # (n_frames, n_cases, n_members, ...) from here on
+    EA, EI = EA[:, None], EI[:, None]
+    u_elems = u_global[:, :, basis["dof_maps"]]
+    f_elems = (EA * np.einsum('mij,bcmj->bcmi', basis["k_axial"], u_elems)
+               + EI * np.einsum('mij,bcmj->bcmi', basis["k_bending"], u_elems))
+    q_cases = np.where(factors[:, 0] > 0, q, 0.0)[:, None]  # Top edge bending only where the top load acts
+    checks = _member_utilization(f_elems, u_elems, basis["lengths"], basis["top_members"], q_cases,
+                                 {k: v[:, None, None] for k, v in sections.items()})
+    if cfg.frame_buckling == 'global':
+        axial = _axial_forces(basis, u_elems, EA[..., 0])
+        if solver == 'banded':
+            load_factors = _sparse_load_factors(basis, K_sparse, EA.ravel(), EI.ravel(), axial)
+        else:
+            K_ff = EA[:, 0] * basis["K_axial_ff"] + EI[:, 0] * basis["K_bending_ff"]
+            load_factors = buckling_load_factors(K_ff[:, None], _geometric_stiffness(basis, axial))
+        checks["buckling"] = _frame_buckling_utilization(axial, load_factors[..., None], sections["phi_buckling"][:, None, None])
+    utilization = np.max(np.stack(list(checks.values())), axis=(0, 2))
+    utilization[~np.isfinite(u_f).all(axis=(1, 2))] = np.inf  # Singular stiffness (mechanism)
+    return ~(utilization > 1).any(axis=1), utilization
+
+def _solve_frames(K, F):
+    """
+    Batched solve of K (n_frames, n, n) u = F (n_frames, n, n_cases). A frame with a singular stiffness
+    (a mechanism) gets nan displacements instead of failing the whole batch.
+    """
+    try:
+        return np.linalg.solve(K, F)
+    except np.linalg.LinAlgError:
+        u = np.full(F.shape, np.nan)
+        for i in range(len(K)):
+            try:
+                u[i] = np.linalg.solve(K[i], F[i])
+            except np.linalg.LinAlgError:
+                pass
+        return u
+
+def _sparse_free_stiffness(basis):
+    """
+    Sparse free-dof EA and EI basis matrices of a topology, for the banded solver.
+    """
+    free = np.flatnonzero(basis["free_dofs"])
+    total_dof = len(basis["free_dofs"])
+    return tuple(_assemble_sparse(basis[k], basis["dof_maps"], total_dof)[free][:, free] for k in ("k_axial", "k_bending"))
+
+def _solve_frames_banded(K_sparse, EA, EI, F_f):
+    """
+    Solve a batch frame by frame with _solve_banded. A frame with a singular stiffness (a mechanism)
+    gets nan displacements, like _solve_frames.
+    """
+    K_axial, K_bending = K_sparse
+    u = np.full((len(EA),) + F_f.shape, np.nan)
+    for i, (ea, ei) in enumerate(zip(EA.ravel(), EI.ravel())):
+        try:
+            u[i] = _solve_banded((ea * K_axial + ei * K_bending).tocsr(), F_f)
+        except LinAlgError:
+            pass
+    return u
+
+def _sparse_load_factors(basis, K_sparse, EA, EI, axial):
+    """
+    (n_frames, n_cases) critical load factors with _buckling_load_factor_sparse, for the banded solver.
+    """
+    K_axial, K_bending = K_sparse
+    free = np.flatnonzero(basis["free_dofs"])
+    total_dof = len(basis["free_dofs"])
+    load_factors = np.zeros(axial.shape[:2])
+    for i, (ea, ei) in enumerate(zip(EA, EI)):
+        K_ff = (ea * K_axial + ei * K_bending).tocsr()
+        for c, N in enumerate(axial[i]):
+            if np.isfinite(N).all():
+                K_G = _assemble_sparse(N[:, None, None] * basis["k_geometric"], basis["dof_maps"], total_dof)[free][:, free]
+                load_factors[i, c] = _buckling_load_factor_sparse(K_ff, K_G)
+    return load_factors
+
+def _reanalysis_solve(nodes, members, base_members, EA, EI, F_f):
+    """
+    Solve (K_base + dK) u = F with the Woodbury identity, where K_base is the stiffness of the
+    base members and dK that of the added ones. dK is nonzero only on the set S of free dofs the
+    added members touch, so with Z = K_base^-1[:, S] and C = dK[S, S]:
+
+        u = u_base - Z (I + C Z[S]) ^-1 C u_base[S]
+
+    The Cholesky factors of K_base are cached per base topology and section batch, so the diagonal
+    plans of a node count share the factorization of plan A. Whether the update is low-rank enough
+    is decided from the members alone, before any stiffness is assembled.
+
+    Returns:
+        (n_frames, n_free, n_cases) free dof displacements, or None when the base does not apply (not a
+        subset of the members), the update is not low-rank enough to pay off or K_base is not positive definite.
+    """
+    xy, base_ids = frame_arrays(nodes, base_members)
+    base = {tuple(sorted(m)) for m in base_ids.tolist()}
+    added = [m for m in np.asarray(members).tolist() if tuple(sorted(m)) not in base]
+    if len(members) - len(added) != len(base):
+        return None
+
+    # The added members touch the dofs of their free (not bottom edge) end nodes
+    free_nodes = xy[:, 1] != 0
+    touched = np.unique(np.asarray(added, dtype=np.int64).reshape(-1))
+    if len(touched[free_nodes[touched]]) > REANALYSIS_MAX_RANK * free_nodes.sum():
+        return None
+
+    base_basis = frame_basis(xy, sorted(base))
+    n_free = int(base_basis["free_dofs"].sum())
+    if added:
+        added_basis = frame_basis(xy, added)
+        dK_axial, dK_bending = added_basis["K_axial_ff"], added_basis["K_bending_ff"]
+        S = np.flatnonzero((dK_axial != 0).any(axis=1) | (dK_bending != 0).any(axis=1))
+    else:
+        S = np.zeros(0, dtype=np.int64)
+
+    key = (base_basis["key"], EA.tobytes(), EI.tobytes())
+    factors = _factor_cache.get(key)
+    if factors is None:
+        try:
+            factors = [cho_factor(K) for K in EA * base_basis["K_axial_ff"] + EI * base_basis["K_bending_ff"]]
+        except LinAlgError:  # Not positive definite (e.g. plan A alone is a mechanism), solve directly
+            return None
+        if len(_factor_cache) >= FACTOR_CACHE_SIZE:
+            _factor_cache.clear()
+        _factor_cache[key] = factors
+
+    u_base = np.stack([cho_solve(factor, F_f) for factor in factors])
+    if not len(S):
+        return u_base
+    C = EA * dK_axial[np.ix_(S, S)] + EI * dK_bending[np.ix_(S, S)]
+    Z = np.stack([cho_solve(factor, np.eye(n_free)[:, S]) for factor in factors])
+    M = np.eye(len(S)) + C @ Z[:, S, :]
+    correction = np.linalg.solve(M, C @ u_base[:, S])
+    return u_base - Z @ correction
+
+def frame_basis(nodes, members=None):
+    """
+    Geometry-only stiffness basis of a frame topology: K = EA * K_axial + EI * K_bending.
+    Computed once per topology and cached, so every channel section of a gauge x profile
+    sweep only scales and re-solves.
+
+    Parameters:
+        nodes, members: The frame, in any form accepted by frame_model.frame_arrays.
+
+    Returns:
+        Dictionary with the node coordinates, member ids, dof maps, lengths and unit directions,
+        the element bases k_axial/k_bending/k_geometric (n_members, 6, 6), the free-dof bases K_axial_ff/K_bending_ff,
+        the free-dof mask (bottom edge nodes are fixed), the top edge member mask and the
+        half-model reduction of mirror-symmetric frames (None otherwise, see _mirror_symmetry).
+    """
+    xy, member_ids = frame_arrays(nodes, members)
+    xy, member_ids = np.asarray(xy, dtype=float), member_ids.astype(np.int64)
+    key = (xy.tobytes(), member_ids.tobytes())
+    basis = _basis_cache.get(key)
+    if basis is not None:
+        return basis
+
+    total_dof = len(xy) * 3
+    dof_maps = _dof_maps(member_ids)
+    k_axial, k_bending, k_geometric, lengths = _frame_stiffness_basis(xy[member_ids[:, 0]], xy[member_ids[:, 1]])
+    free_dofs = np.repeat(xy[:, 1] != 0, 3)
+    free = np.ix_(free_dofs, free_dofs)
+    max_y = xy[:, 1].max()
+    K_axial_ff = _assemble(k_axial, dof_maps, total_dof)[free]
+    K_bending_ff = _assemble(k_bending, dof_maps, total_dof)[free]
+
+    symmetry = _mirror_symmetry(xy, member_ids, free_dofs)
+    if symmetry is not None:
+        symmetry["K_axial"] = _to_half(symmetry, K_axial_ff)
+        symmetry["K_bending"] = _to_half(symmetry, K_bending_ff)
+
+    basis = {
+        "key": key,
+        "xy": xy,
+        "member_ids": member_ids,
+        "dof_maps": dof_maps,
+        "lengths": lengths,
+        "k_axial": k_axial,
+        "k_bending": k_bending,
+        "k_geometric": k_geometric,
+        "directions": (xy[member_ids[:, 1]] - xy[member_ids[:, 0]]) / lengths[:, None],
+        "K_axial_ff": K_axial_ff,
+        "K_bending_ff": K_bending_ff,
+        "free_dofs": free_dofs,
+        "symmetry": symmetry,
+        "top_members": (xy[member_ids[:, 0], 1] == max_y) & (xy[member_ids[:, 1], 1] == max_y),
+    }
+    if len(_basis_cache) >= BASIS_CACHE_SIZE:
+        _basis_cache.clear()
+    _basis_cache[key] = basis
+    return basis
+
+def _mirror_symmetry(xy, member_ids, free_dofs):
+    """
+    Half-model reduction of a frame that is mirror-symmetric about its vertical centerline.
+
+    Under a symmetric load the mirrored dofs of a node pair are equal up to sign (u and the rotation
+    flip, v does not) and the centerline nodes can only move vertically, so u_f = T u_half where u_half
+    holds the dofs of the nodes left of and on the centerline. T has one entry per row and is stored
+    as the half-model index and coefficient (0 for the dofs symmetry fixes) of every free dof.
+
+    Returns:
+        None when the nodes or members are not mirror-symmetric, else a dictionary with the mirrored
+        free dof and its sign of every free dof (mirror, sign), the reduction (half, coef) and the
+        number of half-model dofs (n_half).
+    """
+    tol = 1e-6 * max(1.0, np.abs(xy).max())
+    center = xy[:, 0].min() + xy[:, 0].max()  # Twice the centerline x
+    index = {(round(x / tol), round(y / tol)): i for i, (x, y) in enumerate(xy.tolist())}
+    mirror_node = np.array([index.get((round((center - x) / tol), round(y / tol)), -1) for x, y in xy.tolist()])
+    if (mirror_node < 0).any():
+        return None
+    members = {tuple(m) for m in np.sort(member_ids, axis=1).tolist()}
+    if members != {tuple(m) for m in np.sort(mirror_node[member_ids], axis=1).tolist()}:
+        return None
+
+    free = np.flatnonzero(free_dofs)
+    free_index = np.full(len(free_dofs), -1)
+    free_index[free] = np.arange(len(free))
+    node, component = free // 3, free % 3
+    mirror = free_index[3 * mirror_node[node] + component]
+    sign = np.where(component == 1, 1.0, -1.0)
+
+    side = np.sign(np.round((2 * xy[node, 0] - center) / tol))  # -1 left, 0 on, +1 right of the centerline
+    coef = np.where(side < 0, 1.0, np.where(side > 0, sign, (component == 1).astype(float)))
+    representative = np.where(side > 0, mirror, np.arange(len(free)))
+    kept = np.unique(representative[coef != 0])
+    half = np.searchsorted(kept, representative)
+    half[coef == 0] = 0
+    return {"mirror": mirror, "sign": sign, "half": half, "coef": coef, "n_half": len(kept)}
+
+def _to_half(symmetry, A):
+    """
+    Reduce a free-dof load vector/matrix (n_free, ...) or stiffness matrix (n_free, n_free) to the
+    half model: T^T F, or T^T K T.
+    """
+    half, coef, n_half = symmetry["half"], symmetry["coef"], symmetry["n_half"]
+    if A.ndim == 2 and A.shape == (len(half), len(half)):
+        weights = coef[:, None] * coef[None, :] * A
+        K = np.bincount((half[:, None] * n_half + half[None, :]).ravel(), weights=weights.ravel(), minlength=n_half * n_half)
+        return K.reshape(n_half, n_half)
+    F = np.zeros((n_half,) + A.shape[1:])
+    np.add.at(F, half, coef.reshape((-1,) + (1,) * (A.ndim - 1)) * A)
+    return F
+
+def _half_model(basis, F_f):
+    """
+    The basis' half-model reduction when the frame and every load vector in F_f (n_free, ...) are
+    mirror-symmetric and cfg.frame_symmetry is set, else None.
+    """
+    symmetry = basis["symmetry"]
+    if not cfg.frame_symmetry or symmetry is None:
+        return None
+    mirrored = symmetry["sign"].reshape((-1,) + (1,) * (F_f.ndim - 1)) * F_f[symmetry["mirror"]]
+    scale = np.abs(F_f).max()
+    return symmetry if np.allclose(mirrored, F_f, rtol=0, atol=1e-9 * scale) else None
+
+def _axial_forces(basis, u_elems, EA):
+    """
+    Member axial forces (tension positive) from the member end displacements (..., n_members, 6);
+    EA broadcasts against (..., n_members).
+    """
+    du = u_elems[..., 3:5] - u_elems[..., 0:2]
+    return EA * np.sum(du * basis["directions"], axis=-1) / basis["lengths"]
+
+def _geometric_stiffness(basis, axial):
+    """
+    Free-dof geometric stiffness matrices (..., n_free, n_free) of a frame for axial forces (..., n_members).
+    """
+    axial = np.asarray(axial, dtype=float)
+    batch = axial.reshape(-1, axial.shape[-1])
+    total_dof = len(basis["free_dofs"])
+    dof_maps = basis["dof_maps"]
+    index = (np.repeat(dof_maps, 6, axis=1) * total_dof + np.tile(dof_maps, (1, 6))).ravel()
+    index = (np.arange(len(batch))[:, None] * total_dof**2 + index).ravel()
+    weights = (batch[:, :, None, None] * basis["k_geometric"]).ravel()
+    K_G = np.bincount(index, weights=weights, minlength=len(batch) * total_dof**2).reshape(-1, total_dof, total_dof)
+    free = basis["free_dofs"]
+    return K_G[:, free][:, :, free].reshape(axial.shape[:-1] + (int(free.sum()),) * 2)
+
+def buckling_load_factors(K_ff, K_G):
+    """
+    Critical load factors of a linear buckling analysis: the lowest lambda > 0 for which
+    K + lambda * K_G is singular, for batches of dense stiffness and geometric stiffness matrices.
+
+    With the Cholesky factor K = L L^T this is the largest eigenvalue mu = 1/lambda of the
+    symmetric L^-1 (-K_G) L^-T, so a batch is one stacked factorization and eigenvalue solve.
+
+    Returns:
+        (...,) load factors, inf where no member is compressed enough to buckle the frame and 0 where
+        K_ff is not positive definite (a mechanism, unstable without any load).
+    """
+    K_ff, K_G = np.broadcast_arrays(K_ff, K_G)
+    mechanism = np.zeros(K_ff.shape[:-2], dtype=bool)
+    try:
+        L = np.linalg.cholesky(K_ff)
+    except np.linalg.LinAlgError:  # Factor frame by frame, so only the mechanisms fail
+        L = np.broadcast_to(np.eye(K_ff.shape[-1]), K_ff.shape).copy()
+        for i in np.ndindex(K_ff.shape[:-2]):
+            try:
+                L[i] = np.linalg.cholesky(K_ff[i])
+            except np.linalg.LinAlgError:
+                mechanism[i] = True
+        K_G = np.where(mechanism[..., None, None], 0.0, K_G)  # Their axial forces may not be finite
+    X = np.linalg.solve(L, -K_G)
+    mu = np.linalg.eigvalsh(np.linalg.solve(L, np.swapaxes(X, -1, -2)))[..., -1]
+    with np.errstate(divide='ignore'):
+        return np.where(mechanism, 0.0, np.where(mu > 0, 1 / mu, np.inf))
+
+def _buckling_load_factor_sparse(K_ff, K_G):
+    """
+    Sparse version of buckling_load_factors for one large frame: the largest eigenvalue of
+    K^-1 (-K_G), i.e. a shift-invert about zero of the buckling problem, with one sparse LU of K.
+    """
+    try:
+        lu = splu(K_ff.tocsc())
+    except RuntimeError:  # Singular, a mechanism
+        return 0.0
+    K_inv = LinearOperator(K_ff.shape, matvec=lu.solve, dtype=float)
+    try:
+        mu = eigsh(-K_G, k=1, M=K_ff, Minv=K_inv, which='LA', return_eigenvectors=False)[0]
+    except ArpackNoConvergence:  # Fall back to the dense solve
+        return float(buckling_load_factors(K_ff.toarray(), K_G.toarray()))
+    return 1 / mu if mu > 0 else np.inf
+
+def _frame_buckling_utilization(axial, load_factors, phi_buckling):
+    """
+    Buckling utilization from the frame's critical load factor, assigned to the compressed members
+    (every member fails when the load factor is 0, see buckling_load_factors).
+    """
+    with np.errstate(divide='ignore'):
+        utilization = np.where(axial < 0, 1 / (phi_buckling * load_factors), 0.0)
+    return np.where(load_factors > 0, utilization, np.inf)
+
+def _section_arrays(channels):
+    """
+    Section and material properties of a list of channels as arrays.
+    """
+    factors = [gd.RESISTANCE_FACTORS[channel.material] for channel in channels]
+    return {
+        "E": np.array([gd.MATERIALS[channel.material]["youngs_mod"] for channel in channels], dtype=float),
+        "Fy": np.array([gd.MATERIALS[channel.material]["yield_strength"] for channel in channels], dtype=float),
+        "A": np.array([channel.A for channel in channels], dtype=float),
+        "I": np.array([channel.I for channel in channels], dtype=float),
+        "c": np.array([channel.c for channel in channels], dtype=float),
+        "phi_buckling": np.array([f["buckling"] for f in factors]),
+        "phi_axial": np.array([f["axial"] for f in factors]),
+        "phi_shear": np.array([f["shear"] for f in factors]),
+        "phi_bending": np.array([f["bending"] for f in factors]),
+    }
+
+def _member_utilization(f_elems, u_elems, lengths, top_members, q, section):
+    """
+    Utilization ratios (demand / capacity, > 1 fails) of every member check.
+
+    Parameters:
+        f_elems, u_elems: (..., n_members, 6) member end forces and displacements.
+        lengths: (n_members,) member lengths.
+        top_members: (n_members,) bool mask of the top edge members.
+        section: Dictionary of _section_arrays values, broadcastable against (..., n_members).
+
+    Returns:
+        Dictionary of (..., n_members) arrays for the axial, shear, bending, buckling,
+        top edge bending and deflection checks.
+    """
+    E, Fy, A, I, c = section["E"], section["Fy"], section["A"], section["I"], section["c"]
+    axial, shear, moment = f_elems[..., 3], f_elems[..., 4], f_elems[..., 5]
+
+    buckling_load = (np.pi**2 * E * I) / (gd.EFFECTIVE_LENGTH_FACTOR * lengths)**2
+    top_moment = np.where(top_members, q * lengths**2 / 8, 0.0)
+
+    u_i, v_i, u_j, v_j = u_elems[..., 0], u_elems[..., 1], u_elems[..., 3], u_elems[..., 4]
+    deflection = np.maximum.reduce([np.hypot(u_i, v_i), np.hypot(u_j, v_j), np.hypot(u_j - u_i, v_j - v_i)])
+
+    return {
+        "axial": np.abs(axial / A) / (section["phi_axial"] * Fy),
+        "shear": np.abs(shear / A) / (section["phi_shear"] * 0.6 * Fy),
+        "bending": np.abs(moment * c / I) / (section["phi_bending"] * Fy),
+        "buckling": np.where(axial < 0, -axial, 0.0) / (section["phi_buckling"] * buckling_load),
+        "top_edge_bending": (top_moment * c / I) / (section["phi_bending"] * Fy),
+        "deflection": deflection / (gd.DEFLECTION_LIMIT * lengths),
+    }
+
+def _top_edge_loads(xy, q):
+    """
+    Global load vector of a uniform load q on the top edge, lumped to the top edge nodes.
+    """
+    F_global = np.zeros(len(xy) * 3)
+    i, j = _get_top_edge_pairs(xy)
+    load = q * np.abs(xy[j, 0] - xy[i, 0])
+    node_force = np.zeros(len(xy))
+    np.add.at(node_force, i, load / 2)
+    np.add.at(node_force, j, load / 2)
+    F_global[1::3] -= node_force
+    return F_global
+
+def _case_loads(xy, q, load_cases=None, span=None, water_height_in=None):
+    """
+    Factored global load vectors of the top load case followed by the requested LOAD_CASES.
+
+    Returns:
+        The case names, their (n_cases, 3) component factors and the (n_cases, total_dof) load vectors.
+    """
+    cases = ["top"] + [case for case in load_cases or [] if case != "top"]
+    factors = np.array([LOAD_CASES[case] for case in cases])
+    F_cases = np.zeros((len(cases), len(xy) * 3))
+    F_cases[0] = _top_edge_loads(xy, gd.LOAD_FACTOR * q)
+    if len(cases) > 1:
+        if span is None:
+            raise ValueError("The hydrostatic and wind load cases need the span of the perpendicular walls.")
+        F_cases[1:] = factors[1:] @ _load_components(xy, q, span, water_height_in)
+    return cases, factors, F_cases
+
+def _load_components(xy, q, span, water_height_in=None):
+    """
+    Unfactored global load vectors of the load case components, as a (3, total_dof) array:
+        top: uniform load q on the top edge.
+        hydrostatic: water pushing the perpendicular walls outward; their top reactions (half of each
+            wall's width, triangular pressure up to the water height) pull the top corners apart.
+        wind: wind pressure on a perpendicular wall; half of its top reaction racks this frame
+            through the windward top corner.
+
+    span is the width of the perpendicular walls (cfg.y_in for an X wall frame, cfg.x_in for a Y wall frame).
+    """
+    height = xy[:, 1].max()
+    top = np.flatnonzero(xy[:, 1] == height)
+    left, right = top[np.argmin(xy[top, 0])], top[np.argmax(xy[top, 0])]
+    water_height = min(cfg.water_height_in if water_height_in is None else water_height_in, height)
+
+    F = np.zeros((3, len(xy) * 3))
+    F[0] = _top_edge_loads(xy, q)
+
+    # Resultant gamma * h²/2 per unit width at h/3 above the base, the top carries (h/3) / height of it
+    hydrostatic = GAMMA_WATER * water_height**2 / 2 * (span / 2) * (water_height / 3) / height
+    F[1, 3*left] -= hydrostatic
+    F[1, 3*right] += hydrostatic
+
+    wind_pressure_psi = (gd.WIND_PRESSURE_RATING / 144) * gd.WIND_RESISTANCE_FACTOR
+    F[2, 3*left] += wind_pressure_psi * height * span / 4
+    return F
+
+def _get_top_edge_pairs(xy):
+    """
+    Consecutive top edge node pairs, sorted by x, as (i, j) id arrays.
+    """
+    top = np.flatnonzero(xy[:, 1] == xy[:, 1].max())
+    top = top[np.argsort(xy[top, 0], kind='stable')]
+    return top[:-1], top[1:]
+
+def _frame_stiffness_basis(xy_i, xy_j):
+    """
+    Element stiffness matrices per unit EA (axial) and per unit EI (bending), and geometric
+    stiffness per unit axial force (tension positive), in global axes.
+
+    Returns:
+        (n_members, 6, 6) k_axial, k_bending and k_geometric, and (n_members,) lengths.
+    """
+    d = np.asarray(xy_j, dtype=float) - np.asarray(xy_i, dtype=float)
+    L = np.hypot(d[:, 0], d[:, 1])
+    c = d[:, 0] / L
+    s = d[:, 1] / L
+
+    k_axial = np.zeros((len(L), 6, 6))
+    k_axial[:, 0, 0] = k_axial[:, 3, 3] = 1/L
+    k_axial[:, 0, 3] = k_axial[:, 3, 0] = -1/L
+
+    k_bending = np.zeros((len(L), 6, 6))
+    shear = 12/L**3
+    k_bending[:, 1, 1] = k_bending[:, 4, 4] = shear
+    k_bending[:, 1, 4] = k_bending[:, 4, 1] = -shear
+    coupling = 6/L**2
+    k_bending[:, 1, 2] = k_bending[:, 2, 1] = k_bending[:, 1, 5] = k_bending[:, 5, 1] = coupling
+    k_bending[:, 2, 4] = k_bending[:, 4, 2] = k_bending[:, 4, 5] = k_bending[:, 5, 4] = -coupling
+    k_bending[:, 2, 2] = k_bending[:, 5, 5] = 4/L
+    k_bending[:, 2, 5] = k_bending[:, 5, 2] = 2/L
+
+    k_geometric = np.zeros((len(L), 6, 6))
+    k_geometric[:, 0, 0] = k_geometric[:, 3, 3] = 1/L
+    k_geometric[:, 0, 3] = k_geometric[:, 3, 0] = -1/L
+    k_geometric[:, 1, 1] = k_geometric[:, 4, 4] = 6/(5*L)
+    k_geometric[:, 1, 4] = k_geometric[:, 4, 1] = -6/(5*L)
+    k_geometric[:, 1, 2] = k_geometric[:, 2, 1] = k_geometric[:, 1, 5] = k_geometric[:, 5, 1] = 1/10
+    k_geometric[:, 2, 4] = k_geometric[:, 4, 2] = k_geometric[:, 4, 5] = k_geometric[:, 5, 4] = -1/10
+    k_geometric[:, 2, 2] = k_geometric[:, 5, 5] = 2*L/15
+    k_geometric[:, 2, 5] = k_geometric[:, 5, 2] = -L/30
+
+    T = np.zeros((len(L), 6, 6))
+    for o in (0, 3):
+        T[:, o, o] = T[:, o + 1, o + 1] = c
+        T[:, o, o + 1] = s
+        T[:, o + 1, o] = -s
+        T[:, o + 2, o + 2] = 1
+
+    rotate = lambda k: np.einsum('mji,mjk,mkl->mil', T, k, T, optimize=True)
+    return rotate(k_axial), rotate(k_bending), rotate(k_geometric), L
+
+def _dof_maps(member_ids):
+    """
+    Global dof indices [3i, 3i+1, 3i+2, 3j, 3j+1, 3j+2] of each member, as an (n_members, 6) array.
+    """
+    return (3 * member_ids[:, [0, 0, 0, 1, 1, 1]] + np.array([0, 1, 2, 0, 1, 2])).astype(np.int64)
+
+def _assemble(k_elems, dof_maps, total_dof):
+    """
+    Scatter-add a batch of element matrices into the global stiffness matrix.
+    """
+    rows = np.repeat(dof_maps, 6, axis=1).ravel()
+    cols = np.tile(dof_maps, (1, 6)).ravel()
+    K = np.bincount(rows * total_dof + cols, weights=k_elems.ravel(), minlength=total_dof * total_dof)
+    return K.reshape(total_dof, total_dof)
+
+def _assemble_sparse(k_elems, dof_maps, total_dof):
+    """
+    Sparse (CSR) version of _assemble; duplicate dof pairs are summed.
+    """
+    rows = np.repeat(dof_maps, 6, axis=1).ravel()
+    cols = np.tile(dof_maps, (1, 6)).ravel()
+    return coo_matrix((k_elems.ravel(), (rows, cols)), shape=(total_dof, total_dof)).tocsr()
+
+def _solve_banded(K, F):
+    """
+    Solve a sparse SPD system with a banded Cholesky factorization after Reverse Cuthill-McKee
+    renumbering. Wall frames are long and thin, so the reordered band stays narrow and the cost
+    grows linearly with the number of nodes instead of cubically.
+    """
+    perm = reverse_cuthill_mckee(K, symmetric_mode=True)
+    Kp = K[perm][:, perm].tocoo()
+    upper = Kp.row <= Kp.col
+    rows, cols, vals = Kp.row[upper], Kp.col[upper], Kp.data[upper]
+    bandwidth = int((cols - rows).max()) if len(vals) else 0
+    ab = np.zeros((bandwidth + 1, K.shape[0]))
+    np.add.at(ab, (bandwidth + rows - cols, cols), vals)
+    try:
+        u = cho_solve_banded((cholesky_banded(ab), False), F[perm])
+    except LinAlgError:  # Not positive definite (e.g. a mechanism), leave it to the general solver
+        return solve(K.toarray(), F)
+    u_global = np.empty_like(u)
+    u_global[perm] = u
+    return u_global
 
 def distribute_load(x, y, q):
     perimeter = 2 * (x + y)
     return q / perimeter
 
 def check_nodes(x, z, nodes):
-    check = True
-    for node in nodes.values():
-        if (node[0] == 0 or node[0] == x) and (0 <= node[1] <= z):
-            pass
-        elif (node[1] == 0 or node[1] == z) and (0 <= node[0] <= x):
-            pass
-        else:
-            print(f"Node {node} out of bounds: {0 <= node[0] <= x} and {0 <= node[1] <= z}")
-            check = False
-    return check
\ No newline at end of file
+    xy, _ = frame_arrays(nodes, [])
+    on_side = ((xy[:, 0] == 0) | (xy[:, 0] == x)) & (xy[:, 1] >= 0) & (xy[:, 1] <= z)
+    on_edge = ((xy[:, 1] == 0) | (xy[:, 1] == z)) & (xy[:, 0] >= 0) & (xy[:, 0] <= x)
+    for node in xy[~(on_side | on_edge)].tolist():
+        print(f"Node {node} out of bounds: {0 <= node[0] <= x} and {0 <= node[1] <= z}")
+    return bool((on_side | on_edge).all())
@@ -0,0 +1,28 @@
+"""
+Shared fixtures. The optimizer modules import each other flat (as main.py runs them), so their folder is put on
+the import path here.
+"""
+import os
+import sys
+import pytest # type: ignore
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'optimizer'))
+
+import config as cfg  # noqa: E402
+import cost  # noqa: E402
+from tests.synthetic_workbook import make_workbook  # noqa: E402
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """
+    Path of a synthetic cost calculator workbook, costed with the native backend and caches under tmp_path.
+    """
+    path = str(tmp_path / 'cost_calculator.xlsx')
+    make_workbook(path)
+    monkeypatch.setattr(cfg, 'cost_backend', 'native')
+    monkeypatch.setattr(cfg, 'cost_calc_path', path)
+    monkeypatch.setattr(cfg, 'cost_cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(cfg, 'cost_shards', 1)
+    yield path
+    cost.close_sessions()
@@ -0,0 +1,109 @@
+"""
+Small cost calculator workbook with the same sheets and table layout as the real one, and a plain Python
+evaluation of its formulas to check the costing pipeline against.
+"""
+import fnmatch
+from openpyxl import Workbook # type: ignore
+
+THICKNESS = {8: 0.16, 10: 0.13, 12: 0.1, 14: 0.075, 16: 0.06, 18: 0.047}
+PRICE = {'GLV-M5': 1.5, 'SST-M3': 4.0}
+RATES = {'Auto Tube Laser': 0.02, 'Manual Shear Punch': 0.05, 'Auto Punch Shear': 0.03,
+         'Auto Panel Bender': 2.0, 'Roll Form (outsourced)': 1.0, 'Manual Press Brake': 3.0}
+WELD_RATE = 0.8
+
+
+def make_workbook(path):
+    """
+    Write the synthetic workbook to path. Joints count towards a design through the Summary's "*_<design>:*"
+    criterion on their first part, like the real calculator.
+    """
+    wb = Workbook()
+    parts = wb.active
+    parts.title = 'BAC Part List'
+    joints = wb.create_sheet('Joints List')
+    summary = wb.create_sheet('Summary')
+    rates = wb.create_sheet('Rates')
+
+    rates['A1'], rates['B1'] = 'Material', 'Price'
+    for row, (material, price) in enumerate(PRICE.items(), start=2):
+        rates[f'A{row}'], rates[f'B{row}'] = material, price
+    rates['D1'], rates['E1'] = 'Process', 'Rate'
+    for row, (process, rate) in enumerate(RATES.items(), start=2):
+        rates[f'D{row}'], rates[f'E{row}'] = process, rate
+    rates['G1'], rates['H1'] = 'Gauge', 'Thickness'
+    for row, (gauge, thickness) in enumerate(THICKNESS.items(), start=2):
+        rates[f'G{row}'], rates[f'H{row}'] = gauge, thickness
+    rates['J1'], rates['J2'] = 'Weld rate', WELD_RATE
+
+    for col in range(1, 20):
+        parts.cell(row=3, column=col, value=f'h{col}')
+    parts['O4'] = '=IF($A4="","",L4*M4*VLOOKUP(G4,Rates!$G$2:$H$7,2,FALSE)*0.284*C4)'
+    parts['P4'] = '=IF($A4="","",O4*VLOOKUP(F4,Rates!$A$2:$B$3,2,FALSE))'
+    parts['Q4'] = '=IF($A4="","",I4*C4*INDEX(Rates!$E$2:$E$7,MATCH(D4,Rates!$D$2:$D$7,0)))'
+    parts['R4'] = '=IF($A4="","",J4*C4*IFERROR(VLOOKUP(E4,Rates!$D:$E,2,FALSE),0))'
+    parts['S4'] = '=IF($A4="","",ROUND(SUM(P4:R4)+IF(N4="Class 1",5,IF(N4="Class 2",10,20)),2))'
+
+    for col in range(1, 5):
+        joints.cell(row=3, column=col, value=f'h{col}')
+    joints['D4'] = '=IF(A4="","",C4*Rates!$J$2)'
+
+    summary['A1'], summary['B1'] = 'Design', 'Type'
+    summary['C2'] = "=SUMIF('BAC Part List'!$A:$A,A2,'BAC Part List'!$O:$O)"
+    summary['D2'] = "=SUMIF('BAC Part List'!$A:$A,A2,'BAC Part List'!$P:$P)"
+    summary['E2'] = "=SUMIF('BAC Part List'!$A:$A,A2,'BAC Part List'!$Q:$Q)"
+    summary['F2'] = "=SUMIF('BAC Part List'!$A:$A,A2,'BAC Part List'!$R:$R)"
+    summary['G2'] = "=SUMIFS('Joints List'!$D:$D,'Joints List'!$A:$A,\"*_\"&A2&\":*\")"
+    summary['H2'] = "=COUNTIF('BAC Part List'!$A:$A,A2)"
+    summary['I2'] = '=IF(B2="Water Collection Welded",G2,0)'
+    summary['J2'] = "=SUMIF('BAC Part List'!$A:$A,A2,'BAC Part List'!$S:$S)"
+    summary['K2'] = '=ROUND(J2+I2+50,2)'
+    wb.save(path)
+
+
+def expected_summary(part_entries, joint_entries, submodule_type='Water Collection Welded'):
+    """
+    Summary rows of the synthetic workbook, evaluated in plain Python.
+    """
+    rows = []
+    for design in dict.fromkeys(entry[0] for entry in part_entries):
+        parts = [entry for entry in part_entries if entry[0] == design]
+        weight = [p[11] * p[12] * THICKNESS[p[6]] * 0.284 * p[2] for p in parts]
+        material = [w * PRICE[p[5]] for w, p in zip(weight, parts)]
+        cutting = [p[8] * p[2] * RATES[p[3]] for p in parts]
+        bending = [p[9] * p[2] * RATES.get(p[4], 0) for p in parts]
+        total = [round(m + c + b + (5 if p[13] == 'Class 1' else 10 if p[13] == 'Class 2' else 20), 2)
+                 for m, c, b, p in zip(material, cutting, bending, parts)]
+        welding = sum(j[2] * WELD_RATE for j in joint_entries if fnmatch.fnmatch(str(j[0]).lower(), f'*_{design}:*'.lower()))
+        welded = welding if submodule_type == 'Water Collection Welded' else 0
+        rows.append([design, submodule_type, sum(weight), sum(material), sum(cutting), sum(bending), welding,
+                     len(parts), welded, sum(total), round(sum(total) + welded + 50, 2)])
+    return rows
+
+
+def sample_entries():
+    """
+    Part and joint entries of three small wall designs, in the format of helpers.get_part_and_joint_entries.
+    """
+    part_entries, joint_entries = [], []
+    for design, (gauge, material, n_panels) in {'XW1': (14, 'GLV-M5', 3), 'XW2': (12, 'GLV-M5', 4),
+                                                 'YW1': (16, 'SST-M3', 2)}.items():
+        part_entries.append([design, f'W_Panel_X_{design}', n_panels, 'Manual Shear Punch', 'Auto Panel Bender', material,
+                             gauge, 0, 280.0, 4, 4, 110.0, 33.0, 'Class 3'])
+        part_entries.append([design, f'W_Channel_{design}', 2 * n_panels, 'Auto Tube Laser', '', 'GLV-M5',
+                             gauge, 0, 90.0, 0, 0, 27.0, 4.0, 'Class 1'])
+        part_entries.append([design, f'W_Cap_{design}', 1, 'Auto Punch Shear', 'Manual Press Brake', material,
+                             gauge, 0, 120.0, 2, 2, 60.0, 6.0, 'Class 2'])
+        for k in range(1, n_panels + 1):
+            joint_entries.append([f'W_Panel_X_{design}:{k}', f'W_Channel_{design}:{k}', 27])
+            joint_entries.append([f'W_Cap_{design}:1', f'W_Panel_X_{design}:{k}', 12.5])
+    return part_entries, joint_entries
+
+
+def assert_rows_close(actual, expected, rel=1e-9):
+    assert len(actual) == len(expected)
+    for row, expected_row in zip(actual, expected):
+        for value, expected_value in zip(row, expected_row):
+            if isinstance(expected_value, float):
+                assert abs(value - expected_value) <= rel * max(1.0, abs(expected_value)), (row[0], value, expected_value)
+            else:
+                assert value == expected_value, (row[0], value, expected_value)
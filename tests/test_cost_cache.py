@@ -0,0 +1,30 @@
+import os
+
+from cost import CalculatorSession
+from cost_cache import RowCostCache
+from cost_params import PACK_VERSION
+from tests.synthetic_workbook import expected_summary, sample_entries, assert_rows_close
+
+
+def test_unreadable_cache_starts_empty(tmp_path):
+    for content in (b'not a pickle', b'\x80\x04K\x01.'):  # Garbage and a pickled int
+        path = tmp_path / 'row_costs.pkl'
+        path.write_bytes(content)
+        cache = RowCostCache(str(path))
+        assert len(cache.entries) == 0
+        cache.put('key', (1.0,))
+        cache.save()
+        assert RowCostCache(str(path)).get('key') == (1.0,)
+
+
+def test_cached_rows_match_fresh_costing(workbook):
+    part_entries, joint_entries = sample_entries()
+    expected = expected_summary(part_entries, joint_entries)
+    for _ in range(2):  # The second session reads the rows persisted by the first
+        session = CalculatorSession(workbook, 'native')
+        try:
+            assert_rows_close(session.evaluate(part_entries, joint_entries), expected)
+        finally:
+            session.close()
+    cache_files = [name for name in os.listdir(os.path.join(os.path.dirname(workbook), 'cache')) if name.startswith('row_costs.')]
+    assert len(cache_files) == 1 and cache_files[0].endswith(f'.v{PACK_VERSION}.pkl')
@@ -0,0 +1,82 @@
+import numpy as np # type: ignore
+import pytest # type: ignore
+from openpyxl import load_workbook # type: ignore
+
+import config as cfg
+import cost
+import general_data as gd
+from cost import CalculatorSession
+from cost_cache import RowCostCache
+from cost_engine import PART_SHEET, load_cost_engine
+from tests.synthetic_workbook import expected_summary, sample_entries, assert_rows_close
+
+
+@pytest.mark.parametrize("submodule_type", [gd.WATER_COLLECTION_WELDED, gd.WATER_DISTRIBUTION])
+def test_native_engine_matches_workbook_values(workbook, submodule_type):
+    part_entries, joint_entries = sample_entries()
+    session = CalculatorSession(workbook, 'native')
+    try:
+        values = session.evaluate(part_entries, joint_entries, submodule_type)
+    finally:
+        session.close()
+    assert_rows_close(values, expected_summary(part_entries, joint_entries, submodule_type))
+
+
+def test_sharded_costing_matches_single_process(workbook):
+    part_entries, joint_entries = sample_entries()
+    assert len(cost.split_shards(part_entries, joint_entries, 2)) == 2
+    single = cost.update_and_read_excel(workbook, part_entries, joint_entries, n_shards=1)
+    sharded = cost.update_and_read_excel(workbook, part_entries, joint_entries, n_shards=2)
+    assert single is not None and sharded is not None
+    assert_rows_close(sharded, single)
+    assert_rows_close(single, expected_summary(part_entries, joint_entries))
+
+
+def test_sharded_costing_saves_every_shards_row_costs(workbook, tmp_path, monkeypatch):
+    part_entries, joint_entries = sample_entries()
+    counts = []
+    for n_shards in (1, 3):
+        cache_dir = tmp_path / f'cache_{n_shards}'
+        monkeypatch.setattr(cfg, 'cost_cache_dir', str(cache_dir))
+        cost.update_and_read_excel(workbook, part_entries, joint_entries, n_shards=n_shards)
+        cost.close_sessions()
+        (path,) = cache_dir.glob('row_costs.*')
+        counts.append(len(RowCostCache(str(path)).entries))
+    assert counts[0] == counts[1] > 0
+
+
+def _add_running_total(workbook):
+    # A running total from a header seed, and a column reading the previous row of it
+    book = load_workbook(workbook)
+    parts = book[PART_SHEET]
+    parts['T3'] = 10
+    parts['T4'] = '=T3+C4'
+    parts['U4'] = '=IF($A4="","",T3)'
+    book.save(workbook)
+
+
+def test_references_to_other_rows_shift_with_the_row(workbook):
+    _add_running_total(workbook)
+    part_entries, joint_entries = sample_entries()
+    engine = load_cost_engine(workbook)
+    columns = engine.evaluate_tables({PART_SHEET: part_entries, 'Joints List': joint_entries})
+    quantities = [entry[2] for entry in part_entries]
+    running_total = 10 + np.cumsum(quantities)
+    np.testing.assert_allclose(columns[(PART_SHEET, 20)].astype(float), running_total)
+    np.testing.assert_allclose(columns[(PART_SHEET, 21)].astype(float), np.concatenate([[10], running_total[:-1]]))
+
+    # Columns that read other rows are never cached by row content
+    assert not engine.row_local[PART_SHEET] & {20, 21}
+    assert {15, 16, 17, 18, 19} <= engine.row_local[PART_SHEET]
+
+
+def test_row_cache_recomputes_columns_that_read_other_rows(workbook):
+    _add_running_total(workbook)
+    part_entries, joint_entries = sample_entries()
+    engine = load_cost_engine(workbook)
+    cache = RowCostCache()
+    engine.evaluate_tables({PART_SHEET: part_entries, 'Joints List': joint_entries}, cache=cache)
+    reordered = part_entries[::-1]
+    columns = engine.evaluate_tables({PART_SHEET: reordered, 'Joints List': joint_entries}, cache=cache)
+    assert cache.hits == cache.misses  # The second pass is served from the cache
+    np.testing.assert_allclose(columns[(PART_SHEET, 20)].astype(float), 10 + np.cumsum([entry[2] for entry in reordered]))
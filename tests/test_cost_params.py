@@ -0,0 +1,23 @@
+import glob
+import os
+
+from cost import CalculatorSession
+from cost_params import load_parameter_pack
+from tests.synthetic_workbook import expected_summary, sample_entries, assert_rows_close
+
+
+def test_corrupt_parameter_pack_is_rebuilt(workbook):
+    cache_dir = os.path.join(os.path.dirname(workbook), 'cache')
+    load_parameter_pack(workbook, cache_dir)
+    (path,) = glob.glob(os.path.join(cache_dir, '*.npz'))
+    with open(path, 'rb') as f:
+        content = f.read()
+    for corrupt in (content[:len(content) // 2], b'not a zip file'):
+        with open(path, 'wb') as f:
+            f.write(corrupt)
+        part_entries, joint_entries = sample_entries()
+        session = CalculatorSession(workbook, 'native')
+        try:
+            assert_rows_close(session.evaluate(part_entries, joint_entries), expected_summary(part_entries, joint_entries))
+        finally:
+            session.close()
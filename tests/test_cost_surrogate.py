@@ -0,0 +1,65 @@
+import numpy as np # type: ignore
+
+from cost_surrogate import CostSurrogate, fill_priced_slots
+
+
+def test_corrupt_surrogate_starts_untrained(tmp_path):
+    path = tmp_path / 'cost_surrogate.npz'
+    surrogate = CostSurrogate(str(path), min_samples=2)
+    for i in range(1, 6):
+        surrogate.add({'bias': 1.0, 'mass': float(i)}, 10.0 * i)
+    surrogate.fit()
+    surrogate.save()
+    content = path.read_bytes()
+    for corrupt in (content[:len(content) // 2], b'not a zip file'):
+        path.write_bytes(corrupt)
+        surrogate = CostSurrogate(str(path), min_samples=2)
+        assert not surrogate.ready and not surrogate.samples
+
+
+def _surrogate(cost, selected, held_out):
+    surrogate = CostSurrogate(alpha=1e-9, min_samples=2, min_holdout=3)
+    for mass in selected:
+        surrogate.add({'bias': 1.0, 'mass': mass}, cost(mass))
+    for mass in held_out:
+        surrogate.add({'bias': 1.0, 'mass': mass}, cost(mass), holdout=True)
+    surrogate.fit()
+    return surrogate
+
+
+def test_holdout_error_gates_ranking():
+    selected = [10.0, 10.5, 11.0, 11.5, 12.0]
+    held_out = [5.0, 20.0, 30.0, 40.0]
+    linear = _surrogate(lambda mass: 10.0 * mass + 5.0, selected, held_out)
+    assert linear.error < 1e-3 and linear.ready
+
+    # A good fit on the selected designs says nothing about the candidates it never saw
+    curved = _surrogate(lambda mass: mass ** 3, selected, held_out)
+    assert curved.trained and curved.error > curved.max_error and not curved.ready
+
+    untested = _surrogate(lambda mass: 10.0 * mass + 5.0, selected, held_out[:2])
+    assert untested.trained and untested.error is None and not untested.ready
+
+
+def test_candidates_outside_training_range_are_not_priced():
+    surrogate = _surrogate(lambda mass: 10.0 * mass + 5.0, [10.0, 11.0, 12.0], [5.0, 20.0, 30.0])
+    predicted = surrogate.price([{'bias': 1.0, 'mass': 15.0}, {'bias': 1.0, 'mass': 50.0},
+                                 {'bias': 1.0, 'mass': 15.0, 'joints': 2.0}])
+    assert abs(predicted[0] - 155.0) < 1e-3
+    assert np.isnan(predicted[1]) and np.isnan(predicted[2])
+
+
+def test_holdout_round_trips(tmp_path):
+    path = str(tmp_path / 'cost_surrogate.npz')
+    surrogate = _surrogate(lambda mass: mass ** 2, [10.0, 11.0, 12.0], [5.0, 20.0, 30.0])
+    surrogate.path = path
+    surrogate.save()
+    reloaded = CostSurrogate(path, alpha=1e-9, min_samples=2, min_holdout=3)
+    assert reloaded.n_holdout == 3
+    assert reloaded.error == surrogate.error
+
+
+def test_priced_slots_keep_unpriced_in_place():
+    slots = ['a', 'b', 'c', 'd']
+    priced = ['d', 'b', 'x']  # By predicted cost; 'x' is heavier than the slots
+    assert fill_priced_slots(slots, priced, lambda name: name != 'c') == ['d', 'b', 'c', 'x']
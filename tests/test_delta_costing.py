@@ -0,0 +1,44 @@
+from cost import CalculatorSession
+from tests.synthetic_workbook import expected_summary, sample_entries, assert_rows_close
+
+
+def _full(workbook, part_entries, joint_entries):
+    session = CalculatorSession(workbook, 'native', delta=False)
+    try:
+        return session.evaluate(part_entries, joint_entries)
+    finally:
+        session.close()
+
+
+def test_delta_matches_full_recalculation(workbook):
+    part_entries, joint_entries = sample_entries()
+    session = CalculatorSession(workbook, 'native', delta=True)
+    try:
+        assert_rows_close(session.evaluate(part_entries, joint_entries), expected_summary(part_entries, joint_entries))
+
+        # Change a quantity in one design and drop the channel row of another while its joints stay
+        changed_parts = [list(entry) for entry in part_entries if entry[1] != 'W_Channel_XW2']
+        changed_parts[0][2] += 1
+        delta = session.evaluate(changed_parts, joint_entries)
+        assert_rows_close(delta, _full(workbook, changed_parts, joint_entries))
+        assert_rows_close(delta, expected_summary(changed_parts, joint_entries))
+
+        # Renamed part rows: the joints still count towards the design named at the end of their part name
+        renamed_parts = [entry[:1] + [entry[1].replace('W_Panel_X_', 'W_Panel_Y_')] + entry[2:] for entry in changed_parts]
+        removed_joints = joint_entries[:-3]
+        delta = session.evaluate(renamed_parts, removed_joints)
+        assert_rows_close(delta, _full(workbook, renamed_parts, removed_joints))
+    finally:
+        session.close()
+
+
+def test_delta_recalculates_everything_for_unattributed_joints(workbook):
+    part_entries, joint_entries = sample_entries()
+    session = CalculatorSession(workbook, 'native', delta=True)
+    try:
+        session.evaluate(part_entries, joint_entries)
+        loose_joints = joint_entries + [['Loose:1', 'W_Cap_XW1:1', 40]]
+        delta = session.evaluate(part_entries, loose_joints)
+        assert_rows_close(delta, _full(workbook, part_entries, loose_joints))
+    finally:
+        session.close()
@@ -0,0 +1,21 @@
+import numpy as np # type: ignore
+
+from frame_model import FrameModel, frame_arrays
+
+
+def test_frame_arrays_map_node_ids_and_drop_invalid_members():
+    nodes = {10: [0.0, 0.0], 30: [20.0, 0.0], 20: [0.0, 10.0], 40: [20.0, 10.0]}
+    members = [[10, 20], [20, 40], [40, 30], [20, 99]]
+    xy, member_ids = frame_arrays(nodes, members)
+    np.testing.assert_array_equal(xy, [[0, 0], [0, 10], [20, 0], [20, 10]])
+    np.testing.assert_array_equal(member_ids, [[0, 1], [1, 3], [3, 2]])
+
+    frame = FrameModel.from_nodes(nodes, members)
+    np.testing.assert_array_equal(frame.members, member_ids)
+    np.testing.assert_array_equal(frame.lengths, [10, 20, 10])
+
+    # Array and FrameModel inputs drop the same kind of members
+    invalid = [[0, 1], [1, 4], [-1, 2]]
+    np.testing.assert_array_equal(frame_arrays(xy, invalid)[1], [[0, 1]])
+    np.testing.assert_array_equal(frame_arrays(frame, invalid)[1], [[0, 1]])
+    np.testing.assert_array_equal(FrameModel(xy, invalid).members, [[0, 1]])
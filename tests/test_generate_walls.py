@@ -0,0 +1,43 @@
+import pytest # type: ignore
+
+import config as cfg
+from generate_walls import iter_top_n_frames, _best
+
+
+def _top(n_top, xwall, **kwargs):
+    return [(row["Combo"], round(row["Total Mass"], 9)) for row in _best(iter_top_n_frames(n_top, xwall=xwall, **kwargs), n_top)]
+
+
+@pytest.mark.parametrize("xwall", [True, False])
+@pytest.mark.parametrize("n_top", [10, 2000])
+@pytest.mark.parametrize("use_ratio", [True, False])
+def test_search_modes_match_exhaustive_sweep(monkeypatch, xwall, n_top, use_ratio):
+    monkeypatch.setattr(cfg, "material", cfg.material)  # The sweep sets the panel material of each combo
+    monkeypatch.setattr(cfg, "use_ratio", use_ratio)
+    expected = _top(n_top, xwall, search='exhaustive', workers=1)
+    assert expected
+    assert _top(n_top, xwall, search='bisect', workers=1) == expected
+    assert _top(n_top, xwall, search='bound', workers=1) == expected
+    assert _top(n_top, xwall, search='exhaustive', workers=2) == expected
+
+
+def test_no_designs_for_empty_top(monkeypatch):
+    monkeypatch.setattr(cfg, "material", cfg.material)
+    for search in ('exhaustive', 'bisect', 'bound'):
+        assert _top(0, True, search=search, workers=1) == []
+
+
+def _row(combo, mass, cost=None):
+    row = {"Combo": combo, "Total Mass": mass}
+    if cost is not None:
+        row["Predicted Cost"] = cost
+    return row
+
+
+def test_best_reorders_only_the_priced_lightest():
+    rows = [_row(1, 1.0, 30.0), _row(2, 2.0), _row(3, 3.0, 10.0), _row(4, 4.0, 20.0), _row(5, 5.0, 5.0)]
+    by_combo = lambda top: [row["Combo"] for row in top]
+    assert by_combo(_best(iter(rows), 2)) == [1, 2]
+    # The unpriced design keeps its place, the priced ones are chosen from the 4 lightest
+    assert by_combo(_best(iter(rows), 3, n_pool=4)) == [3, 2, 4]
+    assert by_combo(_best(iter(rows), 3, ranked_by_cost=True)) == [5, 2, 3]
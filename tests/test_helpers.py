@@ -0,0 +1,13 @@
+from helpers import get_combination_costs
+
+
+def _panel(design, material, gauge):
+    return [[design, f'Panel_{design}', 1, 'Manual Shear Punch', 'Auto Panel Bender', material, gauge, 0, 1.0, 1, 1, 1.0, 1.0, 'Class 3']]
+
+
+def test_combination_costs_skip_calibrations_with_uncosted_sub_designs():
+    part_entries = {'F1': _panel('F1', 'GLV-M5', 12), 'XW1': _panel('XW1', 'GLV-M5', 14),
+                    'XW2': _panel('XW2', 'GLV-M5', 14), 'YW1': _panel('YW1', 'GLV-M5', 16)}
+    values = [['F1', 100.0], ['XW1', 20.0], ['XW2', None], ['YW1', 10.0],
+              ['F1_XW1_YW1', 135.0], ['F1_XW2_YW1', 150.0]]
+    assert get_combination_costs(values, part_entries, n=5) == {'F1_XW1_YW1': 135.0}
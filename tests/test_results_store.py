@@ -0,0 +1,51 @@
+import results_store
+from results_store import ResultsStore, SUMMARY_COLUMNS
+from tests.synthetic_workbook import sample_entries
+
+
+def _summary_rows(part_entries):
+    # Integral floats, as Excel and the native engine return them, and a text cell
+    return [[design, 'Water Collection Welded', 12.0, 18.0, 3.0, 2.0, 0.0, 3.0, 0.0, 'n/a', 100.0 + i]
+            for i, design in enumerate(dict.fromkeys(entry[0] for entry in part_entries))]
+
+
+def test_summary_values_round_trip(tmp_path):
+    part_entries, joint_entries = sample_entries()
+    values = _summary_rows(part_entries)
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), 'hash')
+    try:
+        store.record(values, part_entries, joint_entries)
+        known, remaining_parts, _ = store.warm_start(part_entries, joint_entries, 'Water Collection Welded')
+    finally:
+        store.close()
+    assert not remaining_parts
+    for value in values:
+        stored = known[value[0]]
+        assert stored == value
+        assert [type(v) for v in stored] == [type(v) for v in value]
+
+
+def test_numeric_summary_columns_are_upgraded(tmp_path, monkeypatch):
+    path = str(tmp_path / 'results.sqlite')
+    part_entries, joint_entries = sample_entries()
+    values = _summary_rows(part_entries)
+    numeric_schema = results_store._SCHEMA.replace(', '.join(f'{col} REAL' for col in SUMMARY_COLUMNS),
+                                                   ', '.join(f'{col} NUMERIC' for col in SUMMARY_COLUMNS))
+    with monkeypatch.context() as patch:
+        patch.setattr(results_store, '_SCHEMA', numeric_schema)
+        store = ResultsStore(path, 'hash')
+        store.record(values, part_entries, joint_entries)
+        store.close()
+
+    store = ResultsStore(path, 'hash')
+    try:
+        known, _, _ = store.warm_start(part_entries, joint_entries, 'Water Collection Welded')
+        types = {row['name']: row['type'] for row in store.connection.execute("PRAGMA table_info(costs)")}
+        indexes = {row['name'] for row in store.connection.execute("PRAGMA index_list(costs)")}
+    finally:
+        store.close()
+    assert all(types[col] == 'REAL' for col in SUMMARY_COLUMNS)
+    assert {'costs_by_scenario', 'costs_by_design'} <= indexes
+    for value in values:
+        assert known[value[0]] == value
+        assert all(isinstance(v, float) for v in known[value[0]][2:9])
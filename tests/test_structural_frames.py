@@ -0,0 +1,104 @@
+import numpy as np # type: ignore
+import pytest # type: ignore
+
+import config as cfg
+import general_data as gd
+import structural_frames as sf
+from generate_walls import frame_layout, frame_from_layout, frame_loads
+from profiles import Profile
+
+
+def _frames(n_nodes=30, plan="A", profiles=('C', 'Rectangular', 'Hat')):
+    layout = frame_layout(cfg.x_in, cfg.z_in, cfg.material, num_nodes=n_nodes, diagonal_plan=plan)
+    return [(frame_from_layout(layout, channel, cfg.material), None, channel)
+            for channel in (Profile(gd.GLV, gauge, profile) for profile in profiles for gauge in (10, 14))]
+
+
+def test_reanalysis_matches_direct_solve():
+    batch = _frames()
+    frame = batch[0][0]
+    top, bottom = frame.top_edge_nodes, np.flatnonzero(frame.xy[:, 1] == 0)
+    bottom = bottom[np.argsort(frame.xy[bottom, 0])]
+    members = frame.member_list + [[int(top[3]), int(bottom[4])], [int(top[8]), int(bottom[9])]]
+    braced = [(frame.xy, members, channel) for _, _, channel in batch]
+    loads = frame_loads(xwall=True)
+
+    passed, utilization = sf.evaluate_frames(braced, **loads)
+    reanalysis_passed, reanalysis_utilization = sf.evaluate_frames(braced, **loads, base_members=frame.member_list)
+    np.testing.assert_array_equal(passed, reanalysis_passed)
+    np.testing.assert_allclose(reanalysis_utilization, utilization, rtol=1e-9)
+
+    # The two diagonals touch few free dofs, so the low-rank update is the path that ran
+    sections = sf._section_arrays([channel for _, _, channel in braced])
+    EA = (sections["E"] * sections["A"])[:, None, None]
+    EI = (sections["E"] * sections["I"])[:, None, None]
+    F_f = sf._top_edge_loads(frame.xy, gd.LOAD_FACTOR * loads["q"])[sf.frame_basis(frame.xy, members)["free_dofs"]][:, None]
+    assert sf._reanalysis_solve(frame.xy, members, frame.member_list, EA, EI, F_f) is not None
+
+
+def test_reanalysis_declines_full_rank_plans():
+    base = _frames(plan="A")[0][0]
+    frame = _frames(plan="B")[0][0]
+    F_f = np.zeros((int(sf.frame_basis(frame)["free_dofs"].sum()), 1))
+    assert sf._reanalysis_solve(frame, frame.members, base.members, np.ones((1, 1, 1)), np.ones((1, 1, 1)), F_f) is None
+
+
+
+def test_cantilever_buckling_matches_euler():
+    length, n = 100.0, 8
+    xy = np.array([[0, length * k / n] for k in range(n + 1)])
+    basis = sf.frame_basis(xy, [[k, k + 1] for k in range(n)])
+    EI = 1e4
+    K = 1e6 * basis["K_axial_ff"] + EI * basis["K_bending_ff"]
+    load_factor = sf.buckling_load_factors(K, sf._geometric_stiffness(basis, -np.ones(n)))
+    np.testing.assert_allclose(load_factor, np.pi ** 2 * EI / (4 * length ** 2), rtol=1e-3)
+
+
+def test_buckling_load_factors_match_eigh():
+    from scipy.linalg import eigh  # type: ignore
+
+    batch = _frames(plan="B")
+    basis = sf.frame_basis(batch[0][0])
+    sections = sf._section_arrays([channel for _, _, channel in batch])
+    K = (sections["E"] * sections["A"])[:, None, None] * basis["K_axial_ff"] + \
+        (sections["E"] * sections["I"])[:, None, None] * basis["K_bending_ff"]
+    axial = -np.abs(np.random.default_rng(0).standard_normal((len(batch), len(basis["lengths"])))) * 100
+    K_G = sf._geometric_stiffness(basis, axial)
+    expected = [1 / eigh(-G, k, eigvals_only=True)[-1] for k, G in zip(K, K_G)]
+    np.testing.assert_allclose(sf.buckling_load_factors(K, K_G), expected, rtol=1e-9)
+
+    # A stiffness that is not positive definite fails only its own frame
+    K[1] = -K[1]
+    load_factors = sf.buckling_load_factors(K, K_G)
+    assert load_factors[1] == 0
+    np.testing.assert_allclose(np.delete(load_factors, 1), np.delete(expected, 1), rtol=1e-9)
+
+
+def test_mechanism_frames_are_rejected(monkeypatch):
+    monkeypatch.setattr(cfg, "frame_buckling", "global")
+    batch = _frames()
+    frame = batch[0][0]
+    xy = np.vstack([frame.xy, [[1.0, 1.0]]])  # A free node with no members
+    passed, utilization = sf.evaluate_frames([(xy, frame.member_list, channel) for _, _, channel in batch],
+                                             **frame_loads(xwall=True))
+    assert not passed.any()
+    assert np.isinf(utilization).all(axis=1).all()
+
+
+def test_load_cases_need_span():
+    frame, _, channel = _frames()[0]
+    with pytest.raises(ValueError):
+        sf.evaluate_frames([(frame, None, channel)], frame_loads(xwall=True)["q"], load_cases=["hydrostatic"])
+
+
+@pytest.mark.parametrize("buckling", ["euler", "global"])
+def test_banded_solver_matches_dense(monkeypatch, buckling):
+    monkeypatch.setattr(cfg, "frame_buckling", buckling)
+    batch = _frames(plan="B")
+    loads = frame_loads(xwall=True)
+    monkeypatch.setattr(cfg, "frame_solver", "dense")
+    passed, utilization = sf.evaluate_frames(batch, **loads)
+    monkeypatch.setattr(cfg, "frame_solver", "banded")
+    banded_passed, banded_utilization = sf.evaluate_frames(batch, **loads)
+    np.testing.assert_array_equal(banded_passed, passed)
+    np.testing.assert_allclose(banded_utilization, utilization, rtol=1e-6)